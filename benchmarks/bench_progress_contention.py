@@ -0,0 +1,101 @@
+"""Benchmark concurrent progress updates from thousands of threads.
+
+Every thread increments a per-student counter through ``store.update``.
+The counter is kept in the record's ``updated_at``, which every backend
+stores verbatim. The final counters must add up to the number of updates,
+so any lost write shows up as a shortfall.
+
+Usage:
+    python benchmarks/bench_progress_contention.py --threads 2000
+    python benchmarks/bench_progress_contention.py --stripes 1       # one global lock
+    python benchmarks/bench_progress_contention.py --unlocked        # plain get + put
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rag.progress_store import (  # noqa: E402
+    EventLogProgressStore,
+    InMemoryProgressStore,
+    ProgressRecord,
+    ProgressStore,
+    SQLiteProgressStore,
+)
+
+UNIT = "SE401"
+
+
+def _increment(current):
+    # Yield mid-update so unlocked read-modify-writes actually interleave
+    time.sleep(0)
+    return ProgressRecord(updated_at=(current.updated_at if current else 0.0) + 1)
+
+
+def _build(backend: str, stripes: int) -> ProgressStore:
+    workdir = Path(tempfile.mkdtemp(prefix="progress-contention-"))
+    if backend == "sqlite":
+        return SQLiteProgressStore(str(workdir / "progress.sqlite3"), lock_stripes=stripes)
+    if backend == "events":
+        return EventLogProgressStore(str(workdir / "events"), lock_stripes=stripes)
+    return InMemoryProgressStore(lock_stripes=stripes)
+
+
+def run(backend: str, threads: int, updates: int, students: int, stripes: int, unlocked: bool) -> None:
+    store = _build(backend, stripes)
+    keys = [f"student_{i:05d}" for i in range(students)]
+    barrier = threading.Barrier(threads + 1)
+
+    def _worker(seed: int) -> None:
+        rng = random.Random(seed)
+        picks = [rng.choice(keys) for _ in range(updates)]
+        barrier.wait()
+        for student_id in picks:
+            if unlocked:
+                store.put(UNIT, student_id, _increment(store.get(UNIT, student_id)))
+            else:
+                store.update(UNIT, student_id, _increment)
+
+    # Thousands of threads need small stacks
+    threading.stack_size(256 * 1024)
+    workers = [threading.Thread(target=_worker, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    expected = threads * updates
+    recorded = sum(int(record.updated_at) for _, record in store.iter_records(UNIT))
+    store.close()
+
+    mode = "unlocked" if unlocked else f"{stripes} stripes"
+    print(f"backend={backend} threads={threads} updates/thread={updates} students={students} ({mode})")
+    print(f"  updates/sec  : {expected / elapsed:,.0f}")
+    print(f"  lost updates : {expected - recorded:,} of {expected:,}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite", "events"], default="memory")
+    parser.add_argument("--threads", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=50, help="Updates per thread")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--stripes", type=int, default=256)
+    parser.add_argument("--unlocked", action="store_true", help="Use get + put without update()")
+    args = parser.parse_args()
+    run(args.backend, args.threads, args.updates, args.students, args.stripes, args.unlocked)
+
+
+if __name__ == "__main__":
+    main()
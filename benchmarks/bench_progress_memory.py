@@ -0,0 +1,70 @@
+"""Compare per-student memory of the dict/list progress layout and bitmask records.
+
+Usage:
+    python benchmarks/bench_progress_memory.py --students 300000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rag.progress_store import InMemoryProgressStore, ProgressRecord, chapter_codec  # noqa: E402
+
+CHAPTERS = [f"ch{i}" for i in range(1, 17)]
+
+
+def _measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    holder = build()
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del holder
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=300_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    codec = chapter_codec("bench")
+    for chapter in CHAPTERS:
+        codec.bit(chapter)
+    student_ids = [f"student_{i:06d}" for i in range(args.students)]
+    progress = [sorted(rng.sample(CHAPTERS, rng.randint(0, len(CHAPTERS)))) for _ in student_ids]
+
+    def legacy_layout():
+        # Shape of the original _PROGRESS_STATE dict
+        return {
+            sid: {"completed": list(done), "notes": []}
+            for sid, done in zip(student_ids, progress)
+        }
+
+    def bitmask_layout():
+        store = InMemoryProgressStore()
+        for sid, done in zip(student_ids, progress):
+            store.put("bench", sid, ProgressRecord(mask=codec.mask(done)))
+        return store
+
+    legacy = _measure(legacy_layout)
+    compact = _measure(bitmask_layout)
+    # Student-id strings are shared by both layouts and excluded from the totals
+    print(f"students={args.students}")
+    print(f"  dict/list layout : {legacy / 2**20:8.1f} MiB ({legacy / args.students:6.0f} B/student)")
+    print(f"  bitmask records  : {compact / 2**20:8.1f} MiB ({compact / args.students:6.0f} B/student)")
+    print(f"  reduction        : {legacy / compact:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark progress-store update throughput at cohort scale.
+
+Usage:
+    python benchmarks/bench_progress_store.py --students 100000 --updates 200000
+    python benchmarks/bench_progress_store.py --backend memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rag.progress_store import (  # noqa: E402
+    InMemoryProgressStore,
+    ProgressRecord,
+    SQLiteProgressStore,
+    chapter_codec,
+)
+
+UNIT = "SE401"
+CHAPTERS = [f"ch{i}" for i in range(1, 17)]
+
+
+def _add_chapter(chapter: str):
+    bit = 1 << chapter_codec(UNIT).bit(chapter)
+
+    def _apply(current):
+        mask = current.mask if current is not None else 0
+        if mask & bit:
+            return current
+        return ProgressRecord(mask=mask | bit, notes=current.notes if current else None)
+    return _apply
+
+
+def run(backend: str, students: int, updates: int, seed: int) -> None:
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix="progress-bench-")
+    if backend == "sqlite":
+        store = SQLiteProgressStore(str(Path(workdir) / "progress.sqlite3"))
+    else:
+        store = InMemoryProgressStore()
+
+    keys = [f"student_{i:06d}" for i in range(students)]
+    start = time.perf_counter()
+    for _ in range(updates):
+        store.update(UNIT, rng.choice(keys), _add_chapter(rng.choice(CHAPTERS)))
+    update_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.flush()
+    flush_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(updates // 10):
+        store.get(UNIT, rng.choice(keys))
+    read_s = time.perf_counter() - start
+    store.close()
+
+    print(f"backend={backend} students={students} updates={updates}")
+    print(f"  updates/sec : {updates / update_s:,.0f}")
+    print(f"  final flush : {flush_s * 1000:,.1f} ms")
+    print(f"  reads/sec   : {(updates // 10) / read_s:,.0f}")
+    print(f"  data dir    : {workdir}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.backend, args.students, args.updates, args.seed)
+
+
+if __name__ == "__main__":
+    main()
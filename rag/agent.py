@@ -7,17 +7,36 @@ from google.adk.tools.load_memory_tool import load_memory_tool
 # Local tool imports
 from rag.tools import corpus_tools
 from rag.tools import storage_tools
+from rag.tools import blob_manifest
+from rag.tools import diagnostics_tools
 from rag.sub_agents import (
     assessment_agent_tool,
     curriculum_agent_tool,
     learning_agent_tool,
     progress_agent_tool,
 )  # Now imported from modular sub_agents/ folder
+from rag.utils.history_compactor import compact_history_callback
+from rag.utils.instrumentation import instrument_tools
+from rag.utils.llm_accounting import (
+    account_agent_end,
+    account_agent_start,
+    account_model_end,
+    account_model_start,
+)
+from rag.utils.memory_profiler import start_memory_profiling
+from rag.utils.metrics import start_metrics_export
+from rag.utils.tracing import (
+    trace_agent_end,
+    trace_agent_start,
+    trace_model_end,
+    trace_model_start,
+)
 from rag.config import (
     AGENT_NAME,
     AGENT_MODEL,
     ROUTING_MODEL,  # Lightweight model for fast routing decisions
-    AGENT_OUTPUT_KEY
+    AGENT_OUTPUT_KEY,
+    MEMORY_DIAGNOSTICS,  # Operator-only memory tool; tracing stays on after the first report
 )
 
 
@@ -70,12 +89,16 @@ agent = Agent(
     1. GCS OPERATIONS:
        - Upload files to GCS buckets (ask for bucket name and filename)
        - Create, list, and get details of buckets
+         • get_bucket_details returns summary totals by default; only pass include_files=True when the user wants file names, and follow next_page_token for more pages
        - List files in buckets
+       - Find files by prefix, glob pattern, size or date with query_bucket_manifest (cached; prefer it over repeated list calls)
     
     2. RAG CORPUS MANAGEMENT:
        - Create, update, list and delete corpora
        - Import documents from GCS to a corpus (requires gcs_uri)
+       - Import every file under a bucket prefix or glob pattern in one call with import_documents_from_prefix (run with dry_run=True first to confirm the file count and sample)
        - List, get details, and delete files within a corpus
+       - For many files or corpora at once (cleanups, semester resets) use the bulk tools with an ID list or filters (display-name glob, source-URI prefix, age). They dry-run by default: show the preview, confirm, then call again with dry_run=False
        
     3. CORPUS SEARCHING (delegate to sub-agents):
        - When the user asks a question or wants to search for information, DELEGATE to the appropriate sub-agent:
@@ -93,10 +116,13 @@ agent = Agent(
 
     Always confirm operations before executing them, especially for delete operations.
 
+    If get_memory_report is available, only call it when an operator explicitly asks for memory diagnostics; summarize the top growers and largest stores, and pass stop=True once they say they are done.
+
     - For any GCS operation (upload, list, delete, etc.), always include the gs://<bucket-name>/<file> URI in your response to the user. When creating, listing, or deleting items (buckets, files, corpora, etc.), display each as a bulleted list, one per line, using the appropriate emoji (ℹ️ for buckets and info, 🗂️ for files, etc.). For example, when listing GCS buckets:
       - 🗂️ gs://bucket-name/
     """,
-    tools=[
+    # Every tool and sub-agent call is timed and counted (rag/utils/instrumentation.py)
+    tools=instrument_tools([
         # RAG corpus management tools
         corpus_tools.create_corpus_tool,
         corpus_tools.update_corpus_tool,
@@ -104,12 +130,18 @@ agent = Agent(
         corpus_tools.get_corpus_tool,
         corpus_tools.delete_corpus_tool,
         corpus_tools.import_document_tool,
+        corpus_tools.import_from_prefix_tool,
         
         # RAG file management tools
         corpus_tools.list_files_tool,
         corpus_tools.get_file_tool,
         corpus_tools.delete_file_tool,
         
+        # Bulk operation tools (dry run by default)
+        corpus_tools.bulk_get_files_tool,
+        corpus_tools.bulk_delete_files_tool,
+        corpus_tools.bulk_delete_corpora_tool,
+        
         # Specialized sub-agents for routing
         curriculum_agent_tool,
         learning_agent_tool,
@@ -122,16 +154,32 @@ agent = Agent(
         storage_tools.get_bucket_details_tool,
         storage_tools.upload_file_gcs_tool,
         storage_tools.list_blobs_tool,
+        blob_manifest.query_bucket_manifest_tool,
         
         # Memory tool for accessing conversation history
         load_memory_tool,
-    ],
+    ] + (
+        # Process diagnostics (tracemalloc growth and store sizes), opt-in via RAG_MEMORY_DIAGNOSTICS
+        [diagnostics_tools.memory_report_tool] if MEMORY_DIAGNOSTICS else []
+    )),
+    # Hold conversation history to RAG_MAX_HISTORY_TOKENS before every model call
+    before_model_callback=[compact_history_callback, trace_model_start, account_model_start],
+    # Per-call model, tokens, time-to-first-token and latency (get_llm_usage)
+    after_model_callback=[trace_model_end, account_model_end],
+    # Root of each sampled turn's span tree (RAG_TRACE_SAMPLE_RATE); sub-agent LLM usage is charged to this turn
+    before_agent_callback=[trace_agent_start, account_agent_start],
+    after_agent_callback=[trace_agent_end, account_agent_end],
     # Output key automatically saves the agent's final response in state under this key
     output_key=AGENT_OUTPUT_KEY
 )
 
 root_agent = agent
 
+# OpenMetrics endpoint / file dump, when RAG_METRICS_PORT or RAG_METRICS_DUMP_PATH is set
+start_metrics_export()
+# Memory reports on SIGUSR2 (and every RAG_MEMORY_SNAPSHOT_INTERVAL seconds if set)
+start_memory_profiling()
+
 # Export streaming config for external runners
 # Usage: Runner(...).run_async(..., run_config=DEFAULT_RUN_CONFIG)
 __all__ = ["root_agent", "agent", "DEFAULT_RUN_CONFIG"]
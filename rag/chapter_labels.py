@@ -0,0 +1,259 @@
+"""Fuzzy chapter-label resolution over titles, week labels, ordinals and key concepts.
+
+Built once per course version. Exact aliases are a dict lookup; anything
+else is matched through a character-trigram inverted index, with the best
+few candidates re-scored by edit distance, so "Ch 3", "chapter three" and
+"requirements eng" resolve without another LLM turn.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_CHAPTER_REF = re.compile(r"^(ch|chap|chapter)\s*(\d+)$")
+_ORDINAL_CHAPTER_REF = re.compile(r"^(\d+)\s*(chapter|ch)$")
+_WEEK_REF = re.compile(r"^(wk|week)\s*(\d+)$")
+_NUMBER_WORDS = {
+    word: str(value)
+    for value, words in enumerate(
+        [
+            (), ("one", "first"), ("two", "second"), ("three", "third"), ("four", "fourth"),
+            ("five", "fifth"), ("six", "sixth"), ("seven", "seventh"), ("eight", "eighth"),
+            ("nine", "ninth"), ("ten", "tenth"), ("eleven", "eleventh"), ("twelve", "twelfth"),
+            ("thirteen", "thirteenth"), ("fourteen", "fourteenth"), ("fifteen", "fifteenth"),
+            ("sixteen", "sixteenth"), ("seventeen", "seventeenth"), ("eighteen", "eighteenth"),
+            ("nineteen", "nineteenth"), ("twenty", "twentieth"),
+        ]
+    )
+    for word in words
+}
+# Candidates re-scored with edit distance after trigram ranking
+_RESCORE_CANDIDATES = 4
+# Trigram overlap below which edit distance is not worth computing
+_RESCORE_MIN_DICE = 0.3
+# Resolved queries memoized per index
+_RESOLVE_CACHE_SIZE = 2048
+
+
+class LabelMatch(NamedTuple):
+    chapter_id: str
+    confidence: float
+    matched_label: str
+
+
+def normalize_label(text: str) -> str:
+    """Lowercase, strip punctuation and spell numbers as digits ("Chapter Three" -> "chapter 3")."""
+    tokens = _NON_ALNUM.sub(" ", text.lower()).split()
+    tokens = [_NUMBER_WORDS.get(token, token) for token in tokens]
+    # "3rd", "21st" -> "3", "21"
+    tokens = [re.sub(r"^(\d+)(st|nd|rd|th)$", r"\1", token) for token in tokens]
+    return " ".join(tokens)
+
+
+def _trigrams(text: str) -> Tuple[str, ...]:
+    padded = f"  {text} "
+    return tuple({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _edit_distance(left: str, right: str, limit: int) -> int:
+    """Levenshtein distance, or ``limit + 1`` once it must exceed ``limit``.
+
+    Only a diagonal band of width ``2 * limit + 1`` is evaluated.
+    """
+    if len(left) < len(right):
+        left, right = right, left
+    if len(left) - len(right) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(right) + 1)]
+    for i, left_char in enumerate(left, 1):
+        low, high = max(1, i - limit), min(len(right), i + limit)
+        current = [over] * (len(right) + 1)
+        current[0] = i if i <= limit else over
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (left_char != right[j - 1]),
+            )
+        if min(current[max(0, low - 1):high + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+class ChapterLabelIndex:
+    """Exact-alias map plus a trigram index over every chapter label.
+
+    Labels carry a weight: ids, titles, week labels and ordinals are 1.0;
+    key concepts are weaker evidence and capped below that.
+    """
+
+    __slots__ = ("_exact", "_labels", "_postings", "_chapter_ids", "_orders", "_weeks", "_cache")
+
+    KEY_CONCEPT_WEIGHT = 0.85
+
+    def __init__(
+        self,
+        exact: Dict[str, str],
+        labels: Iterable[Tuple[str, str, float]],
+        orders: Dict[str, str],
+        weeks: Dict[str, str],
+    ) -> None:
+        """
+        Args:
+            exact: Normalized alias -> chapter id (confidence 1.0)
+            labels: (label, chapter id, weight) triples for fuzzy matching
+            orders: Course order number (as text) -> chapter id
+            weeks: Week number (as text) -> chapter id
+        """
+        self._exact = {normalize_label(alias): cid for alias, cid in exact.items()}
+        self._chapter_ids = set(exact.values())
+        self._orders = orders
+        self._weeks = weeks
+        self._labels: List[Tuple[str, str, float, int]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        seen = set()
+        for label, cid, weight in labels:
+            normalized = normalize_label(label)
+            if not normalized or (normalized, cid) in seen:
+                continue
+            seen.add((normalized, cid))
+            position = len(self._labels)
+            grams = _trigrams(normalized)
+            self._labels.append((normalized, cid, weight, len(grams)))
+            for gram in grams:
+                self._postings[gram].append(position)
+        self._cache: Dict[str, Tuple[LabelMatch, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _numbered(self, number: str, query: str, prefer_id: bool) -> Tuple[LabelMatch, ...]:
+        """'ch N' / 'chapter N': N is either the chapter id (textbook number) or
+        the course order. Ids can have gaps (ch6, ch8, ch15), so when the two
+        readings name different chapters both are returned at equal
+        confidence and the label is ambiguous; ``prefer_id`` only decides
+        which comes first.
+        """
+        by_id = f"ch{number}" if f"ch{number}" in self._chapter_ids else None
+        by_order = self._orders.get(number)
+        if by_id and by_order and by_id != by_order:
+            first, second = (by_id, by_order) if prefer_id else (by_order, by_id)
+            return (LabelMatch(first, 1.0, query), LabelMatch(second, 1.0, query))
+        if by_id and prefer_id:
+            return (LabelMatch(by_id, 1.0, query),)
+        if by_order:
+            return (LabelMatch(by_order, 1.0, query),)
+        if by_id:
+            return (LabelMatch(by_id, 0.9, query),)
+        return ()
+
+    def _structured(self, query: str) -> Optional[Tuple[LabelMatch, ...]]:
+        """Numbered forms: 'ch 3', 'chapter 3' and 'third chapter' (see
+        ``_numbered``) and 'week 3'.
+
+        Returns None when the query is not a numbered form, and an empty tuple
+        when it is one that names no chapter (so "ch 19" never fuzzes to ch1).
+        """
+        match = _CHAPTER_REF.match(query)
+        if match:
+            prefix, number = match.groups()
+            return self._numbered(number, query, prefer_id=prefix == "ch")
+        match = _ORDINAL_CHAPTER_REF.match(query)
+        if match:
+            return self._numbered(match.group(1), query, prefer_id=False)
+        match = _WEEK_REF.match(query)
+        if match:
+            number = match.group(2)
+            return (LabelMatch(self._weeks[number], 1.0, query),) if number in self._weeks else ()
+        return None
+
+    def candidates(self, label: str, limit: int = 3) -> Tuple[LabelMatch, ...]:
+        """Best matches for ``label``, one per chapter, highest confidence first."""
+        query = normalize_label(label or "")
+        if not query:
+            return ()
+        cached = self._cache.get(query)
+        if cached is None:
+            cached = self._rank(query)
+            if len(self._cache) >= _RESOLVE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[query] = cached
+        return cached[:limit]
+
+    def resolve(self, label: str, threshold: float = 0.0, margin: float = 0.0) -> Optional[LabelMatch]:
+        """Best match for ``label`` whose confidence is at least ``threshold``.
+
+        Returns None when the runner-up chapter scores within ``margin`` of
+        the best, since a one-word label like "project" fits several chapters.
+        """
+        matches = self.candidates(label, limit=2)
+        if not matches or matches[0].confidence < threshold:
+            return None
+        if len(matches) > 1 and matches[0].confidence - matches[1].confidence < margin:
+            return None
+        return matches[0]
+
+    def is_ambiguous(self, label: str, threshold: float = 0.0, margin: float = 0.0) -> bool:
+        """True when ``label`` clears ``threshold`` but the top two chapters are within ``margin``."""
+        matches = self.candidates(label, limit=2)
+        return (
+            len(matches) > 1
+            and matches[0].confidence >= threshold
+            and matches[0].confidence - matches[1].confidence < margin
+        )
+
+    def _rank(self, query: str) -> Tuple[LabelMatch, ...]:
+        cid = self._exact.get(query) or self._exact.get(query.replace(" ", ""))
+        if cid is not None:
+            return (LabelMatch(cid, 1.0, query),)
+        structured = self._structured(query)
+        if structured is not None:
+            return structured
+
+        grams = _trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] += 1
+        if not shared:
+            return ()
+
+        scored = []
+        for position, count in shared.items():
+            label, _, weight, label_grams = self._labels[position]
+            score = 2 * count / (len(grams) + label_grams)
+            prefix = len(query) >= 3 and label.startswith(query)
+            if prefix:
+                # Truncated labels ("requirements eng") are strong evidence
+                score = max(score, 0.75 + 0.25 * len(query) / len(label))
+            scored.append((score * weight, score, prefix, position))
+
+        best: Dict[str, LabelMatch] = {}
+        for rank, (_, score, prefix, position) in enumerate(
+            heapq.nlargest(_RESCORE_CANDIDATES * 2, scored)
+        ):
+            label, cid, weight, _ = self._labels[position]
+            if not prefix and rank < _RESCORE_CANDIDATES and score >= _RESCORE_MIN_DICE:
+                # Only distances that would beat the trigram score matter
+                longest = max(len(query), len(label))
+                limit = int((1 - score) * longest)
+                distance = _edit_distance(query, label, limit)
+                score = max(score, 1 - distance / longest)
+            confidence = round(min(score, 1.0) * weight, 3)
+            if cid not in best or confidence > best[cid].confidence:
+                best[cid] = LabelMatch(cid, confidence, label)
+
+        return tuple(sorted(best.values(), key=lambda match: match.confidence, reverse=True))
+
+
+__all__ = [
+    "ChapterLabelIndex",
+    "LabelMatch",
+    "normalize_label",
+]
@@ -0,0 +1,164 @@
+"""Vectorized cohort analytics over all students' progress records.
+
+Progress masks are unpacked once into a students x chapters boolean matrix;
+completion rates, histograms, next chapters, out-of-sequence students and
+pacing outliers are then a handful of NumPy array operations instead of one
+snapshot per student.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from rag.course_registry import CourseIndex
+from rag.progress_store import ProgressRecord
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+# Iglewicz-Hoaglin modified z-score cut-off for pacing outliers
+_OUTLIER_Z = 3.5
+
+
+def completion_matrix(
+    index: CourseIndex,
+    records: Iterable[Tuple[str, ProgressRecord]],
+) -> Tuple[List[str], "np.ndarray"]:
+    """Unpack progress masks into a (students x chapters) bool matrix in rank order."""
+
+    student_ids: List[str] = []
+    masks: List[int] = []
+    for student_id, record in records:
+        student_ids.append(student_id)
+        masks.append(record.mask & index.course_mask)
+
+    words = max(index.bits, default=0) // _WORD_BITS + 1
+    packed = np.empty((len(masks), words), dtype=np.uint64)
+    for word in range(words):
+        shift = word * _WORD_BITS
+        packed[:, word] = np.fromiter(
+            ((mask >> shift) & _WORD_MASK for mask in masks), dtype=np.uint64, count=len(masks)
+        )
+
+    bits = np.asarray(index.bits, dtype=np.uint64)
+    columns = packed[:, (bits // _WORD_BITS).astype(np.intp)]
+    completed = ((columns >> (bits % _WORD_BITS)) & np.uint64(1)).astype(bool)
+    return student_ids, completed
+
+
+def prerequisite_matrix(index: CourseIndex) -> "np.ndarray":
+    """(chapters x chapters) bool matrix; [j, p] is set when p is a prerequisite of j."""
+
+    size = index.total_chapters
+    matrix = np.zeros((size, size), dtype=bool)
+    for position, prerequisites in enumerate(index.prerequisites):
+        matrix[position, list(prerequisites)] = True
+    return matrix
+
+
+def compute_cohort_analytics(
+    index: CourseIndex,
+    records: Iterable[Tuple[str, ProgressRecord]],
+    top_n: int = 10,
+) -> Dict[str, Any]:
+    """Compute completion, next-chapter, sequencing and pacing statistics for a cohort.
+
+    A student's next chapter follows the tracker's rule: the first chapter in
+    course order that is uncompleted and has no missing prerequisites. A
+    student is *out of sequence* when the first uncompleted chapter in course
+    order still misses prerequisites, so the tracker recommends a different
+    chapter than the course order suggests.
+
+    Args:
+        index: Compiled course index
+        records: ``(student_id, record)`` pairs for every student
+        top_n: Maximum student ids listed per category
+
+    Returns:
+        Dict with per-chapter completion rates and next-chapter counts, a
+        completed-count histogram, out-of-sequence students and pacing outliers
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for cohort analytics: pip install numpy")
+
+    student_ids, completed = completion_matrix(index, records)
+    students, chapters = completed.shape
+    if students == 0:
+        return {"student_count": 0, "chapter_count": chapters}
+
+    prerequisites = prerequisite_matrix(index)
+    # missing[i, j]: prerequisites of chapter j that student i has not completed
+    missing = (~completed).astype(np.int32) @ prerequisites.T.astype(np.int32)
+
+    completed_counts = completed.sum(axis=1)
+    finished = completed_counts == chapters
+    unlocked = ~completed & (missing == 0)
+    has_next = unlocked.any(axis=1)
+    # Same rule as the tracker's next_chapter: first unlocked uncompleted chapter
+    next_position = np.argmax(unlocked, axis=1)
+    first_gap = np.argmin(completed, axis=1)
+    rows = np.arange(students)
+    out_of_sequence = ~finished & (missing[rows, first_gap] > 0)
+    out_of_order = completed & (missing > 0)
+
+    median = float(np.median(completed_counts))
+    mad = float(np.median(np.abs(completed_counts - median)))
+    if mad > 0:
+        z_scores = 0.6745 * (completed_counts - median) / mad
+    else:
+        z_scores = np.zeros(students)
+    ahead = np.flatnonzero(z_scores > _OUTLIER_Z)
+    behind = np.flatnonzero(z_scores < -_OUTLIER_Z)
+
+    def _ids(positions: "np.ndarray", order_key: "np.ndarray") -> List[str]:
+        ranked = positions[np.argsort(order_key[positions], kind="stable")]
+        return [student_ids[i] for i in ranked[:top_n]]
+
+    sequence_rows = np.flatnonzero(out_of_sequence)
+    completion_rates = completed.mean(axis=0)
+    next_by_chapter = np.bincount(next_position[has_next], minlength=chapters)
+    locked_gap_by_chapter = np.bincount(first_gap[sequence_rows], minlength=chapters)
+
+    return {
+        "student_count": students,
+        "chapter_count": chapters,
+        "chapters": [
+            {
+                "chapter_id": index.order[position],
+                "title": index.summaries[position]["title"],
+                "completion_rate": round(float(completion_rates[position]), 3),
+                "completed_count": int(completed[:, position].sum()),
+                "next_count": int(next_by_chapter[position]),
+                "locked_first_gap_count": int(locked_gap_by_chapter[position]),
+                "completed_without_prerequisites": int(out_of_order[:, position].sum()),
+            }
+            for position in range(chapters)
+        ],
+        "completed_count_histogram": np.bincount(completed_counts, minlength=chapters + 1).tolist(),
+        "finished_count": int(finished.sum()),
+        "mean_progress_pct": round(float(completed_counts.mean()) / chapters * 100, 1),
+        "out_of_sequence": {
+            "count": int(sequence_rows.size),
+            "no_next_chapter_count": int((~finished & ~has_next).sum()),
+            "student_ids": _ids(sequence_rows, completed_counts),
+        },
+        "pacing": {
+            "median_completed": median,
+            "mad_completed": mad,
+            "ahead_count": int(ahead.size),
+            "behind_count": int(behind.size),
+            "ahead_student_ids": _ids(ahead, -completed_counts),
+            "behind_student_ids": _ids(behind, completed_counts),
+        },
+    }
+
+
+__all__ = [
+    "completion_matrix",
+    "prerequisite_matrix",
+    "compute_cohort_analytics",
+]
@@ -60,7 +60,10 @@ GCS_DEFAULT_STORAGE_CLASS = _env("GCS_DEFAULT_STORAGE_CLASS", "STANDARD")
 GCS_DEFAULT_LOCATION = _env("GCS_DEFAULT_LOCATION", "US")
 GCS_LIST_BUCKETS_MAX_RESULTS = _env_int("GCS_LIST_BUCKETS_MAX_RESULTS", 50)
 GCS_LIST_BLOBS_MAX_RESULTS = _env_int("GCS_LIST_BLOBS_MAX_RESULTS", 100)
+GCS_SUMMARY_PAGE_SIZE = _env_int("GCS_SUMMARY_PAGE_SIZE", 1000)  # Objects per page when aggregating bucket summaries
 GCS_DEFAULT_CONTENT_TYPE = _env("GCS_DEFAULT_CONTENT_TYPE", "application/pdf")
+GCS_MANIFEST_TTL_SECONDS = _env_float("GCS_MANIFEST_TTL_SECONDS", 300.0)  # Reuse a bucket manifest this long before refreshing
+GCS_MANIFEST_CACHE_DIR = _env("GCS_MANIFEST_CACHE_DIR")  # Optional directory persisting manifests across restarts
 
 # RAG Corpus Settings
 RAG_DEFAULT_EMBEDDING_MODEL = _env("RAG_DEFAULT_EMBEDDING_MODEL", "text-embedding-004")
@@ -70,10 +73,46 @@ RAG_DEFAULT_VECTOR_DISTANCE_THRESHOLD = _env_float(
     "RAG_DEFAULT_VECTOR_DISTANCE_THRESHOLD", 0.5
 )
 RAG_DEFAULT_PAGE_SIZE = _env_int("RAG_DEFAULT_PAGE_SIZE", 50)
+RAG_IMPORT_BATCH_SIZE = _env_int("RAG_IMPORT_BATCH_SIZE", 25)  # GCS URIs per import_files request
 
 # Performance Settings
 CORPUS_SEARCH_TIMEOUT = _env_float("RAG_CORPUS_SEARCH_TIMEOUT", 10.0)  # Search timeout in seconds
 MAX_SEARCH_WORKERS = _env_int("RAG_MAX_SEARCH_WORKERS", 4)  # Max concurrent search workers
+RAG_BULK_MAX_WORKERS = _env_int("RAG_BULK_MAX_WORKERS", 8)  # Max concurrent calls for bulk file/corpus operations
+
+# Local Ingestion Settings
+INGEST_CHUNK_TOKENS = _env_int("RAG_INGEST_CHUNK_TOKENS", 512)  # Tokens per chunk
+INGEST_CHUNK_OVERLAP_TOKENS = _env_int("RAG_INGEST_CHUNK_OVERLAP_TOKENS", 64)  # Tokens shared by neighbouring chunks
+INGEST_WORKERS = _env_int("RAG_INGEST_WORKERS", os.cpu_count() or 4)  # PDF extraction processes
+INGEST_PAGES_PER_TASK = _env_int("RAG_INGEST_PAGES_PER_TASK", 8)  # Pages extracted per worker task
+
+# Progress Store Settings
+PROGRESS_BACKEND = _env("RAG_PROGRESS_BACKEND", "sqlite")  # sqlite | events | memory
+PROGRESS_DB_PATH = _env(
+    "RAG_PROGRESS_DB_PATH", str(Path(__file__).resolve().parents[1] / "data" / "progress.sqlite3")
+)
+PROGRESS_EVENT_DIR = _env(
+    "RAG_PROGRESS_EVENT_DIR", str(Path(__file__).resolve().parents[1] / "data" / "progress_events")
+)  # Event log + snapshot directory for the events backend
+PROGRESS_SNAPSHOT_EVERY = _env_int("RAG_PROGRESS_SNAPSHOT_EVERY", 10000)  # Logged events between compacted snapshots (0 = only on close)
+PROGRESS_FLUSH_INTERVAL = _env_float("RAG_PROGRESS_FLUSH_INTERVAL", 0.5)  # Seconds between write-behind commits
+PROGRESS_BATCH_SIZE = _env_int("RAG_PROGRESS_BATCH_SIZE", 500)  # Pending students that trigger an early commit
+PROGRESS_CACHE_SIZE = _env_int("RAG_PROGRESS_CACHE_SIZE", 10000)  # Students kept in the read-through cache
+PROGRESS_LOCK_STRIPES = _env_int("RAG_PROGRESS_LOCK_STRIPES", 256)  # Striped locks serializing per-student updates
+PROGRESS_MAX_NOTES = _env_int("RAG_PROGRESS_MAX_NOTES", 20)  # Most recent notes kept per student (0 = unbounded)
+
+# Course Registry Settings
+COURSE_PATH = _env(
+    "RAG_COURSE_PATH", str(Path(__file__).resolve().parents[1] / "data" / "course.json")
+)  # Default course, used when a tool call gives no unit_id
+COURSE_DIR = _env(
+    "RAG_COURSE_DIR", str(Path(__file__).resolve().parents[1] / "data" / "courses")
+)  # One <unit_id>.json per additional unit
+COURSE_CACHE_SIZE = _env_int("RAG_COURSE_CACHE_SIZE", 32)  # Parsed courses kept in memory (LRU)
+COURSE_BINARY_CACHE_DIR = _env("RAG_COURSE_BINARY_CACHE_DIR")  # Optional directory for mmap-able parsed course caches
+CHAPTER_MATCH_THRESHOLD = _env_float("RAG_CHAPTER_MATCH_THRESHOLD", 0.6)  # Minimum confidence for fuzzy chapter-label matches
+CHAPTER_MATCH_MARGIN = _env_float("RAG_CHAPTER_MATCH_MARGIN", 0.1)  # Fuzzy matches closer than this to the runner-up are ambiguous
+COURSE_RELOAD_INTERVAL = _env_float("RAG_COURSE_RELOAD_INTERVAL", 2.0)  # Seconds between course file change checks (0 = never reload)
 
 # Agent Settings
 AGENT_NAME = _env("RAG_AGENT_NAME", "rag_corpus_manager")
@@ -82,10 +121,42 @@ ROUTING_MODEL = _env("RAG_ROUTING_MODEL", "gemini-2.0-flash-lite")  # Lightweigh
 AGENT_OUTPUT_KEY = _env("RAG_AGENT_OUTPUT_KEY", "last_response")
 
 # Context Management
-MAX_HISTORY_TURNS = _env_int("RAG_MAX_HISTORY_TURNS", 5)  # Limit conversation history to reduce token usage
+MAX_HISTORY_TOKENS = _env_int("RAG_MAX_HISTORY_TOKENS", 8000)  # Token budget for conversation history per request (0 = unlimited)
+HISTORY_SUMMARY_TOKENS = _env_int("RAG_HISTORY_SUMMARY_TOKENS", 256)  # Budget for summaries of evicted turns (0 = drop them)
 
 # Logging Settings
 LOG_LEVEL = _env("LOG_LEVEL", "INFO")
 LOG_FORMAT = _env(
     "LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+
+# Metrics Settings
+METRICS_RECENT_SAMPLES = _env_int("RAG_METRICS_RECENT_SAMPLES", 1000)  # Raw latency samples kept in the ring buffer
+METRICS_SKETCH_ACCURACY = _env_float("RAG_METRICS_SKETCH_ACCURACY", 0.01)  # Relative error of latency percentiles
+METRICS_PORT = _env_int("RAG_METRICS_PORT", 0)  # Serve OpenMetrics on http://<host>:<port>/metrics (0 = off)
+METRICS_HOST = _env("RAG_METRICS_HOST", "127.0.0.1")  # Bind address of the metrics endpoint
+METRICS_DUMP_PATH = _env("RAG_METRICS_DUMP_PATH")  # Optional file rewritten with the OpenMetrics exposition
+METRICS_DUMP_INTERVAL = _env_float("RAG_METRICS_DUMP_INTERVAL", 15.0)  # Seconds between metric file dumps
+SLOW_OPERATION_MS = _env_float("RAG_SLOW_OPERATION_MS", 1000.0)  # Operations logged as SLOW above this duration
+
+# Slow-Operation Profiler (opt-in)
+PROFILE_SLOW_MS = _env_float("RAG_PROFILE_SLOW_MS", 0.0)  # Stack-sample log_latency blocks running longer than this (0 = off)
+PROFILE_INTERVAL_MS = _env_float("RAG_PROFILE_INTERVAL_MS", 5.0)  # Milliseconds between stack samples
+PROFILE_DIR = _env("RAG_PROFILE_DIR", "profiles")  # Folded-stack profiles and JSON sidecars land here
+PROFILE_MAX_FILES = _env_int("RAG_PROFILE_MAX_FILES", 100)  # Profiles written per process before profiling stops
+
+# Tracing Settings
+TRACE_SAMPLE_RATE = _env_float("RAG_TRACE_SAMPLE_RATE", 0.0)  # Fraction of agent turns traced as span trees (0 = off)
+TRACE_BUFFER_SPANS = _env_int("RAG_TRACE_BUFFER_SPANS", 10000)  # Finished spans kept in memory for export
+TRACE_EXPORT_DIR = _env("RAG_TRACE_EXPORT_DIR")  # Optional directory receiving Chrome and OTLP trace files at exit
+
+# LLM Accounting
+LLM_USAGE_SESSIONS = _env_int("RAG_LLM_USAGE_SESSIONS", 1000)  # Most recently active sessions with token totals kept
+
+# Memory Profiling
+MEMORY_SNAPSHOT_INTERVAL = _env_float("RAG_MEMORY_SNAPSHOT_INTERVAL", 0.0)  # Seconds between tracemalloc reports (0 = only on SIGUSR2 / tool)
+MEMORY_TRACE_FRAMES = _env_int("RAG_MEMORY_TRACE_FRAMES", 1)  # Stack frames tracemalloc records per allocation
+MEMORY_TOP_N = _env_int("RAG_MEMORY_TOP_N", 15)  # Allocation sites listed per memory report
+MEMORY_REPORT_DIR = _env("RAG_MEMORY_REPORT_DIR")  # Optional directory receiving memory reports as JSON
+MEMORY_TRACE_IDLE_STOP = _env_float("RAG_MEMORY_TRACE_IDLE_STOP", 900.0)  # Stop tracemalloc this long after the last on-demand report (0 = never)
+MEMORY_DIAGNOSTICS = _env_int("RAG_MEMORY_DIAGNOSTICS", 0) == 1  # Give the root agent the get_memory_report tool (operators only)
@@ -0,0 +1,565 @@
+"""Compiled course indexes and a lazily loaded, multi-unit course registry."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import marshal
+import mmap
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from rag.chapter_labels import ChapterLabelIndex
+from rag.config import (
+    COURSE_BINARY_CACHE_DIR,
+    COURSE_CACHE_SIZE,
+    COURSE_DIR,
+    COURSE_PATH,
+    COURSE_RELOAD_INTERVAL,
+)
+from rag.progress_store import chapter_codec
+from rag.utils.latency_logger import log_latency
+from rag.utils.memory_profiler import register_store
+from rag.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# Registry key of the default course (RAG_COURSE_PATH)
+_DEFAULT_KEY = "__default__"
+
+
+@dataclass(frozen=True)
+class CourseIndex:
+    """Immutable, precompiled view of course.json.
+
+    Everything the tools need per call is built once at load time: chapter
+    ranks replace ``list.index`` scans, chapter summaries and the outline
+    payload are pre-built, and prerequisites are stored as a DAG of ranks.
+    Summaries and the outline are shared between calls and must be treated
+    as read-only. ``labels`` resolves free-form chapter references (see
+    ``ChapterLabelIndex``). ``version`` is a content hash of course.json; outline
+    variants are memoized in ``outline_cache`` so each is built once per
+    course version.
+
+    ``bits[rank]`` is the chapter's bit in progress masks (see
+    ``ChapterCodec``); ``course_mask`` covers every chapter of this outline.
+    When ``rank_ordered`` is set, bit == rank and snapshots use pure bit
+    arithmetic.
+
+    The prerequisite DAG is precompiled too: ``topo_ranks[rank]`` is the
+    chapter's depth (longest prerequisite chain) and
+    ``prerequisite_masks[rank]`` holds the bits a student must have before
+    the chapter unlocks.
+    """
+    course: Mapping[str, Any]
+    order: Tuple[str, ...]
+    rank: Mapping[str, int]
+    aliases: Mapping[str, str]
+    summaries: Tuple[Dict[str, Any], ...]
+    prerequisites: Tuple[Tuple[int, ...], ...]
+    outline: Dict[str, Any]
+    bits: Tuple[int, ...]
+    rank_of_bit: Mapping[int, int]
+    course_mask: int
+    rank_ordered: bool
+    topo_ranks: Tuple[int, ...]
+    prerequisite_masks: Tuple[int, ...]
+    briefs: Tuple[Dict[str, Any], ...]
+    labels: ChapterLabelIndex
+    version: str
+    outline_cache: Dict[Tuple[str, Optional[str], bool], Dict[str, Any]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    unlocked_cache: Dict[int, Tuple[int, ...]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    @property
+    def total_chapters(self) -> int:
+        return len(self.order)
+
+    @property
+    def unit_id(self) -> str:
+        return self.course.get("unit_id") or "default"
+
+
+def _topological_ranks(prerequisites: Tuple[Tuple[int, ...], ...]) -> Tuple[int, ...]:
+    """Depth of each chapter in the prerequisite DAG (Kahn's algorithm).
+
+    Raises:
+        ValueError: If the prerequisites contain a cycle
+    """
+    dependents: List[List[int]] = [[] for _ in prerequisites]
+    pending = [len(set(prereqs)) for prereqs in prerequisites]
+    for position, prereqs in enumerate(prerequisites):
+        for prereq in set(prereqs):
+            dependents[prereq].append(position)
+
+    depth = [0] * len(prerequisites)
+    ready = [position for position, count in enumerate(pending) if count == 0]
+    visited = 0
+    while ready:
+        position = ready.pop()
+        visited += 1
+        for dependent in dependents[position]:
+            depth[dependent] = max(depth[dependent], depth[position] + 1)
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                ready.append(dependent)
+
+    if visited != len(prerequisites):
+        cyclic = [position for position, count in enumerate(pending) if count]
+        raise ValueError(f"course.json prerequisites contain a cycle through ranks {cyclic}")
+    return tuple(depth)
+
+
+def _build_label_index(
+    chapter_by_id: Dict[str, Dict[str, Any]],
+    aliases: Dict[str, str],
+) -> ChapterLabelIndex:
+    labels: List[Tuple[str, str, float]] = []
+    orders: Dict[str, str] = {}
+    weeks: Dict[str, str] = {}
+    for cid, chapter in chapter_by_id.items():
+        for label in (cid, chapter.get("title"), chapter.get("week_label")):
+            if label:
+                labels.append((label, cid, 1.0))
+        if chapter.get("order") is not None:
+            orders[str(chapter["order"])] = cid
+        week = re.search(r"\d+", chapter.get("week_label") or "")
+        if week:
+            weeks.setdefault(week.group(), cid)
+        for concept in chapter.get("key_concepts", []):
+            # "Agile Manifesto Values: Individuals and ... (Page 9)" -> "Agile Manifesto Values"
+            name = concept.split(":", 1)[0].strip()
+            if name and len(name) <= 60:
+                labels.append((name, cid, ChapterLabelIndex.KEY_CONCEPT_WEIGHT))
+    return ChapterLabelIndex(aliases, labels, orders, weeks)
+
+
+def compile_course_index(course_json: Dict[str, Any], version: str = "") -> CourseIndex:
+    """Build the immutable course index from parsed course.json data."""
+    chapters = sorted(course_json.get("chapters", []), key=lambda c: c.get("order", 0))
+    course_json["chapters"] = chapters
+
+    order: List[str] = []
+    aliases: Dict[str, str] = {}
+    chapter_by_id: Dict[str, Dict[str, Any]] = {}
+    for chapter in chapters:
+        cid = (chapter.get("chapter_id") or "").strip()
+        if not cid:
+            continue
+        normalized_id = cid.lower()
+        order.append(normalized_id)
+        chapter_by_id[normalized_id] = chapter
+
+        title = (chapter.get("title") or "").lower()
+        week_label = (chapter.get("week_label") or "").lower()
+        # "chapter N" is not an alias: N may be the course order or the textbook
+        # chapter id, which ChapterLabelIndex weighs against each other
+        for alias in (normalized_id, title, week_label):
+            if alias:
+                aliases[alias] = normalized_id
+
+    rank = {cid: position for position, cid in enumerate(order)}
+    summaries = tuple(
+        {
+            "chapter_id": chapter_by_id[cid].get("chapter_id"),
+            "title": chapter_by_id[cid].get("title"),
+            "order": chapter_by_id[cid].get("order"),
+            "week_label": chapter_by_id[cid].get("week_label"),
+            "learning_outcomes": chapter_by_id[cid].get("learning_outcomes", []),
+        }
+        for cid in order
+    )
+    prerequisites = tuple(
+        tuple(
+            rank[prereq.strip().lower()]
+            for prereq in chapter_by_id[cid].get("prerequisites", [])
+            if prereq and prereq.strip().lower() in rank
+        )
+        for cid in order
+    )
+    outline = {
+        "version": version,
+        "unit_id": course_json.get("unit_id"),
+        "unit_name": course_json.get("unit_name"),
+        "description": course_json.get("description"),
+        "learning_outcomes_overall": course_json.get("learning_outcomes_overall", []),
+        "chapters": [
+            {
+                "chapter_id": chapter.get("chapter_id"),
+                "title": chapter.get("title"),
+                "order": chapter.get("order"),
+                "week_label": chapter.get("week_label"),
+                "learning_outcomes": chapter.get("learning_outcomes", []),
+                "prerequisites": chapter.get("prerequisites", []),
+            }
+            for chapter in chapters
+        ],
+    }
+
+    codec = chapter_codec(course_json.get("unit_id") or "default")
+    bits = tuple(codec.bit(cid) for cid in order)
+    topo_ranks = _topological_ranks(prerequisites)
+
+    return CourseIndex(
+        course=MappingProxyType(course_json),
+        order=tuple(order),
+        rank=MappingProxyType(rank),
+        aliases=MappingProxyType(aliases),
+        summaries=summaries,
+        prerequisites=prerequisites,
+        outline=outline,
+        bits=bits,
+        rank_of_bit=MappingProxyType({bit: position for position, bit in enumerate(bits)}),
+        course_mask=sum(1 << bit for bit in bits),
+        rank_ordered=all(bit == position for position, bit in enumerate(bits)),
+        topo_ranks=topo_ranks,
+        prerequisite_masks=tuple(
+            sum(1 << bits[prereq] for prereq in set(prereqs)) for prereqs in prerequisites
+        ),
+        briefs=tuple(
+            {key: summary[key] for key in ("chapter_id", "title", "order")} for summary in summaries
+        ),
+        labels=_build_label_index(chapter_by_id, aliases),
+        version=version,
+    )
+
+
+def validate_course(course_json: Dict[str, Any]) -> None:
+    """Reject course data that would compile into a broken index.
+
+    Raises:
+        ValueError: On missing/duplicate chapter ids or unknown prerequisites
+            (cycles are rejected by ``_topological_ranks`` during compilation)
+    """
+    chapters = course_json.get("chapters")
+    if not isinstance(chapters, list) or not chapters:
+        raise ValueError("course.json must define a non-empty 'chapters' list")
+
+    seen = set()
+    for chapter in chapters:
+        cid = (chapter.get("chapter_id") or "").strip().lower()
+        if not cid:
+            raise ValueError(f"Chapter without chapter_id: {chapter.get('title')!r}")
+        if cid in seen:
+            raise ValueError(f"Duplicate chapter_id: {cid}")
+        seen.add(cid)
+
+    for chapter in chapters:
+        unknown = [
+            prereq for prereq in chapter.get("prerequisites", [])
+            if (prereq or "").strip().lower() not in seen
+        ]
+        if unknown:
+            raise ValueError(f"{chapter['chapter_id']} has unknown prerequisites: {unknown}")
+
+
+def _file_stat(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _BinaryCourseCache:
+    """Compact on-disk copy of parsed course files, read back through mmap.
+
+    Each file is a fixed header (magic, source mtime_ns, source size, content
+    version) followed by the marshalled course dict. A header matching the
+    source file's stat skips both reading the JSON and parsing it.
+    """
+
+    _HEADER = struct.Struct("<8sqq12s")
+    _MAGIC = b"RAGCRS01"
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.course.bin"
+
+    def load(self, key: str, stat: Tuple[int, int]) -> Optional[Tuple[Dict[str, Any], str]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle, mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                magic, mtime_ns, size, version = self._HEADER.unpack_from(mapped)
+                if magic != self._MAGIC or (mtime_ns, size) != stat:
+                    return None
+                view = memoryview(mapped)
+                try:
+                    course_json = marshal.loads(view[self._HEADER.size:])
+                finally:
+                    view.release()
+            return course_json, version.decode("ascii")
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            return None
+
+    def store(
+        self,
+        key: str,
+        stat: Tuple[int, int],
+        version: str,
+        course_json: Dict[str, Any],
+    ) -> None:
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            header = self._HEADER.pack(self._MAGIC, stat[0], stat[1], version.encode("ascii"))
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(header + marshal.dumps(course_json))
+            tmp_path.replace(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not write course cache {path}: {e}")
+
+
+@dataclass(frozen=True, slots=True)
+class _CourseEntry:
+    path: Path
+    stat: Tuple[int, int]
+    index: CourseIndex
+
+
+class CourseRegistry:
+    """Course indexes keyed by unit_id, loaded lazily and evicted LRU.
+
+    ``get(None)`` returns the default course (``RAG_COURSE_PATH``); other
+    units resolve to ``<RAG_COURSE_DIR>/<unit_id>.json`` and are only parsed
+    on first use. At most ``capacity`` parsed courses stay in memory. Loaded
+    entries are replaced wholesale on reload, so readers holding an index
+    keep a consistent view.
+    """
+
+    def __init__(
+        self,
+        default_path: Path,
+        course_dir: Optional[Path] = None,
+        capacity: int = COURSE_CACHE_SIZE,
+        binary_cache_dir: Optional[Path] = None,
+    ) -> None:
+        self.default_path = default_path
+        self.course_dir = course_dir
+        self.capacity = max(capacity, 1)
+        self._binary_cache = _BinaryCourseCache(binary_cache_dir) if binary_cache_dir else None
+        self._entries: "OrderedDict[str, _CourseEntry]" = OrderedDict()
+        self._default_key: Optional[str] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _resolve_path(self, key: Optional[str]) -> Tuple[str, Path]:
+        if key is None:
+            return _DEFAULT_KEY, self.default_path
+        if self.course_dir is not None:
+            candidate = self.course_dir / f"{key}.json"
+            if candidate.exists():
+                return key, candidate
+            for path in self.course_dir.glob("*.json"):
+                if path.stem.lower() == key:
+                    return key, path
+        if key == self._default_unit_key():
+            return _DEFAULT_KEY, self.default_path
+        raise ValueError(f"Unknown unit_id: {key}")
+
+    def _default_unit_key(self) -> str:
+        if self._default_key is None:
+            self._default_key = self.get(None).unit_id.lower()
+        return self._default_key
+
+    def _cached(self, key: str) -> Optional[_CourseEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _publish(self, key: str, entry: _CourseEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                _, evicted = self._entries.popitem(last=False)
+                logger.info(f"Evicted course {evicted.index.unit_id} from the registry")
+
+    def _read(self, key: str, path: Path, current: Optional[CourseIndex] = None) -> _CourseEntry:
+        """Load ``path``; reuse ``current`` (and its warm caches) when the content hash matches it."""
+        stat = _file_stat(path)
+        cached = self._binary_cache.load(key, stat) if self._binary_cache else None
+        if cached is not None:
+            course_json, version = cached
+            if current is not None and version == current.version:
+                return _CourseEntry(path, stat, current)
+            return _CourseEntry(path, stat, compile_course_index(course_json, version))
+
+        raw = path.read_bytes()
+        version = hashlib.sha256(raw).hexdigest()[:12]
+        if current is not None and version == current.version:
+            # Touched but not edited: skip parsing and compiling
+            return _CourseEntry(path, stat, current)
+        course_json = json.loads(raw)
+        validate_course(course_json)
+        index = compile_course_index(course_json, version)
+        if self._binary_cache:
+            self._binary_cache.store(key, stat, version, course_json)
+        return _CourseEntry(path, stat, index)
+
+    def get(self, unit_id: Optional[str] = None) -> CourseIndex:
+        """Return the course index for ``unit_id`` (default course when None).
+
+        Raises:
+            ValueError: If no course file exists for the unit or it is invalid
+        """
+        key = unit_id.strip().lower() if unit_id and unit_id.strip() else None
+        entry = self._cached(key or _DEFAULT_KEY)
+        if entry is None and key is not None and key == self._default_key:
+            entry = self._cached(_DEFAULT_KEY)
+        if entry is not None:
+            increment("rag_cache_requests", cache="course_registry", result="hit")
+            return entry.index
+
+        key, path = self._resolve_path(key)
+        with self._load_lock:
+            entry = self._cached(key)
+            if entry is None:
+                increment("rag_cache_requests", cache="course_registry", result="miss")
+                with log_latency("course_load", unit_id=key, path=str(path)):
+                    entry = self._read(key, path)
+                self._publish(key, entry)
+                _start_course_watcher(self)
+            else:
+                # Another caller loaded it while we waited for the load lock
+                increment("rag_cache_requests", cache="course_registry", result="shared_refresh")
+        return entry.index
+
+    def reload(self, unit_id: Optional[str] = None, force: bool = False) -> bool:
+        """Rebuild a loaded course if its file changed on disk.
+
+        The new index is compiled and validated off to the side and published
+        with a single entry replacement, so readers keep using whichever index
+        they already hold and never see a partially built one. An invalid file
+        is logged and skipped; the current index stays in service.
+
+        Args:
+            unit_id: Course to reload (default course when None)
+            force: Re-read the file even if its mtime and size are unchanged (an
+                unchanged content hash still keeps the current index)
+
+        Returns:
+            True when a new course version was swapped in
+        """
+        key = unit_id.strip().lower() if unit_id else _DEFAULT_KEY
+        if key == self._default_key:
+            key = _DEFAULT_KEY
+        current = self._cached(key)
+        if current is None:
+            return False
+
+        with self._load_lock:
+            current = self._cached(key) or current
+            stat = current.stat
+            try:
+                stat = _file_stat(current.path)
+                if not force and stat == current.stat:
+                    return False
+                with log_latency("course_reload", unit_id=key, path=str(current.path)):
+                    entry = self._read(key, current.path, current.index)
+            except (OSError, ValueError) as e:
+                logger.error(f"Keeping current course index; failed to reload {current.path}: {e}")
+                # Remember the stat so a broken file is not re-parsed every poll
+                self._publish(key, _CourseEntry(current.path, stat, current.index))
+                return False
+
+            if entry.index is current.index:
+                # Same content; keep the warm index, just remember the new stat
+                self._publish(key, entry)
+                return False
+            self._publish(key, entry)
+
+        logger.info(
+            f"Loaded course {entry.index.unit_id} version {entry.index.version} "
+            f"({entry.index.total_chapters} chapters)"
+        )
+        return True
+
+    def reload_changed(self) -> List[str]:
+        """Reload every in-memory course whose file changed; return the reloaded keys."""
+        with self._lock:
+            keys = list(self._entries)
+        return [key for key in keys if self.reload(None if key == _DEFAULT_KEY else key)]
+
+    def loaded_units(self) -> List[str]:
+        with self._lock:
+            return [entry.index.unit_id for entry in self._entries.values()]
+
+    def memory_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "courses": len(self._entries),
+                "chapters": sum(entry.index.total_chapters for entry in self._entries.values()),
+                "unlocked_cache_entries": sum(len(entry.index.unlocked_cache) for entry in self._entries.values()),
+            }
+
+
+_REGISTRY: Optional[CourseRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+_COURSE_WATCHER: Optional[threading.Thread] = None
+
+
+def _watch_course_files(registry: CourseRegistry, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            registry.reload_changed()
+        except Exception:
+            logger.exception("Course reload watcher iteration failed")
+
+
+def _start_course_watcher(registry: CourseRegistry) -> None:
+    global _COURSE_WATCHER
+    if COURSE_RELOAD_INTERVAL <= 0 or registry is not _REGISTRY:
+        return
+    with _REGISTRY_LOCK:
+        if _COURSE_WATCHER is not None:
+            return
+        _COURSE_WATCHER = threading.Thread(
+            target=_watch_course_files,
+            args=(registry, COURSE_RELOAD_INTERVAL),
+            name="course-reload",
+            daemon=True,
+        )
+        _COURSE_WATCHER.start()
+
+
+def get_course_registry() -> CourseRegistry:
+    """Return the process-wide registry configured from ``RAG_COURSE_*`` settings."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = CourseRegistry(
+                    default_path=Path(COURSE_PATH),
+                    course_dir=Path(COURSE_DIR) if COURSE_DIR else None,
+                    capacity=COURSE_CACHE_SIZE,
+                    binary_cache_dir=Path(COURSE_BINARY_CACHE_DIR) if COURSE_BINARY_CACHE_DIR else None,
+                )
+    return _REGISTRY
+
+
+register_store("course_registry", lambda: _REGISTRY.memory_counts() if _REGISTRY is not None else {})
+
+
+__all__ = [
+    "CourseIndex",
+    "CourseRegistry",
+    "compile_course_index",
+    "validate_course",
+    "get_course_registry",
+]
@@ -0,0 +1,328 @@
+"""Local pre-chunking pipeline for course PDFs.
+
+Extracts text page by page in a process pool, splits it into overlapping
+token-count chunks, tags each chunk with the ``content_reference`` pages from
+``data/course.json`` and writes compact JSONL chunk files. The same files can
+be imported into a corpus or loaded back with ``iter_chunks`` to seed a local
+retrieval index.
+
+Usage:
+    python -m rag.ingestion slides/*.pdf --output-dir build/chunks
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rag.config import (
+    INGEST_CHUNK_OVERLAP_TOKENS,
+    INGEST_CHUNK_TOKENS,
+    INGEST_PAGES_PER_TASK,
+    INGEST_WORKERS,
+)
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\S+")
+_PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class Chunk:
+    """Single chunk of extracted text with its source metadata."""
+    chunk_id: str
+    text: str
+    token_count: int
+    page_start: int
+    page_end: int
+    file_name: str
+    content_reference: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class IngestionStats:
+    """Throughput figures for one pipeline run."""
+    documents: int = 0
+    pages: int = 0
+    chunks: int = 0
+    tokens: int = 0
+    elapsed_s: float = 0.0
+    outputs: List[str] = field(default_factory=list)
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        payload["pages_per_sec"] = round(self.pages_per_sec, 2)
+        return payload
+
+
+def _course_path() -> Path:
+    return Path(__file__).resolve().parent / "data" / "course.json"
+
+
+def load_content_references(course_path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Map source file names to the chapter metadata declared in course.json."""
+
+    course = json.loads((course_path or _course_path()).read_text())
+    references: Dict[str, Dict[str, Any]] = {}
+    for chapter in course.get("chapters", []):
+        reference = chapter.get("content_reference") or {}
+        file_name = reference.get("file_name")
+        if not file_name:
+            continue
+        references[file_name.lower()] = {
+            "chapter_id": chapter.get("chapter_id"),
+            "title": chapter.get("title"),
+            "source_type": reference.get("source_type"),
+            "file_name": file_name,
+            "pages": reference.get("pages", []),
+        }
+    return references
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Worker task: extract text for pages [start, stop) of one PDF."""
+
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def _page_count(path: Path) -> int:
+    return len(PdfReader(str(path)).pages)
+
+
+def extract_pages(
+    paths: Sequence[Path],
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+) -> Dict[Path, List[str]]:
+    """Extract page text for every PDF, fanning page ranges out to a process pool.
+
+    Args:
+        paths: PDF files to extract
+        workers: Process count (default: INGEST_WORKERS)
+        pages_per_task: Pages handled by one worker task (default: INGEST_PAGES_PER_TASK)
+
+    Returns:
+        Dict mapping each path to its page texts in page order
+    """
+    if PdfReader is None:
+        raise RuntimeError("pypdf is required for local ingestion: pip install pypdf")
+    if workers is None:
+        workers = INGEST_WORKERS
+    if pages_per_task is None:
+        pages_per_task = INGEST_PAGES_PER_TASK
+
+    # Pages are collected per path, so a repeated path would get its pages twice
+    paths = list(dict.fromkeys(paths))
+    tasks: List[Tuple[Path, int, int]] = []
+    for path in paths:
+        total = _page_count(path)
+        for start in range(0, total, pages_per_task):
+            tasks.append((path, start, min(start + pages_per_task, total)))
+
+    pages: Dict[Path, List[str]] = {path: [] for path in paths}
+    if not tasks:
+        return pages
+
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as executor:
+        futures = [
+            executor.submit(_extract_page_range, str(path), start, stop)
+            for path, start, stop in tasks
+        ]
+        # Tasks were queued in page order, so collecting in submission order keeps it
+        for (path, _, _), future in zip(tasks, futures):
+            pages[path].extend(future.result())
+    return pages
+
+
+def chunk_pages(
+    pages: Sequence[str],
+    file_name: str,
+    chunk_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    content_reference: Optional[Dict[str, Any]] = None,
+) -> List[Chunk]:
+    """Split a document's pages into overlapping chunks of ``chunk_tokens`` tokens.
+
+    Tokens are whitespace-delimited words; chunk text is sliced from the
+    original page text so line breaks survive. Chunks may span pages and carry
+    the 1-based page range they cover.
+    """
+    if chunk_tokens is None:
+        chunk_tokens = INGEST_CHUNK_TOKENS
+    if overlap_tokens is None:
+        overlap_tokens = INGEST_CHUNK_OVERLAP_TOKENS
+    if chunk_tokens <= 0:
+        raise ValueError("chunk_tokens must be positive")
+    overlap_tokens = max(0, min(overlap_tokens, chunk_tokens - 1))
+
+    document = _PAGE_SEPARATOR.join(pages)
+    page_offsets: List[int] = []
+    offset = 0
+    for page in pages:
+        page_offsets.append(offset)
+        offset += len(page) + len(_PAGE_SEPARATOR)
+
+    spans = [match.span() for match in _TOKEN_PATTERN.finditer(document)]
+    reference_pages = set((content_reference or {}).get("pages", []))
+    stem = Path(file_name).stem
+    chunks: List[Chunk] = []
+    step = chunk_tokens - overlap_tokens
+
+    for start in range(0, len(spans), step):
+        window = spans[start:start + chunk_tokens]
+        page_start = bisect.bisect_right(page_offsets, window[0][0])
+        page_end = bisect.bisect_right(page_offsets, window[-1][0])
+
+        reference = None
+        if content_reference is not None:
+            reference = {
+                **{k: v for k, v in content_reference.items() if k != "pages"},
+                "pages": [
+                    page for page in range(page_start, page_end + 1)
+                    if not reference_pages or page in reference_pages
+                ],
+            }
+
+        chunks.append(Chunk(
+            chunk_id=f"{stem}-{len(chunks):05d}",
+            text=document[window[0][0]:window[-1][1]],
+            token_count=len(window),
+            page_start=page_start,
+            page_end=page_end,
+            file_name=file_name,
+            content_reference=reference,
+        ))
+        if start + chunk_tokens >= len(spans):
+            break
+    return chunks
+
+
+def write_chunk_file(chunks: Iterable[Chunk], output_path: Path) -> int:
+    """Write chunks as compact JSONL (one object per line) and return the count."""
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with output_path.open("w", encoding="utf-8") as handle:
+        for chunk in chunks:
+            payload = {k: v for k, v in asdict(chunk).items() if v is not None}
+            handle.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+            handle.write("\n")
+            count += 1
+    return count
+
+
+def iter_chunks(paths: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+    """Stream chunk dicts back from JSONL chunk files, e.g. to seed a local index."""
+
+    for path in paths:
+        with Path(path).open(encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def run_ingestion(
+    pdf_paths: Sequence[Path],
+    output_dir: Path,
+    chunk_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    workers: Optional[int] = None,
+    course_path: Optional[Path] = None,
+) -> IngestionStats:
+    """Extract, chunk and write every PDF; return throughput statistics.
+
+    Args:
+        pdf_paths: PDF files to ingest
+        output_dir: Directory receiving one ``<stem>.jsonl`` file per PDF
+        chunk_tokens: Tokens per chunk (default: INGEST_CHUNK_TOKENS)
+        overlap_tokens: Overlap between chunks (default: INGEST_CHUNK_OVERLAP_TOKENS)
+        workers: Extraction processes (default: INGEST_WORKERS)
+        course_path: Course outline providing content_reference metadata
+
+    Returns:
+        IngestionStats including pages_per_sec for benchmarking
+    """
+    start = time.perf_counter()
+    paths = list(dict.fromkeys(Path(p) for p in pdf_paths))
+    references = load_content_references(course_path)
+    pages_by_path = extract_pages(paths, workers=workers)
+
+    stats = IngestionStats(documents=len(paths))
+    for path in paths:
+        pages = pages_by_path[path]
+        reference = references.get(path.name.lower())
+        if reference is None:
+            logger.info(f"No content_reference for {path.name}; chunks carry page ranges only")
+        chunks = chunk_pages(
+            pages,
+            file_name=path.name,
+            chunk_tokens=chunk_tokens,
+            overlap_tokens=overlap_tokens,
+            content_reference=reference,
+        )
+        output_path = output_dir / f"{path.stem}.jsonl"
+        stats.chunks += write_chunk_file(chunks, output_path)
+        stats.tokens += sum(chunk.token_count for chunk in chunks)
+        stats.pages += len(pages)
+        stats.outputs.append(str(output_path))
+
+    stats.elapsed_s = time.perf_counter() - start
+    logger.info(
+        f"Ingested {stats.pages} pages into {stats.chunks} chunks "
+        f"in {stats.elapsed_s:.2f}s ({stats.pages_per_sec:.1f} pages/sec)"
+    )
+    return stats
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pre-chunk course PDFs for RAG import.")
+    parser.add_argument("pdfs", nargs="+", type=Path, help="PDF files to ingest")
+    parser.add_argument("--output-dir", type=Path, default=Path("chunks"))
+    parser.add_argument("--chunk-tokens", type=int, default=None)
+    parser.add_argument("--overlap-tokens", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    stats = run_ingestion(
+        args.pdfs,
+        args.output_dir,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        workers=args.workers,
+    )
+    print(json.dumps(stats.to_dict(), indent=2))
+
+
+__all__ = [
+    "Chunk",
+    "IngestionStats",
+    "load_content_references",
+    "extract_pages",
+    "chunk_pages",
+    "write_chunk_file",
+    "iter_chunks",
+    "run_ingestion",
+]
+
+
+if __name__ == "__main__":
+    main()
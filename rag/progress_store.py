@@ -0,0 +1,797 @@
+"""Pluggable persistence for student progress records.
+
+The progress tracker talks to a ``ProgressStore``; the backend is chosen by
+``RAG_PROGRESS_BACKEND``:
+
+- ``sqlite`` (default): SQLite in WAL mode with a write-behind queue that
+  coalesces updates per student and commits them in batches, plus a bounded
+  read-through LRU cache for hot students.
+- ``events``: append-only JSONL event log (the audit trail) with periodic
+  compacted snapshots, so a restart replays only the log tail.
+- ``memory``: process-local dict, lost on restart (tests, benchmarks).
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rag.utils.memory_profiler import register_store
+from rag.config import (
+    PROGRESS_BACKEND,
+    PROGRESS_BATCH_SIZE,
+    PROGRESS_CACHE_SIZE,
+    PROGRESS_DB_PATH,
+    PROGRESS_EVENT_DIR,
+    PROGRESS_FLUSH_INTERVAL,
+    PROGRESS_LOCK_STRIPES,
+    PROGRESS_MAX_NOTES,
+    PROGRESS_SNAPSHOT_EVERY,
+)
+
+logger = logging.getLogger(__name__)
+
+StoreKey = Tuple[str, str]
+
+
+class ChapterCodec:
+    """Append-only chapter-id <-> bit assignment for one unit.
+
+    A chapter keeps its bit for the life of the process, so masks stay valid
+    when the course outline is edited. Chapters registered in course order
+    get bits equal to their rank.
+    """
+
+    __slots__ = ("_bits", "_ids", "_lock")
+
+    def __init__(self) -> None:
+        self._bits: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def bit(self, chapter_id: str) -> int:
+        """Return the chapter's bit position, assigning the next free one if new."""
+        position = self._bits.get(chapter_id)
+        if position is not None:
+            return position
+        with self._lock:
+            position = self._bits.get(chapter_id)
+            if position is None:
+                position = len(self._ids)
+                self._ids.append(chapter_id)
+                self._bits[chapter_id] = position
+            return position
+
+    def mask(self, chapter_ids: Iterable[str]) -> int:
+        mask = 0
+        for chapter_id in chapter_ids:
+            mask |= 1 << self.bit(chapter_id)
+        return mask
+
+    def ids(self, mask: int) -> Tuple[str, ...]:
+        """Decode a mask into chapter ids, in bit order."""
+        return tuple(self._ids[position] for position in iter_bits(mask))
+
+
+_CODECS: Dict[str, ChapterCodec] = {}
+_CODECS_LOCK = threading.Lock()
+
+
+def chapter_codec(unit_id: str) -> ChapterCodec:
+    """Return the process-wide chapter codec for a unit."""
+    codec = _CODECS.get(unit_id)
+    if codec is None:
+        with _CODECS_LOCK:
+            codec = _CODECS.setdefault(unit_id, ChapterCodec())
+    return codec
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the positions of set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass(frozen=True, slots=True)
+class ProgressRecord:
+    """Immutable, compact progress state of one student in one unit.
+
+    Completed chapters are a bitmask over the unit's ``ChapterCodec``; notes
+    are None until the first one and capped at ``RAG_PROGRESS_MAX_NOTES``.
+    Updates build a new record instead of mutating, so cached records can be
+    shared with readers safely.
+    """
+    mask: int = 0
+    notes: Optional[Tuple[str, ...]] = None
+    updated_at: float = field(default_factory=time.time)
+
+    def with_note(self, note: str) -> Tuple[str, ...]:
+        """Return the notes tuple with ``note`` appended, dropping the oldest past the cap."""
+        notes = (self.notes or ()) + (note,)
+        return notes[-PROGRESS_MAX_NOTES:] if PROGRESS_MAX_NOTES > 0 else notes
+
+
+class ProgressStore(ABC):
+    """Backend interface used by ``rag.progress_tracker``.
+
+    ``update`` is atomic per student: the read-modify-write runs under one
+    of ``RAG_PROGRESS_LOCK_STRIPES`` locks picked by hashing the student key,
+    so concurrent sessions updating the same student never lose a write and
+    sessions updating different students almost never share a lock.
+    Records are immutable, so ``get`` needs no lock at all.
+    """
+
+    def __init__(self, lock_stripes: int = PROGRESS_LOCK_STRIPES) -> None:
+        self._stripes = tuple(threading.Lock() for _ in range(max(1, lock_stripes)))
+
+    def _stripe(self, unit_id: str, student_id: str) -> threading.Lock:
+        return self._stripes[hash((unit_id, student_id)) % len(self._stripes)]
+
+    @abstractmethod
+    def get(self, unit_id: str, student_id: str) -> Optional[ProgressRecord]:
+        """Return the student's record, or None if nothing was recorded."""
+
+    @abstractmethod
+    def put(self, unit_id: str, student_id: str, record: ProgressRecord) -> None:
+        """Replace the student's record."""
+
+    @abstractmethod
+    def iter_records(self, unit_id: str) -> Iterator[Tuple[str, ProgressRecord]]:
+        """Yield ``(student_id, record)`` for every student in a unit."""
+
+    def update(
+        self,
+        unit_id: str,
+        student_id: str,
+        mutate: Callable[[Optional[ProgressRecord]], ProgressRecord],
+    ) -> ProgressRecord:
+        """Atomically store and return ``mutate(current)``.
+
+        ``mutate`` runs while the student's stripe lock is held, so it should
+        only compute the new record. Returning ``current`` unchanged skips the
+        write. Plain ``put`` calls bypass the lock and simply win or lose.
+        """
+        with self._stripe(unit_id, student_id):
+            current = self.get(unit_id, student_id)
+            record = mutate(current)
+            if record is not current:
+                self.put(unit_id, student_id, record)
+        return record
+
+    def flush(self) -> None:
+        """Persist any buffered writes."""
+
+    def memory_counts(self) -> Dict[str, int]:
+        """Entries this backend currently holds in memory, for memory reports."""
+        return {}
+
+    def close(self) -> None:
+        """Flush and release backend resources."""
+        self.flush()
+
+
+class InMemoryProgressStore(ProgressStore):
+    """Process-local store; progress is lost when the process exits."""
+
+    def __init__(self, lock_stripes: int = PROGRESS_LOCK_STRIPES) -> None:
+        super().__init__(lock_stripes)
+        # Nested per unit so no (unit, student) key tuple is allocated per student
+        self._units: Dict[str, Dict[str, ProgressRecord]] = {}
+
+    def get(self, unit_id: str, student_id: str) -> Optional[ProgressRecord]:
+        records = self._units.get(unit_id)
+        return records.get(student_id) if records is not None else None
+
+    def put(self, unit_id: str, student_id: str, record: ProgressRecord) -> None:
+        self._units.setdefault(unit_id, {})[student_id] = record
+
+    def iter_records(self, unit_id: str) -> Iterator[Tuple[str, ProgressRecord]]:
+        yield from list(self._units.get(unit_id, {}).items())
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._units.values())
+
+    def memory_counts(self) -> Dict[str, int]:
+        return {"units": len(self._units), "records": len(self)}
+
+
+class SQLiteProgressStore(ProgressStore):
+    """SQLite (WAL) store with write-behind batching and a read-through cache.
+
+    ``put`` only updates memory: the record lands in the pending map (newer
+    writes for the same student overwrite older ones) and a background thread
+    commits pending records in one transaction every ``flush_interval``
+    seconds or as soon as ``batch_size`` students are waiting. Reads check
+    pending writes, then the LRU cache, then the database.
+
+    After ``max_write_failures`` consecutive failed commits the writer stops
+    and later ``put`` calls raise with its error instead of buffering writes
+    that will never land; the pending records stay in memory for ``flush``.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS progress (
+            unit_id TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            completed TEXT NOT NULL,
+            notes TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (unit_id, student_id)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+        cache_size: int = 10000,
+        lock_stripes: int = PROGRESS_LOCK_STRIPES,
+        max_write_failures: int = 5,
+        close_timeout: float = 10.0,
+    ) -> None:
+        super().__init__(lock_stripes)
+        self._db_path = db_path
+        self._flush_interval = flush_interval
+        self._max_write_failures = max(max_write_failures, 1)
+        self._close_timeout = close_timeout
+        self._batch_size = batch_size
+        self._cache_size = cache_size
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._read_conn = self._connect()
+        self._read_conn.execute(self._SCHEMA)
+        self._read_conn.commit()
+        self._read_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._cache: "OrderedDict[StoreKey, ProgressRecord]" = OrderedDict()
+        self._pending: Dict[StoreKey, ProgressRecord] = {}
+        self._inflight: Dict[StoreKey, ProgressRecord] = {}
+        # Bumped by every put, so a DB read that raced a write is not cached
+        self._writes = 0
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._writer_error: Optional[BaseException] = None
+        self._writer = threading.Thread(
+            target=self._write_loop, name="progress-write-behind", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _encode(unit_id: str, record: ProgressRecord) -> Tuple[str, str, float]:
+        # Chapter ids (not bits) go to disk so rows survive codec changes across restarts
+        completed = ",".join(chapter_codec(unit_id).ids(record.mask))
+        return completed, json.dumps(record.notes or []), record.updated_at
+
+    @staticmethod
+    def _decode(unit_id: str, completed: str, notes: str, updated_at: float) -> ProgressRecord:
+        decoded_notes = json.loads(notes)
+        return ProgressRecord(
+            mask=chapter_codec(unit_id).mask(completed.split(",")) if completed else 0,
+            notes=tuple(decoded_notes) if decoded_notes else None,
+            updated_at=updated_at,
+        )
+
+    def _cache_put(self, key: StoreKey, record: ProgressRecord) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, unit_id: str, student_id: str) -> Optional[ProgressRecord]:
+        key = (unit_id, student_id)
+        with self._lock:
+            record = self._pending.get(key) or self._inflight.get(key)
+            if record is None:
+                record = self._cache.get(key)
+                if record is not None:
+                    self._cache.move_to_end(key)
+            if record is not None:
+                return record
+            writes_before_read = self._writes
+
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT completed, notes, updated_at FROM progress "
+                "WHERE unit_id = ? AND student_id = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        record = self._decode(unit_id, *row)
+        with self._lock:
+            # A write may have raced the read; never let the DB copy shadow it.
+            # Writes always go through the cache, so a cached entry is newer;
+            # if any write happened meanwhile, it may also have been evicted.
+            newer = self._pending.get(key) or self._inflight.get(key) or self._cache.get(key)
+            if newer is not None:
+                record = newer
+            elif self._writes == writes_before_read:
+                self._cache_put(key, record)
+        return record
+
+    def put(self, unit_id: str, student_id: str, record: ProgressRecord) -> None:
+        key = (unit_id, student_id)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("progress store is closed")
+            if self._writer_error is not None:
+                raise RuntimeError(
+                    f"progress write-behind stopped: {self._writer_error}"
+                ) from self._writer_error
+            self._pending[key] = record
+            self._writes += 1
+            self._cache_put(key, record)
+            if len(self._pending) >= self._batch_size:
+                self._wakeup.notify()
+
+    def iter_records(self, unit_id: str) -> Iterator[Tuple[str, ProgressRecord]]:
+        self.flush()
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT student_id, completed, notes, updated_at FROM progress WHERE unit_id = ?",
+                (unit_id,),
+            ).fetchall()
+        for student_id, completed, notes, updated_at in rows:
+            yield student_id, self._decode(unit_id, completed, notes, updated_at)
+
+    def _drain(self, conn: sqlite3.Connection) -> None:
+        """Commit everything pending as one transaction.
+
+        The commit lock keeps batches in order, so an older batch can never
+        land after (and overwrite) a newer one.
+        """
+        with self._commit_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            try:
+                self._commit(conn, batch)
+            except sqlite3.Error:
+                with self._lock:
+                    # Re-queue without clobbering anything written since
+                    for key, record in batch.items():
+                        self._pending.setdefault(key, record)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = {}
+
+    def _commit(self, conn: sqlite3.Connection, batch: Dict[StoreKey, ProgressRecord]) -> None:
+        if not batch:
+            return
+        rows = [
+            (unit, student, *self._encode(unit, record))
+            for (unit, student), record in batch.items()
+        ]
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO progress (unit_id, student_id, completed, notes, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (unit_id, student_id) DO UPDATE SET "
+                "completed = excluded.completed, notes = excluded.notes, "
+                "updated_at = excluded.updated_at",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _write_loop(self) -> None:
+        failures = 0
+        try:
+            conn = self._connect()
+            while True:
+                with self._lock:
+                    if not self._pending and not self._closed:
+                        self._wakeup.wait(self._flush_interval)
+                    closed = self._closed
+                try:
+                    self._drain(conn)
+                except sqlite3.Error as e:
+                    failures += 1
+                    if failures >= self._max_write_failures:
+                        raise
+                    logger.error(
+                        f"Progress write-behind commit failed "
+                        f"({failures}/{self._max_write_failures}), will retry: {e}"
+                    )
+                    time.sleep(self._flush_interval)
+                    continue
+                failures = 0
+                if closed:
+                    conn.close()
+                    return
+        except Exception as e:
+            with self._lock:
+                self._writer_error = e
+                pending = len(self._pending)
+            logger.error(
+                f"Progress write-behind stopped after {failures} failed commit(s); "
+                f"{pending} record(s) not persisted: {e}"
+            )
+
+    def flush(self) -> None:
+        with self._read_lock:
+            self._drain(self._read_conn)
+
+    def memory_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "cached_records": len(self._cache),
+                "pending_writes": len(self._pending),
+                "inflight_writes": len(self._inflight),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join(self._close_timeout)
+        if self._writer.is_alive():
+            # A hung commit holds the commit lock, so flushing here would hang too
+            with self._lock:
+                pending = len(self._pending) + len(self._inflight)
+            logger.error(
+                f"Progress write-behind did not stop within {self._close_timeout}s; "
+                f"{pending} record(s) may not be persisted"
+            )
+            return
+        try:
+            # Raises if the database is still failing, so lost writes are not silent
+            self.flush()
+        finally:
+            with self._read_lock:
+                self._read_conn.close()
+
+
+class EventLogProgressStore(ProgressStore):
+    """Append-only JSONL event log plus periodic compacted snapshots.
+
+    Every change is appended to ``events.jsonl`` as the events that caused
+    it: ``complete`` (chapters newly completed), ``note`` (one note added) or,
+    for any other replacement, ``set`` (the whole record). State is held in
+    memory. Every ``snapshot_every`` events a background thread writes the
+    full state to ``snapshot.json`` together with the log offset it covers,
+    so a restart loads the snapshot and replays only the events after it.
+    The log itself is never rewritten and serves as the audit trail.
+    """
+
+    LOG_NAME = "events.jsonl"
+    SNAPSHOT_NAME = "snapshot.json"
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = 10000,
+        lock_stripes: int = PROGRESS_LOCK_STRIPES,
+    ) -> None:
+        super().__init__(lock_stripes)
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._log_path = self._dir / self.LOG_NAME
+        self._snapshot_path = self._dir / self.SNAPSHOT_NAME
+        self._snapshot_every = snapshot_every
+
+        self._units: Dict[str, Dict[str, ProgressRecord]] = {}
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._since_snapshot = 0
+        self._closed = False
+
+        started = time.perf_counter()
+        offset, replayed = self._recover()
+        logger.info(
+            f"Progress event log recovered in {(time.perf_counter() - started) * 1000:.1f} ms "
+            f"(snapshot offset {offset}, {replayed} events replayed)"
+        )
+        self._log = open(self._log_path, "ab")
+        self._since_snapshot = replayed
+
+        self._wakeup = threading.Condition(self._lock)
+        self._snapshotter = threading.Thread(
+            target=self._snapshot_loop, name="progress-snapshot", daemon=True
+        )
+        self._snapshotter.start()
+
+    @staticmethod
+    def _events(
+        unit_id: str,
+        student_id: str,
+        old: Optional[ProgressRecord],
+        new: ProgressRecord,
+    ) -> List[dict]:
+        """Describe the change from ``old`` to ``new`` as log events."""
+        old = old or ProgressRecord(mask=0, updated_at=0.0)
+        head = {"ts": new.updated_at, "u": unit_id, "s": student_id}
+        codec = chapter_codec(unit_id)
+        added = new.mask & ~old.mask
+        notes_changed = new.notes != old.notes
+        note_added = bool(new.notes) and notes_changed and old.with_note(new.notes[-1]) == new.notes
+
+        if old.mask & ~new.mask or (notes_changed and not note_added):
+            return [{**head, "e": "set", "c": list(codec.ids(new.mask)), "n": list(new.notes or ())}]
+        events = []
+        if added:
+            events.append({**head, "e": "complete", "c": list(codec.ids(added))})
+        if note_added:
+            events.append({**head, "e": "note", "n": new.notes[-1]})
+        return events
+
+    @staticmethod
+    def _apply(units: Dict[str, Dict[str, ProgressRecord]], event: dict) -> None:
+        records = units.setdefault(event["u"], {})
+        current = records.get(event["s"]) or ProgressRecord(mask=0)
+        codec = chapter_codec(event["u"])
+        kind = event["e"]
+        if kind == "complete":
+            record = ProgressRecord(
+                mask=current.mask | codec.mask(event["c"]),
+                notes=current.notes,
+                updated_at=event["ts"],
+            )
+        elif kind == "note":
+            record = ProgressRecord(
+                mask=current.mask, notes=current.with_note(event["n"]), updated_at=event["ts"]
+            )
+        elif kind == "set":
+            record = ProgressRecord(
+                mask=codec.mask(event["c"]),
+                notes=tuple(event["n"]) if event["n"] else None,
+                updated_at=event["ts"],
+            )
+        else:
+            raise ValueError(f"unknown progress event: {kind}")
+        records[event["s"]] = record
+
+    def _load_snapshot(self) -> int:
+        """Load the latest snapshot into memory and return the log offset it covers."""
+        if not self._snapshot_path.exists():
+            return 0
+        try:
+            snapshot = json.loads(self._snapshot_path.read_text())
+            units = {
+                unit_id: {
+                    student_id: ProgressRecord(
+                        mask=chapter_codec(unit_id).mask(completed),
+                        notes=tuple(notes) if notes else None,
+                        updated_at=updated_at,
+                    )
+                    for student_id, (completed, notes, updated_at) in records.items()
+                }
+                for unit_id, records in snapshot["units"].items()
+            }
+            offset = int(snapshot["offset"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable progress snapshot {self._snapshot_path}: {e}")
+            return 0
+        log_size = self._log_path.stat().st_size if self._log_path.exists() else 0
+        if offset > log_size:
+            logger.warning(
+                f"Progress snapshot covers {offset} bytes but the log has {log_size}; "
+                "replaying the full log instead"
+            )
+            return 0
+        self._units = units
+        return offset
+
+    def _recover(self) -> Tuple[int, int]:
+        """Rebuild state from the snapshot plus the log tail; returns (offset, events replayed)."""
+        offset = self._load_snapshot()
+        if not self._log_path.exists():
+            return offset, 0
+
+        replayed = 0
+        good_end = offset
+        with open(self._log_path, "rb") as log:
+            log.seek(offset)
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break  # torn final write; truncated below
+                try:
+                    self._apply(self._units, json.loads(line))
+                    replayed += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.error(f"Skipping corrupt progress event at byte {good_end}: {e}")
+                good_end += len(line)
+            log_size = log.seek(0, 2)
+        if good_end < log_size:
+            logger.warning(f"Truncating {log_size - good_end} bytes of incomplete progress events")
+            os.truncate(self._log_path, good_end)
+        return offset, replayed
+
+    def iter_events(
+        self, unit_id: Optional[str] = None, student_id: Optional[str] = None
+    ) -> Iterator[dict]:
+        """Yield logged events oldest first, optionally for one unit and/or student."""
+        self.flush()
+        with open(self._log_path, "rb") as log:
+            for line in log:
+                if not line.endswith(b"\n"):
+                    return
+                event = json.loads(line)
+                if unit_id is not None and event["u"] != unit_id:
+                    continue
+                if student_id is not None and event["s"] != student_id:
+                    continue
+                yield event
+
+    def get(self, unit_id: str, student_id: str) -> Optional[ProgressRecord]:
+        records = self._units.get(unit_id)
+        return records.get(student_id) if records is not None else None
+
+    def put(self, unit_id: str, student_id: str, record: ProgressRecord) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("progress store is closed")
+            records = self._units.setdefault(unit_id, {})
+            events = self._events(unit_id, student_id, records.get(student_id), record)
+            records[student_id] = record
+            if not events:
+                return
+            self._log.write(
+                b"".join(json.dumps(event, separators=(",", ":")).encode() + b"\n" for event in events)
+            )
+            # Hand the lines to the OS now so a process crash cannot lose them
+            self._log.flush()
+            self._since_snapshot += len(events)
+            if self._snapshot_every > 0 and self._since_snapshot >= self._snapshot_every:
+                self._wakeup.notify()
+
+    def iter_records(self, unit_id: str) -> Iterator[Tuple[str, ProgressRecord]]:
+        with self._lock:
+            records = list(self._units.get(unit_id, {}).items())
+        yield from records
+
+    def snapshot(self) -> int:
+        """Write a compacted snapshot of the current state; returns the log offset it covers."""
+        with self._snapshot_lock:
+            return self._write_snapshot()
+
+    def _write_snapshot(self) -> int:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("progress store is closed")
+            self._log.flush()
+            offset = self._log.tell()
+            # Records are immutable, so shallow copies are a consistent view
+            units = {unit_id: dict(records) for unit_id, records in self._units.items()}
+            self._since_snapshot = 0
+        # The snapshot must never cover log bytes that are not yet durable
+        os.fsync(self._log.fileno())
+
+        payload = {
+            "offset": offset,
+            "created_at": time.time(),
+            "units": {
+                unit_id: {
+                    student_id: [
+                        list(chapter_codec(unit_id).ids(record.mask)),
+                        list(record.notes or ()),
+                        record.updated_at,
+                    ]
+                    for student_id, record in records.items()
+                }
+                for unit_id, records in units.items()
+            },
+        }
+        tmp_path = self._snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        return offset
+
+    def _snapshot_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed and (
+                    self._snapshot_every <= 0 or self._since_snapshot < self._snapshot_every
+                ):
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            try:
+                self.snapshot()
+            except RuntimeError:
+                return
+            except OSError as e:
+                logger.error(f"Progress snapshot failed, will retry: {e}")
+                time.sleep(1.0)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def memory_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "units": len(self._units),
+                "records": sum(len(records) for records in self._units.values()),
+                "events_since_snapshot": self._since_snapshot,
+            }
+
+    def close(self) -> None:
+        """Write a final snapshot (so the next start replays nothing) and close the log."""
+        with self._snapshot_lock:
+            with self._lock:
+                if self._closed:
+                    return
+            if self._since_snapshot:
+                try:
+                    self._write_snapshot()
+                except OSError as e:
+                    logger.error(f"Final progress snapshot failed: {e}")
+            with self._lock:
+                self._closed = True
+                self._wakeup.notify()
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+        self._snapshotter.join()
+
+
+def create_progress_store(backend: Optional[str] = None) -> ProgressStore:
+    """Build the configured progress backend (``RAG_PROGRESS_BACKEND``)."""
+
+    backend = (backend or PROGRESS_BACKEND or "sqlite").lower()
+    if backend == "memory":
+        return InMemoryProgressStore()
+    if backend == "sqlite":
+        store = SQLiteProgressStore(
+            PROGRESS_DB_PATH,
+            flush_interval=PROGRESS_FLUSH_INTERVAL,
+            batch_size=PROGRESS_BATCH_SIZE,
+            cache_size=PROGRESS_CACHE_SIZE,
+        )
+        atexit.register(store.close)
+        return store
+    if backend == "events":
+        store = EventLogProgressStore(PROGRESS_EVENT_DIR, snapshot_every=PROGRESS_SNAPSHOT_EVERY)
+        atexit.register(store.close)
+        return store
+    raise ValueError(f"Unknown progress backend: {backend}")
+
+
+register_store("chapter_codecs", lambda: {"units": len(_CODECS)})
+
+
+__all__ = [
+    "ChapterCodec",
+    "chapter_codec",
+    "iter_bits",
+    "ProgressRecord",
+    "ProgressStore",
+    "InMemoryProgressStore",
+    "SQLiteProgressStore",
+    "EventLogProgressStore",
+    "create_progress_store",
+]
@@ -2,58 +2,68 @@
 
 from __future__ import annotations
 
-import json
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from google.adk.tools import FunctionTool, ToolContext
 
-from rag.config import MAX_HISTORY_TURNS
+from rag.cohort_analytics import compute_cohort_analytics
+from rag.chapter_labels import LabelMatch
+from rag.config import CHAPTER_MATCH_MARGIN, CHAPTER_MATCH_THRESHOLD
+from rag.course_registry import CourseIndex, get_course_registry
+from rag.utils.memory_profiler import register_store
+from rag.progress_store import (
+    ProgressRecord,
+    ProgressStore,
+    create_progress_store,
+    iter_bits,
+)
 
 
-_COURSE_DATA: Optional[Dict[str, Any]] = None
-_CHAPTER_ORDER: List[str] = []
-_CHAPTER_MAP: Dict[str, Dict[str, Any]] = {}
-_ALIAS_MAP: Dict[str, str] = {}
-_PROGRESS_STATE: Dict[str, Dict[str, Any]] = {}
+_PROGRESS_STORE: Optional[ProgressStore] = None
 _STATE_STUDENT_ID_KEY = "progress_student_id"
+# Chapter fields per outline detail level; each level extends the one before.
+# "full" adds learning outcomes, which are fetched separately
+_TITLE_FIELDS = ("chapter_id", "title", "order")
+_SUMMARY_FIELDS = _TITLE_FIELDS + ("week_label", "prerequisites")
+_OUTLINE_DETAIL_FIELDS = {
+    "titles": _TITLE_FIELDS,
+    "summary": _SUMMARY_FIELDS,
+    "full": _SUMMARY_FIELDS,
+}
+# Distinct completion masks whose unlocked chapters are memoized per index
+_UNLOCKED_CACHE_SIZE = 4096
+
+
+def _ensure_course_loaded(unit_id: Optional[str] = None) -> CourseIndex:
+    """Return the current index for ``unit_id`` (default course when None).
+
+    Courses load lazily through the registry, which hot-reloads changed
+    files. Callers should fetch the index once per operation and pass it
+    along.
+
+    Raises:
+        ValueError: If the unit has no course file or the file is invalid
+    """
+    return get_course_registry().get(unit_id)
 
 
-def _course_path() -> Path:
-    return Path(__file__).resolve().parent / "data" / "course.json"
-
-
-def _ensure_course_loaded() -> Dict[str, Any]:
-    global _COURSE_DATA, _CHAPTER_ORDER, _CHAPTER_MAP, _ALIAS_MAP
-    if _COURSE_DATA is not None:
-        return _COURSE_DATA
+def _course_unavailable(unit_id: Optional[str], error: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error_message": str(error),
+        "message": f"Course for unit '{unit_id or 'default'}' is unavailable: {str(error)}",
+    }
 
-    course_json = json.loads(_course_path().read_text())
-    chapters = sorted(course_json.get("chapters", []), key=lambda c: c.get("order", 0))
-    course_json["chapters"] = chapters
 
-    _CHAPTER_ORDER = []
-    _CHAPTER_MAP = {}
-    _ALIAS_MAP = {}
-    for chapter in chapters:
-        cid = (chapter.get("chapter_id") or "").strip()
-        if not cid:
-            continue
-        normalized_id = cid.lower()
-        _CHAPTER_ORDER.append(normalized_id)
-        _CHAPTER_MAP[normalized_id] = chapter
+def _progress_store() -> ProgressStore:
+    global _PROGRESS_STORE
+    if _PROGRESS_STORE is None:
+        _PROGRESS_STORE = create_progress_store()
+    return _PROGRESS_STORE
 
-        title = (chapter.get("title") or "").lower()
-        week_label = (chapter.get("week_label") or "").lower()
-        order_alias = f"chapter {chapter.get('order')}" if chapter.get("order") else ""
-        aliases = {normalized_id, title, week_label, order_alias}
-        for alias in aliases:
-            if alias:
-                _ALIAS_MAP[alias] = normalized_id
 
-    _COURSE_DATA = course_json
-    return _COURSE_DATA
+register_store("progress_store", lambda: _PROGRESS_STORE.memory_counts() if _PROGRESS_STORE is not None else {})
 
 
 def _normalize_student_id(student_id: Optional[str]) -> str:
@@ -88,155 +98,278 @@ def _resolve_student_id(
     return _generate_student_id()
 
 
-def _normalize_chapter_id(chapter_label: Optional[str]) -> Optional[str]:
+def _resolve_chapter(
+    chapter_label: Optional[str],
+    index: Optional[CourseIndex] = None,
+) -> Optional[LabelMatch]:
+    """Resolve a free-form chapter reference, exact aliases first, then fuzzily."""
     if not chapter_label:
         return None
-    _ensure_course_loaded()
+    index = index or _ensure_course_loaded()
     key = chapter_label.strip().lower()
     if not key:
         return None
-    if key in _ALIAS_MAP:
-        return _ALIAS_MAP[key]
-    if key in _CHAPTER_ORDER:
-        return key
-    return None
+    if key in index.aliases:
+        return LabelMatch(index.aliases[key], 1.0, key)
+    if key in index.rank:
+        return LabelMatch(key, 1.0, key)
+    return index.labels.resolve(key, CHAPTER_MATCH_THRESHOLD, CHAPTER_MATCH_MARGIN)
 
 
-def _chapter_summary(chapter_id: Optional[str]) -> Optional[Dict[str, Any]]:
-    if not chapter_id:
-        return None
-    _ensure_course_loaded()
-    chapter = _CHAPTER_MAP.get(chapter_id)
-    if not chapter:
-        return None
-    return {
-        "chapter_id": chapter.get("chapter_id"),
-        "title": chapter.get("title"),
-        "order": chapter.get("order"),
-        "week_label": chapter.get("week_label"),
-        "learning_outcomes": chapter.get("learning_outcomes", []),
-    }
+def _normalize_chapter_id(
+    chapter_label: Optional[str],
+    index: Optional[CourseIndex] = None,
+) -> Optional[str]:
+    match = _resolve_chapter(chapter_label, index)
+    return match.chapter_id if match is not None else None
 
 
-def _truncate_history(
-    history: List[Dict[str, Any]],
-    max_turns: int = None,
-) -> List[Dict[str, Any]]:
-    """Truncate conversation history to recent turns.
+def _completed_positions(index: CourseIndex, mask: int) -> List[int]:
+    """Ranks of the completed chapters in ``mask``, ascending."""
+    mask &= index.course_mask
+    if index.rank_ordered:
+        return list(iter_bits(mask))
+    return sorted(index.rank_of_bit[bit] for bit in iter_bits(mask))
 
-    Preserves:
-    - System messages (always kept)
-    - Most recent max_turns of user/assistant exchanges
 
-    Args:
-        history: Full conversation history
-        max_turns: Max turns to keep (default: MAX_HISTORY_TURNS)
+def _unlocked_positions(index: CourseIndex, mask: int) -> Tuple[int, ...]:
+    """Ranks of uncompleted chapters whose prerequisites are all in ``mask``.
 
-    Returns:
-        Truncated history list
+    Returned in course order and memoized per mask: cohorts share a small
+    number of distinct completion states, so most calls are a dict lookup.
     """
-    if max_turns is None:
-        max_turns = MAX_HISTORY_TURNS
-
-    if not history or len(history) <= max_turns * 2:
-        return history
-
-    # Separate system messages from conversation
-    system_msgs = [m for m in history if m.get("role") == "system"]
-    conversation = [m for m in history if m.get("role") != "system"]
-
-    # Keep only recent turns (user + assistant = 2 messages per turn)
-    recent = conversation[-(max_turns * 2):]
-
-    return system_msgs + recent
+    mask &= index.course_mask
+    cached = index.unlocked_cache.get(mask)
+    if cached is not None:
+        return cached
+
+    unlocked = tuple(
+        position
+        for position, bit in enumerate(index.bits)
+        if not mask >> bit & 1 and not index.prerequisite_masks[position] & ~mask
+    )
+    if len(index.unlocked_cache) >= _UNLOCKED_CACHE_SIZE:
+        index.unlocked_cache.clear()
+    index.unlocked_cache[mask] = unlocked
+    return unlocked
 
 
-def _build_snapshot(student_id: str) -> Dict[str, Any]:
-    """Build progress snapshot with progress percentage and chapter count."""
-    _ensure_course_loaded()
+def _build_snapshot(
+    student_id: str,
+    record: Optional[ProgressRecord] = None,
+    index: Optional[CourseIndex] = None,
+) -> Dict[str, Any]:
+    """Build progress snapshot with progress percentage and chapter count.
+
+    Completed chapters are a bitmask, so the percentage is a popcount and the
+    unlocked chapters are a memoized subset test against each chapter's
+    prerequisite mask; the next chapter is the first unlocked one. Pass
+    ``record`` to skip the store lookup when the caller already holds it, and
+    ``index`` to stay on the course version the caller resolved chapters
+    against.
+    """
+    index = index or _ensure_course_loaded()
     normalized_student = _normalize_student_id(student_id)
-    progress = _PROGRESS_STATE.get(normalized_student, {"completed": []})
-    completed_ids = progress.get("completed", [])
-    ordered_completed = sorted(completed_ids, key=_CHAPTER_ORDER.index)
+    if record is None:
+        record = _progress_store().get(index.unit_id, normalized_student)
+    mask = record.mask if record is not None else 0
 
-    next_chapter_id = next(
-        (cid for cid in _CHAPTER_ORDER if cid not in ordered_completed),
-        None,
-    )
+    completed_positions = _completed_positions(index, mask)
+    unlocked_positions = _unlocked_positions(index, mask)
+    next_position = unlocked_positions[0] if unlocked_positions else None
 
-    total_chapters = len(_CHAPTER_ORDER)
+    total_chapters = index.total_chapters
     progress_pct = (
-        round(len(ordered_completed) / total_chapters * 100, 1)
+        round(len(completed_positions) / total_chapters * 100, 1)
         if total_chapters > 0
         else 0.0
     )
 
     return {
         "student_id": normalized_student,
-        "completed_chapters": [
-            _chapter_summary(cid) for cid in ordered_completed if _chapter_summary(cid)
-        ],
-        "next_chapter": _chapter_summary(next_chapter_id),
+        "completed_chapters": [index.summaries[position] for position in completed_positions],
+        "next_chapter": index.summaries[next_position] if next_position is not None else None,
+        "unlocked_chapters": [index.briefs[position] for position in unlocked_positions],
         "total_chapters": total_chapters,
         "progress_pct": progress_pct,
     }
 
 
-def get_course_outline_data() -> Dict[str, Any]:
-    """Return the canonical course outline for grounding progress responses."""
+def _outline_variant(
+    index: CourseIndex,
+    detail: str,
+    chapter_id: Optional[str],
+    include_outcomes: bool,
+) -> Dict[str, Any]:
+    """Build (once per course version) one outline payload variant."""
+    key = (detail, chapter_id, include_outcomes)
+    cached = index.outline_cache.get(key)
+    if cached is not None:
+        return cached
+
+    fields = _OUTLINE_DETAIL_FIELDS[detail]
+    if include_outcomes:
+        fields = fields[:4] + ("learning_outcomes",) + fields[4:]
+    chapters = index.outline["chapters"]
+    if chapter_id is not None:
+        chapters = [
+            chapter for chapter in chapters
+            if (chapter.get("chapter_id") or "").strip().lower() == chapter_id
+        ]
+
+    payload: Dict[str, Any] = {
+        "version": index.version,
+        "unit_id": index.outline["unit_id"],
+        "unit_name": index.outline["unit_name"],
+    }
+    if detail == "full" and chapter_id is None:
+        payload["description"] = index.outline["description"]
+        payload["learning_outcomes_overall"] = index.outline["learning_outcomes_overall"]
+    payload["chapters"] = [{field: chapter[field] for field in fields} for chapter in chapters]
+
+    index.outline_cache[key] = payload
+    return payload
+
 
-    course = _ensure_course_loaded()
-    return {
-        "unit_id": course.get("unit_id"),
-        "unit_name": course.get("unit_name"),
-        "description": course.get("description"),
-        "learning_outcomes_overall": course.get("learning_outcomes_overall", []),
-        "chapters": [
-            {
-                "chapter_id": chapter.get("chapter_id"),
-                "title": chapter.get("title"),
-                "order": chapter.get("order"),
-                "week_label": chapter.get("week_label"),
-                "learning_outcomes": chapter.get("learning_outcomes", []),
-                "prerequisites": chapter.get("prerequisites", []),
+def get_course_outline_data(
+    detail: str = "summary",
+    chapter_id: Optional[str] = None,
+    include_outcomes: Optional[bool] = None,
+    unit_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Return the course outline at the requested level of detail.
+
+    Payloads are built once per course version (``version`` is a hash of
+    course.json), so an outline already in the conversation with the same
+    version is still current.
+
+    Args:
+        detail: 'titles' (ids, titles, order), 'summary' (adds week labels and
+            prerequisites) or 'full' (adds learning outcomes and the unit description)
+        chapter_id: Optional chapter id, title, week label or "ch N" to return one chapter
+        include_outcomes: Include chapter learning outcomes (default: only for 'full')
+        unit_id: Optional course unit (default course when omitted)
+
+    Returns:
+        The outline payload with the course version
+    """
+    if detail not in _OUTLINE_DETAIL_FIELDS:
+        return {
+            "status": "error",
+            "error_message": f"Unknown detail level: {detail}",
+            "message": f"detail must be one of {', '.join(_OUTLINE_DETAIL_FIELDS)}",
+        }
+
+    try:
+        index = _ensure_course_loaded(unit_id)
+    except ValueError as e:
+        return _course_unavailable(unit_id, e)
+    normalized_chapter = None
+    if chapter_id:
+        normalized_chapter = _normalize_chapter_id(chapter_id, index)
+        if normalized_chapter is None:
+            if index.labels.is_ambiguous(chapter_id, CHAPTER_MATCH_THRESHOLD, CHAPTER_MATCH_MARGIN):
+                candidates = [match.chapter_id for match in index.labels.candidates(chapter_id)]
+                return {
+                    "status": "error",
+                    "error_message": f"Ambiguous chapter: {chapter_id}",
+                    "message": f"'{chapter_id}' could mean {' or '.join(candidates)}; ask which one",
+                }
+            return {
+                "status": "error",
+                "error_message": f"Unknown chapter: {chapter_id}",
+                "message": f"No chapter matches '{chapter_id}'",
             }
-            for chapter in course.get("chapters", [])
-        ],
-    }
+
+    if include_outcomes is None:
+        include_outcomes = detail == "full"
+    return _outline_variant(index, detail, normalized_chapter, include_outcomes)
 
 
 def record_student_progress(
     student_id: Optional[str] = None,
     completed_chapters: Optional[List[str]] = None,
     note: Optional[str] = None,
+    unit_id: Optional[str] = None,
     tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
-    """Persist completed chapters for a student and return the updated snapshot."""
+    """Persist completed chapters for a student and return the updated snapshot.
 
-    _ensure_course_loaded()
-    normalized_student = _resolve_student_id(student_id, tool_context)
-    progress = _PROGRESS_STATE.setdefault(normalized_student, {"completed": [], "notes": []})
-    completed_ids = set(progress["completed"])
-    newly_added: List[str] = []
+    ``unit_id`` selects the course (default course when omitted).
+    """
 
+    try:
+        index = _ensure_course_loaded(unit_id)
+    except ValueError as e:
+        return _course_unavailable(unit_id, e)
+    normalized_student = _resolve_student_id(student_id, tool_context)
+    requested: List[str] = []
+    fuzzy_matches: List[Dict[str, Any]] = []
+    unresolved: List[str] = []
+    ambiguous: List[Dict[str, Any]] = []
     for chapter in completed_chapters or []:
-        normalized_chapter = _normalize_chapter_id(chapter)
-        if normalized_chapter and normalized_chapter not in completed_ids:
-            progress["completed"].append(normalized_chapter)
-            completed_ids.add(normalized_chapter)
-            newly_added.append(normalized_chapter)
-
-    progress["completed"].sort(key=_CHAPTER_ORDER.index)
-    if note:
-        progress.setdefault("notes", []).append(note)
+        match = _resolve_chapter(chapter, index)
+        if match is None:
+            if index.labels.is_ambiguous(chapter, CHAPTER_MATCH_THRESHOLD, CHAPTER_MATCH_MARGIN):
+                ambiguous.append({
+                    "label": chapter,
+                    "candidates": [
+                        {
+                            "chapter_id": candidate.chapter_id,
+                            "title": index.summaries[index.rank[candidate.chapter_id]]["title"],
+                            "confidence": candidate.confidence,
+                        }
+                        for candidate in index.labels.candidates(chapter)
+                    ],
+                })
+            else:
+                unresolved.append(chapter)
+            continue
+        requested.append(match.chapter_id)
+        if match.confidence < 1.0:
+            fuzzy_matches.append(
+                {"label": chapter, "chapter_id": match.chapter_id, "confidence": match.confidence}
+            )
+    if ambiguous:
+        # Record nothing until the learner says which chapter they meant
+        return {
+            "status": "needs_confirmation",
+            "student_id": normalized_student,
+            "ambiguous_chapters": ambiguous,
+            "unresolved_chapters": unresolved,
+            "message": "Some chapter labels match several chapters; confirm which one was meant",
+        }
+    newly_added: List[str] = []
 
-    snapshot = _build_snapshot(normalized_student)
+    def _apply(current: Optional[ProgressRecord]) -> ProgressRecord:
+        current = current or ProgressRecord()
+        mask = current.mask
+        newly_added.clear()
+        for cid in requested:
+            bit = 1 << index.bits[index.rank[cid]]
+            if not mask & bit:
+                mask |= bit
+                newly_added.append(cid)
+        notes = current.with_note(note) if note else current.notes
+        return ProgressRecord(mask=mask, notes=notes)
+
+    try:
+        record = _progress_store().update(index.unit_id, normalized_student, _apply)
+    except RuntimeError as e:
+        return {
+            "status": "error",
+            "student_id": normalized_student,
+            "error_message": str(e),
+            "message": f"Failed to save progress: {str(e)}",
+        }
+
+    snapshot = _build_snapshot(normalized_student, record, index)
     return {
         "status": "success",
         "student_id": normalized_student,
-        "added_chapters": [
-            _chapter_summary(cid) for cid in newly_added if _chapter_summary(cid)
-        ],
+        "added_chapters": [index.summaries[index.rank[cid]] for cid in newly_added],
+        "fuzzy_matches": fuzzy_matches,
+        "unresolved_chapters": unresolved,
         "snapshot": snapshot,
         "message": "Progress updated" if newly_added else "No new chapters recorded",
     }
@@ -244,14 +377,20 @@ def record_student_progress(
 
 def get_progress_snapshot(
     student_id: Optional[str] = None,
+    unit_id: Optional[str] = None,
     tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
     """Return completed chapters and the upcoming recommendation for a student.
 
     Response is optimized for context size - includes summary stats.
+    ``unit_id`` selects the course (default course when omitted).
     """
+    try:
+        index = _ensure_course_loaded(unit_id)
+    except ValueError as e:
+        return _course_unavailable(unit_id, e)
     normalized_student = _resolve_student_id(student_id, tool_context)
-    snapshot = _build_snapshot(normalized_student)
+    snapshot = _build_snapshot(normalized_student, index=index)
 
     # Add compact summary for LLM context efficiency
     completed = snapshot.get("completed_chapters", [])
@@ -270,25 +409,77 @@ def get_progress_snapshot(
 
 def get_next_chapter_recommendation(
     student_id: Optional[str] = None,
+    unit_id: Optional[str] = None,
     tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
-    """Return only the next chapter recommendation for a student."""
+    """Return the next chapter recommendation and every chapter the student can start now.
+
+    Recommendations respect the prerequisite graph: the next chapter is the
+    first chapter in course order whose prerequisites are all complete, and
+    its prerequisites are listed so no outline lookup is needed. ``unit_id``
+    selects the course (default course when omitted).
+    """
 
+    try:
+        index = _ensure_course_loaded(unit_id)
+    except ValueError as e:
+        return _course_unavailable(unit_id, e)
     normalized_student = _resolve_student_id(student_id, tool_context)
-    snapshot = _build_snapshot(normalized_student)
+    snapshot = _build_snapshot(normalized_student, index=index)
+    next_chapter = snapshot.get("next_chapter")
+    prerequisites = []
+    if next_chapter is not None:
+        position = index.rank[next_chapter["chapter_id"].lower()]
+        prerequisites = [index.briefs[prereq] for prereq in index.prerequisites[position]]
     return {
         "status": "success",
         "student_id": snapshot["student_id"],
-        "next_chapter": snapshot.get("next_chapter"),
+        "next_chapter": next_chapter,
+        "next_chapter_prerequisites": prerequisites,
+        "unlocked_chapters": snapshot["unlocked_chapters"],
         "completed_count": len(snapshot.get("completed_chapters", [])),
         "message": "Next chapter recommendation computed",
     }
 
 
+def get_cohort_progress_analytics(
+    top_n: int = 10,
+    unit_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Summarize progress across every student in the course.
+
+    Returns per-chapter completion rates, a histogram of completed-chapter
+    counts, how many students each chapter is the next chapter for, students
+    whose first gap in course order is still locked (out of sequence) and
+    pacing outliers far ahead of or behind the cohort median. ``unit_id``
+    selects the course (default course when omitted).
+    """
+
+    try:
+        index = _ensure_course_loaded(unit_id)
+    except ValueError as e:
+        return _course_unavailable(unit_id, e)
+    try:
+        analytics = compute_cohort_analytics(
+            index, _progress_store().iter_records(index.unit_id), top_n=max(top_n, 0)
+        )
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"Failed to compute cohort analytics: {str(e)}",
+        }
+
+    analytics["status"] = "success"
+    analytics["message"] = f"Cohort analytics computed for {analytics['student_count']} student(s)"
+    return analytics
+
+
 get_course_outline_tool = FunctionTool(get_course_outline_data)
 record_progress_tool = FunctionTool(record_student_progress)
 get_progress_snapshot_tool = FunctionTool(get_progress_snapshot)
 get_next_chapter_tool = FunctionTool(get_next_chapter_recommendation)
+get_cohort_analytics_tool = FunctionTool(get_cohort_progress_analytics)
 
 
 __all__ = [
@@ -296,8 +487,10 @@ __all__ = [
     "record_progress_tool",
     "get_progress_snapshot_tool",
     "get_next_chapter_tool",
+    "get_cohort_analytics_tool",
     "get_course_outline_data",
     "record_student_progress",
     "get_progress_snapshot",
     "get_next_chapter_recommendation",
+    "get_cohort_progress_analytics",
 ]
@@ -4,6 +4,19 @@ from google.adk.agents import Agent
 
 from rag.config import AGENT_MODEL
 from rag.tools import corpus_tools
+from rag.utils.instrumentation import instrument_tools
+from rag.utils.llm_accounting import (
+    account_agent_end,
+    account_agent_start,
+    account_model_end,
+    account_model_start,
+)
+from rag.utils.tracing import (
+    trace_agent_end,
+    trace_agent_start,
+    trace_model_end,
+    trace_model_start,
+)
 
 
 COMMON_TOOLS = [
@@ -36,6 +49,10 @@ def build_agent(
         model=model,
         description=description,
         instruction=instruction,
-        tools=toolset,
+        tools=instrument_tools(toolset),
         output_key=f"{name}_last_response",
+        before_agent_callback=[trace_agent_start, account_agent_start],
+        after_agent_callback=[trace_agent_end, account_agent_end],
+        before_model_callback=[trace_model_start, account_model_start],
+        after_model_callback=[trace_model_end, account_model_end],
     )
@@ -9,12 +9,18 @@ from .corpus_tools import (
     get_corpus_tool,
     delete_corpus_tool,
     import_document_tool,
+    import_from_prefix_tool,
     
     # File management tools
     list_files_tool,
     get_file_tool,
     delete_file_tool,
     
+    # Bulk operation tools
+    bulk_get_files_tool,
+    bulk_delete_files_tool,
+    bulk_delete_corpora_tool,
+    
     # Query tools
     query_rag_corpus_tool,
     search_all_corpora_tool,
@@ -26,4 +32,8 @@ from .storage_tools import (
     get_bucket_details_tool,
     upload_file_gcs_tool,
     list_blobs_tool,
-) 
\ No newline at end of file
+)
+
+from .blob_manifest import query_bucket_manifest_tool
+
+from .diagnostics_tools import memory_report_tool
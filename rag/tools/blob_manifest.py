@@ -0,0 +1,364 @@
+"""
+Local blob manifest index for Google Cloud Storage buckets.
+
+Keeps a compact, sorted, columnar copy of each bucket's object listing in
+process (optionally persisted to disk) so prefix, glob and size/date-range
+lookups are answered without re-listing the bucket over the network.
+
+GCS has no cheap "changed since" listing, so every refresh is a full
+rebuild from one field-projected listing; the TTL bounds how often that
+happens.
+"""
+
+import bisect
+import fnmatch
+import json
+import logging
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from google.cloud import storage
+from google.api_core.exceptions import GoogleAPIError
+from google.adk.tools import FunctionTool
+from rag.utils.memory_profiler import register_store
+from rag.utils.metrics import increment
+from rag.config import (
+    PROJECT_ID,
+    GCS_LIST_BLOBS_MAX_RESULTS,
+    GCS_SUMMARY_PAGE_SIZE,
+    GCS_MANIFEST_TTL_SECONDS,
+    GCS_MANIFEST_CACHE_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+_GLOB_SPECIAL = re.compile(r"[*?\[]")
+
+
+class BlobManifest:
+    """Immutable, name-sorted columnar snapshot of a bucket listing.
+
+    Column arrays share one index: names[i] has sizes[i], updated[i]
+    (epoch seconds) and content_types[i]. Prefix lookups are a bisect plus a
+    scan over the matching range only.
+    """
+
+    __slots__ = ("bucket_name", "names", "sizes", "updated", "content_types", "refreshed_at")
+
+    def __init__(
+        self,
+        bucket_name: str,
+        names: List[str],
+        sizes: array,
+        updated: array,
+        content_types: List[str],
+        refreshed_at: float,
+    ) -> None:
+        self.bucket_name = bucket_name
+        self.names = names
+        self.sizes = sizes
+        self.updated = updated
+        self.content_types = content_types
+        self.refreshed_at = refreshed_at
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def is_stale(self, ttl_seconds: float) -> bool:
+        return time.time() - self.refreshed_at > ttl_seconds
+
+    def _prefix_range(self, prefix: str) -> range:
+        start = bisect.bisect_left(self.names, prefix)
+        if not prefix:
+            return range(start, len(self.names))
+        stop = bisect.bisect_left(self.names, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo=start)
+        return range(start, stop)
+
+    def query(
+        self,
+        prefix: Optional[str] = None,
+        pattern: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        updated_after: Optional[float] = None,
+        updated_before: Optional[float] = None,
+    ) -> Iterator[int]:
+        """Yield row indexes matching every given filter, in name order.
+
+        A glob pattern's literal leading characters are folded into the prefix
+        so only the relevant slice of the sorted names is scanned.
+        """
+        scan_prefix = prefix or ""
+        matcher = None
+        if pattern:
+            literal = _GLOB_SPECIAL.split(pattern, maxsplit=1)[0]
+            if literal.startswith(scan_prefix):
+                scan_prefix = literal
+            elif not scan_prefix.startswith(literal):
+                return
+            matcher = re.compile(fnmatch.translate(pattern)).match
+
+        for index in self._prefix_range(scan_prefix):
+            size = self.sizes[index]
+            if min_size is not None and size < min_size:
+                continue
+            if max_size is not None and size > max_size:
+                continue
+            stamp = self.updated[index]
+            if updated_after is not None and stamp < updated_after:
+                continue
+            if updated_before is not None and stamp > updated_before:
+                continue
+            if matcher is not None and not matcher(self.names[index]):
+                continue
+            yield index
+
+    def entry(self, index: int) -> Dict[str, Any]:
+        name = self.names[index]
+        return {
+            "name": name,
+            "size": self.sizes[index],
+            "content_type": self.content_types[index] or None,
+            "updated": datetime.fromtimestamp(self.updated[index], tz=timezone.utc).isoformat(),
+            "gcs_uri": f"gs://{self.bucket_name}/{name}",
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "bucket_name": self.bucket_name,
+            "names": self.names,
+            "sizes": self.sizes.tolist(),
+            "updated": self.updated.tolist(),
+            "content_types": self.content_types,
+            "refreshed_at": self.refreshed_at,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, Any]) -> "BlobManifest":
+        return cls(
+            bucket_name=payload["bucket_name"],
+            names=payload["names"],
+            sizes=array("q", payload["sizes"]),
+            updated=array("d", payload["updated"]),
+            content_types=payload["content_types"],
+            refreshed_at=payload["refreshed_at"],
+        )
+
+
+_MANIFESTS: Dict[str, BlobManifest] = {}
+_MANIFEST_LOCKS: Dict[str, threading.Lock] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _bucket_lock(bucket_name: str) -> threading.Lock:
+    with _REGISTRY_LOCK:
+        return _MANIFEST_LOCKS.setdefault(bucket_name, threading.Lock())
+
+
+def _cache_path(bucket_name: str) -> Optional[Path]:
+    if not GCS_MANIFEST_CACHE_DIR:
+        return None
+    return Path(GCS_MANIFEST_CACHE_DIR) / f"{bucket_name}.manifest.json"
+
+
+def _load_cached(bucket_name: str) -> Optional[BlobManifest]:
+    path = _cache_path(bucket_name)
+    if path is None or not path.exists():
+        return None
+    try:
+        return BlobManifest.from_json(json.loads(path.read_text()))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable manifest cache {path}: {e}")
+        return None
+
+
+def _save_cached(manifest: BlobManifest) -> None:
+    path = _cache_path(manifest.bucket_name)
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest.to_json(), separators=(",", ":")))
+    tmp_path.replace(path)
+
+
+def _build_manifest(bucket_name: str, previous: Optional[BlobManifest]) -> BlobManifest:
+    """List the whole bucket and build a fresh manifest from it.
+
+    GCS returns names in lexicographic order, so the columns are built in
+    sorted order directly. ``previous`` is only used to log how the object
+    count changed.
+    """
+    client = storage.Client(project=PROJECT_ID)
+    blobs = client.list_blobs(
+        bucket_name,
+        page_size=GCS_SUMMARY_PAGE_SIZE,
+        fields="items(name,size,updated,contentType),nextPageToken"
+    )
+
+    names: List[str] = []
+    sizes = array("q")
+    updated = array("d")
+    content_types: List[str] = []
+    for blob in blobs:
+        names.append(blob.name)
+        sizes.append(blob.size or 0)
+        updated.append(blob.updated.timestamp() if blob.updated else 0.0)
+        content_types.append(blob.content_type or "")
+
+    previous_count = len(previous) if previous is not None else 0
+    logger.info(
+        f"Rebuilt manifest for gs://{bucket_name}: {len(names)} objects "
+        f"({len(names) - previous_count:+d} since the previous manifest)"
+    )
+    return BlobManifest(bucket_name, names, sizes, updated, content_types, time.time())
+
+
+def get_manifest(bucket_name: str, refresh: bool = False) -> BlobManifest:
+    """Return the bucket's manifest, refreshing it when stale or when asked to.
+
+    Concurrent callers for the same bucket share a single refresh.
+    """
+    manifest = _MANIFESTS.get(bucket_name)
+    if manifest is not None and not refresh and not manifest.is_stale(GCS_MANIFEST_TTL_SECONDS):
+        increment("rag_cache_requests", cache="bucket_manifest", result="hit")
+        return manifest
+
+    with _bucket_lock(bucket_name):
+        in_memory = _MANIFESTS.get(bucket_name)
+        manifest = in_memory if in_memory is not None else _load_cached(bucket_name)
+        if manifest is not None and not refresh and not manifest.is_stale(GCS_MANIFEST_TTL_SECONDS):
+            # Fresh in memory here means a concurrent caller just refreshed it for us
+            result = "shared_refresh" if in_memory is not None else "disk_hit"
+            increment("rag_cache_requests", cache="bucket_manifest", result=result)
+            _MANIFESTS[bucket_name] = manifest
+            return manifest
+
+        increment("rag_cache_requests", cache="bucket_manifest", result="miss")
+        manifest = _build_manifest(bucket_name, manifest)
+        _MANIFESTS[bucket_name] = manifest
+        _save_cached(manifest)
+        return manifest
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def resolve_gcs_uris(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    pattern: Optional[str] = None,
+    refresh: bool = False,
+) -> List[str]:
+    """Resolve every gs:// URI in a bucket matching a prefix and/or glob pattern."""
+
+    manifest = get_manifest(bucket_name, refresh=refresh)
+    return [
+        f"gs://{bucket_name}/{manifest.names[index]}"
+        for index in manifest.query(prefix=prefix, pattern=pattern)
+    ]
+
+
+def query_bucket_manifest(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    pattern: Optional[str] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    updated_after: Optional[str] = None,
+    updated_before: Optional[str] = None,
+    max_results: Optional[int] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Finds files in a GCS bucket using a locally cached manifest instead of re-listing.
+
+    Args:
+        bucket_name: The name of the bucket to search
+        prefix: Optional name prefix (e.g., 'slides/week1/')
+        pattern: Optional glob pattern on the full object name (e.g., '*.pdf', 'slides/ch?_*.pdf')
+        min_size: Optional minimum size in bytes
+        max_size: Optional maximum size in bytes
+        updated_after: Optional ISO-8601 timestamp; only files updated at or after it
+        updated_before: Optional ISO-8601 timestamp; only files updated at or before it
+        max_results: Maximum number of files to return (default: 100)
+        refresh: Force a manifest refresh before querying (default: refresh only when stale)
+
+    Returns:
+        A dictionary containing matching files, the total match count and manifest age
+    """
+    if max_results is None:
+        max_results = GCS_LIST_BLOBS_MAX_RESULTS
+    try:
+        manifest = get_manifest(bucket_name, refresh=refresh)
+        matches = manifest.query(
+            prefix=prefix,
+            pattern=pattern,
+            min_size=min_size,
+            max_size=max_size,
+            updated_after=_parse_timestamp(updated_after),
+            updated_before=_parse_timestamp(updated_before),
+        )
+
+        files = []
+        match_count = 0
+        total_bytes = 0
+        for index in matches:
+            match_count += 1
+            total_bytes += manifest.sizes[index]
+            if len(files) < max_results:
+                files.append(manifest.entry(index))
+
+        return {
+            "status": "success",
+            "bucket_name": bucket_name,
+            "files": files,
+            "count": len(files),
+            "match_count": match_count,
+            "match_bytes": total_bytes,
+            "truncated": match_count > len(files),
+            "manifest_objects": len(manifest),
+            "manifest_age_s": round(time.time() - manifest.refreshed_at, 1),
+            "message": f"Found {match_count} matching file(s) in bucket '{bucket_name}'"
+                       + (f" (showing {len(files)})" if match_count > len(files) else "")
+        }
+    except ValueError as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"Invalid manifest query: {str(e)}"
+        }
+    except GoogleAPIError as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"Failed to refresh bucket manifest: {str(e)}"
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"An unexpected error occurred: {str(e)}"
+        }
+
+
+def _manifest_counts() -> Dict[str, int]:
+    manifests = list(_MANIFESTS.values())
+    return {"buckets": len(manifests), "blobs": sum(len(manifest) for manifest in manifests)}
+
+
+register_store("bucket_manifests", _manifest_counts)
+
+# Create FunctionTools from the functions
+query_bucket_manifest_tool = FunctionTool(query_bucket_manifest)
@@ -14,13 +14,24 @@ RAG File Management (within a corpus):
 8. Get RAG file details
 9. Delete RAG files
 10. Query RAG files
+
+Bulk Operations (one tool call for many items):
+11. Get, delete RAG files by ID list or filter
+12. Delete RAG corpora by ID list or filter
 """
 
+import fnmatch
+from datetime import datetime, timedelta, timezone
+
 import vertexai
 from vertexai.preview import rag
 from google.adk.tools import FunctionTool
-from typing import Dict, Optional, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from typing import Callable, Dict, Optional, Any, Iterator, List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError
+from rag.tools.blob_manifest import resolve_gcs_uris
+from rag.utils.metrics import add_gauge, describe, increment, track_in_flight
+from rag.utils.latency_logger import log_latency
+from rag.utils.tracing import span, submit_with_context
 from rag.config import (
     PROJECT_ID,
     LOCATION,
@@ -29,13 +40,41 @@ from rag.config import (
     RAG_DEFAULT_SEARCH_TOP_K,
     RAG_DEFAULT_VECTOR_DISTANCE_THRESHOLD,
     RAG_DEFAULT_PAGE_SIZE,
+    RAG_IMPORT_BATCH_SIZE,
+    GCS_LIST_BLOBS_MAX_RESULTS,
     MAX_SEARCH_WORKERS,
-    CORPUS_SEARCH_TIMEOUT
+    CORPUS_SEARCH_TIMEOUT,
+    RAG_BULK_MAX_WORKERS
 )
 
 # Initialize Vertex AI API
 vertexai.init(project=PROJECT_ID, location=LOCATION)
 
+# Background threads that fetch the next list_files page while the caller consumes the current one
+_PAGE_PREFETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_SEARCH_WORKERS,
+    thread_name_prefix="rag-page-prefetch",
+)
+describe("rag_executor_queue_depth", "Tasks waiting for a worker thread.")
+
+
+def _submit_prefetch(fn: Callable[..., Any], *args: Any) -> Future:
+    """Submit to the prefetch pool, counting the task as queued until a worker starts it."""
+    add_gauge("rag_executor_queue_depth", 1, executor="page_prefetch")
+
+    def _started() -> Any:
+        add_gauge("rag_executor_queue_depth", -1, executor="page_prefetch")
+        return fn(*args)
+
+    def _finished(done: Future) -> None:
+        # A task cancelled while queued never starts, so it leaves the queue here
+        if done.cancelled():
+            add_gauge("rag_executor_queue_depth", -1, executor="page_prefetch")
+
+    future = submit_with_context(_PAGE_PREFETCH_EXECUTOR, _started)
+    future.add_done_callback(_finished)
+    return future
+
 
 def create_rag_corpus(
     display_name: str,
@@ -149,10 +188,14 @@ def update_rag_corpus(
         }
 
 
-def list_rag_corpora() -> Dict[str, Any]:
+def list_rag_corpora(include_file_counts: bool = True) -> Dict[str, Any]:
     """
     Lists all RAG corpora in the current project and location.
     
+    Args:
+        include_file_counts: Whether to count the files in every corpus (walks all
+            file pages per corpus; disable when only corpus IDs are needed)
+    
     Returns:
         A dictionary containing the list of corpora:
         - status: "success" or "error"
@@ -174,17 +217,14 @@ def list_rag_corpora() -> Dict[str, Any]:
             elif hasattr(corpus, "corpusStatus") and hasattr(corpus.corpusStatus, "state"):
                 status = corpus.corpusStatus.state
             
-            # Make an explicit API call to count files
-            files_count = 0
-            try:
-                # List all files to get the count
-                files_response = rag.list_files(corpus_name=corpus.name)
-                
-                if hasattr(files_response, "rag_files"):
-                    files_count = len(files_response.rag_files)
-            except Exception:
-                # If counting files fails, continue with zero count
-                pass
+            # Count files across every page (not just the first one)
+            files_count = None
+            if include_file_counts:
+                try:
+                    files_count = count_files(corpus.name)
+                except Exception:
+                    # If counting files fails, continue with zero count
+                    files_count = 0
             
             corpus_list.append({
                 "id": corpus_id,
@@ -238,14 +278,10 @@ def get_rag_corpus(corpus_id: str) -> Dict[str, Any]:
         elif hasattr(corpus, "corpusStatus") and hasattr(corpus.corpusStatus, "state"):
             status = corpus.corpusStatus.state
         
-        # Make an explicit API call to count files
+        # Count files across every page (not just the first one)
         files_count = 0
         try:
-            # List all files to get the count
-            files_response = rag.list_files(corpus_name=corpus_name)
-            
-            if hasattr(files_response, "rag_files"):
-                files_count = len(files_response.rag_files)
+            files_count = count_files(corpus_name)
         except Exception as file_error:
             # If counting files fails, log but continue with zero count
             print(f"Warning: Could not count files: {str(file_error)}")
@@ -365,6 +401,95 @@ def import_document_to_corpus(
             "message": f"Failed to import document: {str(e)}"
         }
 
+def import_documents_from_prefix(
+    corpus_id: str,
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    pattern: Optional[str] = None,
+    dry_run: bool = False,
+    refresh: bool = False,
+    max_results: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Imports every GCS file under a prefix and/or matching a glob pattern into a RAG corpus.
+    URIs are resolved from the cached bucket manifest, so no per-call bucket listing is needed.
+    
+    Args:
+        corpus_id: The ID of the corpus to import the documents into
+        bucket_name: The bucket holding the documents
+        prefix: Optional object name prefix (e.g., 'slides/')
+        pattern: Optional glob pattern on the object name (e.g., '*.pdf')
+        dry_run: Only report how many files would be imported, with a sample of their URIs (default: False)
+        refresh: Force a manifest refresh before resolving URIs
+        max_results: URIs listed in a dry run (default: 100)
+    
+    Returns:
+        A dictionary containing:
+        - status: "success", "partial" or "error"
+        - corpus_id: The ID of the corpus
+        - gcs_uris: The first max_results resolved URIs (dry run) or the first few imported
+        - matched_count: How many files matched
+        - imported_count / failed_batches: Import outcome per batch
+        - message: Status message
+    """
+    try:
+        uris = resolve_gcs_uris(bucket_name, prefix=prefix, pattern=pattern, refresh=refresh)
+        if not uris:
+            return {
+                "status": "warning",
+                "corpus_id": corpus_id,
+                "imported_count": 0,
+                "message": f"No files in gs://{bucket_name}/{prefix or ''} matched the request"
+            }
+        if dry_run:
+            if max_results is None:
+                max_results = GCS_LIST_BLOBS_MAX_RESULTS
+            sample = uris[:max_results]
+            return {
+                "status": "success",
+                "corpus_id": corpus_id,
+                "gcs_uris": sample,
+                "matched_count": len(uris),
+                "truncated": len(uris) > len(sample),
+                "dry_run": True,
+                "message": f"Dry run: {len(uris)} file(s) would be imported into corpus '{corpus_id}'"
+                           + (f" (showing {len(sample)})" if len(uris) > len(sample) else "")
+            }
+        
+        # Construct full corpus name
+        corpus_name = f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{corpus_id}"
+        
+        imported = 0
+        failed_batches = []
+        for start in range(0, len(uris), RAG_IMPORT_BATCH_SIZE):
+            batch = uris[start:start + RAG_IMPORT_BATCH_SIZE]
+            try:
+                rag.import_files(corpus_name, batch)
+                imported += len(batch)
+            except Exception as batch_error:
+                failed_batches.append({
+                    "first_uri": batch[0],
+                    "size": len(batch),
+                    "error_message": str(batch_error)
+                })
+        
+        return {
+            "status": "success" if not failed_batches else ("partial" if imported else "error"),
+            "corpus_id": corpus_id,
+            "gcs_uris": uris[:RAG_IMPORT_BATCH_SIZE],
+            "matched_count": len(uris),
+            "imported_count": imported,
+            "failed_batches": failed_batches,
+            "message": f"Imported {imported}/{len(uris)} file(s) from gs://{bucket_name}/{prefix or ''} to corpus '{corpus_id}'"
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "corpus_id": corpus_id,
+            "error_message": str(e),
+            "message": f"Failed to import documents: {str(e)}"
+        }
+
 # RAG File Management Functions
 
 def list_rag_files(
@@ -411,7 +536,7 @@ def list_rag_files(
                 "name": file.name,
                 "display_name": file.display_name if hasattr(file, "display_name") else None,
                 "description": file.description if hasattr(file, "description") else None,
-                "source_uri": file.source_uri if hasattr(file, "source_uri") else None,
+                "source_uri": next(iter(_source_uris(file)), None),
                 "create_time": str(file.create_time) if hasattr(file, "create_time") else None,
                 "update_time": str(file.update_time) if hasattr(file, "update_time") else None
             })
@@ -432,6 +557,101 @@ def list_rag_files(
             "message": f"Failed to list files: {str(e)}"
         }
 
+def _fetch_files_page(
+    corpus_name: str,
+    page_size: int,
+    page_token: Optional[str],
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch a single page of RAG files and its continuation token."""
+    response = rag.list_files(
+        corpus_name=corpus_name,
+        page_size=page_size,
+        page_token=page_token
+    )
+    files = list(response.rag_files) if hasattr(response, "rag_files") else []
+    next_token = response.next_page_token if hasattr(response, "next_page_token") else None
+    return files, next_token or None
+
+
+def iter_rag_file_pages(
+    corpus_id: str,
+    page_size: Optional[int] = None,
+    page_token: Optional[str] = None
+) -> Iterator[List[Any]]:
+    """
+    Lazily yields every page of RAG files in a corpus, following next_page_token.
+    
+    While the caller works on the current page the next one is already being
+    fetched on a background thread, so at most two pages are held in memory.
+    
+    Args:
+        corpus_id: Corpus ID or full corpus resource name
+        page_size: Files per page (default: RAG_DEFAULT_PAGE_SIZE)
+        page_token: Token to resume from (default: first page)
+    
+    Yields:
+        Lists of raw RagFile objects, one list per page
+    """
+    if page_size is None:
+        page_size = RAG_DEFAULT_PAGE_SIZE
+    corpus_name = corpus_id if "/" in corpus_id else (
+        f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{corpus_id}"
+    )
+    
+    files, next_token = _fetch_files_page(corpus_name, page_size, page_token)
+    prefetch: Optional[Future] = None
+    try:
+        while True:
+            prefetch = (
+                _submit_prefetch(_fetch_files_page, corpus_name, page_size, next_token)
+                if next_token else None
+            )
+            yield files
+            if prefetch is None:
+                return
+            files, next_token = prefetch.result()
+    finally:
+        # Caller stopped early: drop the queued fetch if it has not started yet
+        if prefetch is not None:
+            prefetch.cancel()
+
+
+def iter_rag_files(
+    corpus_id: str,
+    page_size: Optional[int] = None
+) -> Iterator[Any]:
+    """
+    Lazily yields every RAG file in a corpus across all pages (with prefetch).
+    
+    Args:
+        corpus_id: Corpus ID or full corpus resource name
+        page_size: Files per underlying API page (default: RAG_DEFAULT_PAGE_SIZE)
+    
+    Yields:
+        Raw RagFile objects
+    """
+    for page in iter_rag_file_pages(corpus_id, page_size=page_size):
+        yield from page
+
+
+def count_files(
+    corpus_id: str,
+    page_size: Optional[int] = None
+) -> int:
+    """
+    Counts every file in a corpus by streaming through all pages.
+    
+    Memory stays constant: only the current and prefetched pages are alive.
+    
+    Args:
+        corpus_id: Corpus ID or full corpus resource name
+        page_size: Files per underlying API page (default: RAG_DEFAULT_PAGE_SIZE)
+    
+    Returns:
+        Total number of files in the corpus
+    """
+    return sum(len(page) for page in iter_rag_file_pages(corpus_id, page_size=page_size))
+
 def get_rag_file(
     corpus_id: str,
     file_id: str
@@ -463,7 +683,7 @@ def get_rag_file(
             "name": file.name,
             "display_name": file.display_name if hasattr(file, "display_name") else None,
             "description": file.description if hasattr(file, "description") else None,
-            "source_uri": file.source_uri if hasattr(file, "source_uri") else None,
+            "source_uri": next(iter(_source_uris(file)), None),
             "create_time": str(file.create_time) if hasattr(file, "create_time") else None,
             "update_time": str(file.update_time) if hasattr(file, "update_time") else None
         }
@@ -533,6 +753,329 @@ def delete_rag_file(
             "message": f"Failed to delete file: {str(e)}"
         }
 
+# Bulk File and Corpus Operations
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """Best-effort conversion of API timestamps (datetime, proto Timestamp, str) to aware datetimes."""
+    if value is None:
+        return None
+    if hasattr(value, "ToDatetime"):
+        value = value.ToDatetime(tzinfo=timezone.utc)
+    elif isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _source_uris(item: Any) -> List[str]:
+    """Source URIs of a RagFile: GCS URIs, or Drive links for Drive resources."""
+    uris = list(getattr(getattr(item, "gcs_source", None), "uris", None) or [])
+    drive = getattr(item, "google_drive_source", None)
+    for resource in getattr(drive, "resource_ids", None) or []:
+        if "FOLDER" in str(getattr(resource, "resource_type", "")):
+            uris.append(f"https://drive.google.com/drive/folders/{resource.resource_id}")
+        else:
+            uris.append(f"https://drive.google.com/file/d/{resource.resource_id}")
+    legacy = getattr(item, "source_uri", None)
+    if legacy:
+        uris.append(legacy)
+    return uris
+
+
+def _matches_filters(
+    item: Any,
+    display_name_pattern: Optional[str],
+    source_uri_prefix: Optional[str],
+    older_than_days: Optional[float],
+) -> bool:
+    """Check a RagFile/RagCorpus against the bulk-operation filters (all must match)."""
+    if display_name_pattern:
+        display_name = (getattr(item, "display_name", None) or "").lower()
+        if not fnmatch.fnmatchcase(display_name, display_name_pattern.lower()):
+            return False
+    if source_uri_prefix:
+        if not any(uri.startswith(source_uri_prefix) for uri in _source_uris(item)):
+            return False
+    if older_than_days is not None:
+        created = _as_datetime(getattr(item, "create_time", None))
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        if created is None or created > cutoff:
+            return False
+    return True
+
+
+def _run_bulk(
+    ids: List[str],
+    operation: Callable[[str], Dict[str, Any]],
+    id_key: str,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Run a single-item operation over many IDs on a bounded thread pool.
+
+    Returns:
+        Per-item results in input order and the number of successes
+    """
+    if not ids:
+        return [], 0
+    results: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+    max_workers = min(RAG_BULK_MAX_WORKERS, len(ids))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-bulk") as executor:
+        futures = {
+            submit_with_context(executor, operation, item_id): index
+            for index, item_id in enumerate(ids)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = {"status": "error", "error_message": str(e)}
+            entry = {id_key: ids[index], "status": outcome.get("status", "error")}
+            for key in ("file", "error_message"):
+                if key in outcome:
+                    entry[key] = outcome[key]
+            results[index] = entry
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return results, succeeded
+
+
+def _select_files(
+    corpus_id: str,
+    file_ids: Optional[List[str]],
+    display_name_pattern: Optional[str],
+    source_uri_prefix: Optional[str],
+    older_than_days: Optional[float],
+) -> List[str]:
+    """File IDs selected by an ID list and/or filters (filters are resolved against the full listing)."""
+    has_filters = any(
+        value is not None for value in (display_name_pattern, source_uri_prefix, older_than_days)
+    )
+    if not has_filters:
+        return list(dict.fromkeys(file_ids or []))
+    wanted = set(file_ids) if file_ids else None
+    matched = []
+    for file in iter_rag_files(corpus_id):
+        file_id = file.name.split("/")[-1]
+        if wanted is not None and file_id not in wanted:
+            continue
+        if _matches_filters(file, display_name_pattern, source_uri_prefix, older_than_days):
+            matched.append(file_id)
+    return matched
+
+
+def bulk_get_rag_files(
+    corpus_id: str,
+    file_ids: Optional[List[str]] = None,
+    display_name_pattern: Optional[str] = None,
+    source_uri_prefix: Optional[str] = None,
+    older_than_days: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Gets details of many RAG files in a corpus with one call, selected by ID list and/or filters
+    and fetched concurrently.
+    
+    Args:
+        corpus_id: The ID of the corpus
+        file_ids: Optional list of file IDs to get
+        display_name_pattern: Optional glob on the file display name (e.g., '*2024*.pdf')
+        source_uri_prefix: Optional source URI prefix (e.g., 'gs://bucket/old/')
+        older_than_days: Optional age filter; only files created more than N days ago
+    
+    Returns:
+        A dictionary containing:
+        - status: "success", "partial" or "error"
+        - matched_file_ids: Files selected
+        - results: Per-file results (file_id, status, file or error_message) in input order
+        - succeeded / failed: Outcome counts
+    """
+    if not file_ids and all(
+        value is None for value in (display_name_pattern, source_uri_prefix, older_than_days)
+    ):
+        return {
+            "status": "error",
+            "corpus_id": corpus_id,
+            "error_message": "No file_ids or filters provided",
+            "message": "Provide file_ids or at least one filter"
+        }
+
+    def _get_compact(file_id: str) -> Dict[str, Any]:
+        result = get_rag_file(corpus_id, file_id)
+        if "file" in result:
+            result["file"] = {k: v for k, v in result["file"].items() if k != "raw_api_data"}
+        return result
+    
+    try:
+        matched = _select_files(
+            corpus_id, file_ids, display_name_pattern, source_uri_prefix, older_than_days
+        )
+    except Exception as e:
+        return {
+            "status": "error",
+            "corpus_id": corpus_id,
+            "error_message": str(e),
+            "message": f"Failed to list files to match filters: {str(e)}"
+        }
+    results, succeeded = _run_bulk(matched, _get_compact, "file_id")
+    failed = len(results) - succeeded
+    return {
+        "status": "success" if not failed else ("partial" if succeeded else "error"),
+        "corpus_id": corpus_id,
+        "matched_file_ids": matched,
+        "results": results,
+        "succeeded": succeeded,
+        "failed": failed,
+        "message": f"Retrieved {succeeded}/{len(results)} file(s) from corpus '{corpus_id}'"
+    }
+
+
+def bulk_delete_rag_files(
+    corpus_id: str,
+    file_ids: Optional[List[str]] = None,
+    display_name_pattern: Optional[str] = None,
+    source_uri_prefix: Optional[str] = None,
+    older_than_days: Optional[float] = None,
+    dry_run: bool = True
+) -> Dict[str, Any]:
+    """
+    Deletes many RAG files from a corpus in one call, selected by ID list and/or filters.
+    Runs as a dry run by default; set dry_run=False only after the user confirms the preview.
+    
+    Args:
+        corpus_id: The ID of the corpus
+        file_ids: Optional list of file IDs to delete
+        display_name_pattern: Optional glob on the file display name (e.g., '*2024*.pdf')
+        source_uri_prefix: Optional source URI prefix (e.g., 'gs://bucket/old/')
+        older_than_days: Optional age filter; only files created more than N days ago
+        dry_run: Only list the files that would be deleted (default: True)
+    
+    Returns:
+        A dictionary containing:
+        - status: "success", "partial" or "error"
+        - matched_file_ids: Files selected for deletion
+        - results: Per-file deletion results (omitted in dry runs)
+        - dry_run: Whether anything was deleted
+    """
+    has_filters = any(
+        value is not None for value in (display_name_pattern, source_uri_prefix, older_than_days)
+    )
+    if not file_ids and not has_filters:
+        return {
+            "status": "error",
+            "corpus_id": corpus_id,
+            "error_message": "No file_ids or filters provided",
+            "message": "Refusing to delete: provide file_ids or at least one filter"
+        }
+    try:
+        matched = _select_files(
+            corpus_id, file_ids, display_name_pattern, source_uri_prefix, older_than_days
+        )
+        
+        if dry_run:
+            return {
+                "status": "success",
+                "corpus_id": corpus_id,
+                "matched_file_ids": matched,
+                "count": len(matched),
+                "dry_run": True,
+                "message": f"Dry run: {len(matched)} file(s) in corpus '{corpus_id}' would be deleted"
+            }
+        
+        results, succeeded = _run_bulk(
+            matched, lambda file_id: delete_rag_file(corpus_id, file_id), "file_id"
+        )
+        failed = len(results) - succeeded
+        return {
+            "status": "success" if not failed else ("partial" if succeeded else "error"),
+            "corpus_id": corpus_id,
+            "matched_file_ids": matched,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": failed,
+            "dry_run": False,
+            "message": f"Deleted {succeeded}/{len(matched)} file(s) from corpus '{corpus_id}'"
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "corpus_id": corpus_id,
+            "error_message": str(e),
+            "message": f"Failed to bulk delete files: {str(e)}"
+        }
+
+
+def bulk_delete_rag_corpora(
+    corpus_ids: Optional[List[str]] = None,
+    display_name_pattern: Optional[str] = None,
+    older_than_days: Optional[float] = None,
+    dry_run: bool = True
+) -> Dict[str, Any]:
+    """
+    Deletes many RAG corpora in one call, selected by ID list and/or filters.
+    Runs as a dry run by default; set dry_run=False only after the user confirms the preview.
+    
+    Args:
+        corpus_ids: Optional list of corpus IDs to delete
+        display_name_pattern: Optional glob on the corpus display name (e.g., 'sem1-*')
+        older_than_days: Optional age filter; only corpora created more than N days ago
+        dry_run: Only list the corpora that would be deleted (default: True)
+    
+    Returns:
+        A dictionary containing:
+        - status: "success", "partial" or "error"
+        - matched_corpus_ids: Corpora selected for deletion
+        - results: Per-corpus deletion results (omitted in dry runs)
+        - dry_run: Whether anything was deleted
+    """
+    has_filters = display_name_pattern is not None or older_than_days is not None
+    if not corpus_ids and not has_filters:
+        return {
+            "status": "error",
+            "error_message": "No corpus_ids or filters provided",
+            "message": "Refusing to delete: provide corpus_ids or at least one filter"
+        }
+    try:
+        if has_filters:
+            wanted = set(corpus_ids) if corpus_ids else None
+            matched = []
+            for corpus in rag.list_corpora():
+                corpus_id = corpus.name.split("/")[-1]
+                if wanted is not None and corpus_id not in wanted:
+                    continue
+                if _matches_filters(corpus, display_name_pattern, None, older_than_days):
+                    matched.append(corpus_id)
+        else:
+            matched = list(dict.fromkeys(corpus_ids))
+        
+        if dry_run:
+            return {
+                "status": "success",
+                "matched_corpus_ids": matched,
+                "count": len(matched),
+                "dry_run": True,
+                "message": f"Dry run: {len(matched)} corpora would be deleted"
+            }
+        
+        results, succeeded = _run_bulk(matched, delete_rag_corpus, "corpus_id")
+        failed = len(results) - succeeded
+        return {
+            "status": "success" if not failed else ("partial" if succeeded else "error"),
+            "matched_corpus_ids": matched,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": failed,
+            "dry_run": False,
+            "message": f"Deleted {succeeded}/{len(matched)} corpora"
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"Failed to bulk delete corpora: {str(e)}"
+        }
+
 # Function for simple direct corpus querying
 def query_rag_corpus(
     corpus_id: str,
@@ -570,11 +1113,14 @@ def query_rag_corpus(
         )
         
         # Execute the query directly using the API
-        response = rag.retrieval_query(
-            rag_resources=[rag_resource],
-            text=query_text,
-            rag_retrieval_config=retrieval_config
-        )
+        with span("rag.retrieval_query", corpus_id=corpus_id, top_k=top_k), \
+                track_in_flight("rag_vertex_in_flight", call="retrieval_query"), \
+                log_latency("rag.retrieval_query", corpus_id=corpus_id):
+            response = rag.retrieval_query(
+                rag_resources=[rag_resource],
+                text=query_text,
+                rag_retrieval_config=retrieval_config
+            )
         
         # Process the results
         results = []
@@ -603,6 +1149,7 @@ def query_rag_corpus(
         }
         
     except Exception as e:
+        increment("rag_vertex_errors", call="retrieval_query", error_class=type(e).__name__)
         return {
             "status": "error",
             "corpus_id": corpus_id,
@@ -634,8 +1181,8 @@ def search_all_corpora(
     if vector_distance_threshold is None:
         vector_distance_threshold = RAG_DEFAULT_VECTOR_DISTANCE_THRESHOLD
     try:
-        # First, list all available corpora
-        corpora_response = list_rag_corpora()
+        # First, list all available corpora (file counts are not needed for search)
+        corpora_response = list_rag_corpora(include_file_counts=False)
         
         if corpora_response["status"] != "success":
             return {
@@ -674,7 +1221,7 @@ def search_all_corpora(
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all corpus search tasks
             futures = {
-                executor.submit(_search_single_corpus, corpus): corpus
+                submit_with_context(executor, _search_single_corpus, corpus): corpus
                 for corpus in all_corpora
             }
 
@@ -714,10 +1261,10 @@ def search_all_corpora(
                             searched_corpora.append(corpus_name)
                 except TimeoutError:
                     # Individual corpus search timed out - log but continue with other corpora
-                    pass
+                    increment("rag_corpus_search_failures", reason="timeout")
                 except Exception as e:
                     # Individual corpus search failed - log but don't fail entire search
-                    pass
+                    increment("rag_corpus_search_failures", reason=type(e).__name__)
         
         # Sort all results by relevance score (if available)
         all_results.sort(
@@ -746,6 +1293,9 @@ def search_all_corpora(
         }
         
     except Exception as e:
+        if isinstance(e, TimeoutError):
+            # as_completed gave up on corpora still running after CORPUS_SEARCH_TIMEOUT
+            increment("rag_corpus_search_failures", reason="timeout")
         return {
             "status": "error",
             "error_message": str(e),
@@ -759,12 +1309,18 @@ list_corpora_tool = FunctionTool(list_rag_corpora)
 get_corpus_tool = FunctionTool(get_rag_corpus)
 delete_corpus_tool = FunctionTool(delete_rag_corpus)
 import_document_tool = FunctionTool(import_document_to_corpus)
+import_from_prefix_tool = FunctionTool(import_documents_from_prefix)
 
 # Create FunctionTools from the functions for the RAG file management tools
 list_files_tool = FunctionTool(list_rag_files)
 get_file_tool = FunctionTool(get_rag_file)
 delete_file_tool = FunctionTool(delete_rag_file)
 
+# Create FunctionTools from the functions for the bulk operation tools
+bulk_get_files_tool = FunctionTool(bulk_get_rag_files)
+bulk_delete_files_tool = FunctionTool(bulk_delete_rag_files)
+bulk_delete_corpora_tool = FunctionTool(bulk_delete_rag_corpora)
+
 # Create FunctionTools from the functions for the RAG query tools
 query_rag_corpus_tool = FunctionTool(query_rag_corpus)
 search_all_corpora_tool = FunctionTool(search_all_corpora) 
\ No newline at end of file
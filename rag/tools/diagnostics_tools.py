@@ -0,0 +1,64 @@
+"""
+Process diagnostics tools for ADK
+
+This module exposes the memory profiler (tracemalloc snapshots, allocation
+growth and in-memory store sizes) as a tool, so a running worker can be
+inspected without a restart.
+"""
+
+from typing import Any, Dict
+
+from google.adk.tools import FunctionTool
+
+from rag.utils.memory_profiler import get_memory_profiler
+
+
+def get_memory_report(
+    since: str = "previous",
+    include_object_types: bool = False,
+    stop: bool = False,
+) -> Dict[str, Any]:
+    """
+    Reports process memory, the allocation sites that grew the most, and the
+    sizes of in-memory caches and stores.
+
+    The first call starts allocation tracing and has no growth to report;
+    later calls compare against the previous call or the first one. Tracing
+    slows the process, so pass stop=True with the last report needed; it also
+    stops on its own a while after the latest report.
+
+    Args:
+        since: "previous" to compare with the last report, or "baseline" to compare with the first
+        include_object_types: Also count live objects by type (slow on large processes)
+        stop: Stop allocation tracing after this report
+
+    Returns:
+        A dictionary with traced and resident memory, top growing allocation sites and store entry counts
+    """
+    try:
+        report = get_memory_profiler().report(
+            since=since, object_types=include_object_types, stop=stop
+        )
+    except ValueError as e:
+        return {
+            "status": "error",
+            "error_message": str(e),
+            "message": f"Invalid memory report request: {str(e)}"
+        }
+    message = (
+        f"Traced {report['traced_bytes'] // 1024} KiB; "
+        f"{len(report['top_growers'])} growing allocation sites"
+        if report["since"] else
+        "Allocation tracing started; request another report to see growth"
+    )
+    if not report["tracing"]:
+        message += "; allocation tracing stopped"
+    return {
+        "status": "success",
+        "message": message,
+        "report": report
+    }
+
+
+# Create FunctionTools from the functions
+memory_report_tool = FunctionTool(get_memory_report)
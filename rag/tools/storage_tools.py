@@ -16,6 +16,7 @@ from rag.config import (
     GCS_DEFAULT_LOCATION,
     GCS_LIST_BUCKETS_MAX_RESULTS,
     GCS_LIST_BLOBS_MAX_RESULTS,
+    GCS_SUMMARY_PAGE_SIZE,
     GCS_DEFAULT_CONTENT_TYPE,
     LOG_LEVEL,
     LOG_FORMAT
@@ -152,18 +153,64 @@ def list_gcs_buckets(
             "message": f"An unexpected error occurred: {str(e)}"
         }
 
+def _summarize_blobs(blobs) -> Dict[str, Any]:
+    """
+    Aggregates a blob listing in a single streaming pass.
+    
+    Only running totals are kept, so memory stays constant no matter how many
+    objects the listing yields.
+    
+    Returns:
+        A dictionary with object_count, total_bytes and a per-content-type
+        histogram of object counts and bytes
+    """
+    object_count = 0
+    total_bytes = 0
+    content_types: Dict[str, Dict[str, int]] = {}
+    for blob in blobs:
+        size = blob.size or 0
+        object_count += 1
+        total_bytes += size
+        bucket_stats = content_types.setdefault(
+            blob.content_type or "unknown", {"count": 0, "bytes": 0}
+        )
+        bucket_stats["count"] += 1
+        bucket_stats["bytes"] += size
+    
+    return {
+        "object_count": object_count,
+        "total_bytes": total_bytes,
+        "content_types": content_types,
+    }
+
 def get_bucket_details(
-    bucket_name: str
+    bucket_name: str,
+    include_files: bool = False,
+    prefix: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    max_results: Optional[int] = None,
+    page_token: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Gets detailed information about a specific GCS bucket, including a list of all files (blobs).
+    Gets detailed information about a specific GCS bucket.
+    
+    By default only summary aggregates (object count, total bytes, per-content-type
+    histogram) are returned, computed in one streaming pass. Set include_files to
+    get a single bounded page of files plus a next_page_token cursor instead.
     
     Args:
         bucket_name: The name of the bucket to get details for
+        include_files: Return one page of files instead of the summary (default: False)
+        prefix: Optional prefix to restrict the listing server-side
+        delimiter: Optional delimiter (e.g., '/') so sub-folders are returned as prefixes
+        max_results: Files per page when include_files is set (default: 100)
+        page_token: Cursor from a previous call's next_page_token
         
     Returns:
-        A dictionary containing the bucket details and a list of files
+        A dictionary containing the bucket details and either a summary or a page of files
     """
+    if max_results is None:
+        max_results = GCS_LIST_BLOBS_MAX_RESULTS
     try:
         # Initialize the client
         client = storage.Client(project=PROJECT_ID)
@@ -171,40 +218,75 @@ def get_bucket_details(
         # Get the bucket
         bucket = client.get_bucket(bucket_name)
         
-        # List all blobs in the bucket
-        blobs = client.list_blobs(bucket_name)
+        bucket_details = {
+            "name": bucket.name,
+            "id": bucket.id,
+            "project_number": bucket.project_number,
+            "location": bucket.location,
+            "location_type": bucket.location_type,
+            "storage_class": bucket.storage_class,
+            "created": bucket.time_created.isoformat() if bucket.time_created else None,
+            "updated": bucket.updated.isoformat() if hasattr(bucket, "updated") and bucket.updated else None,
+            "versioning_enabled": bucket.versioning_enabled,
+            "labels": bucket.labels,
+            "requester_pays": bucket.requester_pays,
+            "self_link": f"https://storage.googleapis.com/{bucket_name}",
+            "etag": bucket.etag,
+        }
+        scope = f" under prefix '{prefix}'" if prefix else ""
+        
+        if not include_files:
+            # Stream the whole listing with a field projection so each page stays small
+            blobs = client.list_blobs(
+                bucket_name,
+                prefix=prefix,
+                delimiter=delimiter,
+                page_size=GCS_SUMMARY_PAGE_SIZE,
+                fields="items(name,size,contentType),prefixes,nextPageToken"
+            )
+            summary = _summarize_blobs(blobs)
+            if delimiter:
+                summary["prefixes"] = sorted(blobs.prefixes)
+            bucket_details["summary"] = summary
+            return {
+                "status": "success",
+                "bucket": bucket_details,
+                "message": f"Successfully retrieved details for bucket '{bucket_name}': "
+                           f"{summary['object_count']} file(s), {summary['total_bytes']} bytes{scope}"
+            }
+        
+        # Fetch exactly one page of files and hand back the cursor for the next one
+        blobs = client.list_blobs(
+            bucket_name,
+            prefix=prefix,
+            delimiter=delimiter,
+            page_size=max_results,
+            page_token=page_token
+        )
+        page = next(blobs.pages, None)
         blob_list = []
-        for blob in blobs:
-            blob_list.append({
-                "name": blob.name,
-                "size": blob.size,
-                "content_type": blob.content_type,
-                "updated": blob.updated.isoformat() if blob.updated else None,
-                "gcs_uri": f"gs://{bucket_name}/{blob.name}",
-                "public_url": f"https://storage.googleapis.com/{bucket_name}/{blob.name}"
-            })
+        prefix_list = []
+        if page is not None:
+            for blob in page:
+                blob_list.append({
+                    "name": blob.name,
+                    "size": blob.size,
+                    "content_type": blob.content_type,
+                    "updated": blob.updated.isoformat() if blob.updated else None,
+                    "gcs_uri": f"gs://{bucket_name}/{blob.name}",
+                    "public_url": f"https://storage.googleapis.com/{bucket_name}/{blob.name}"
+                })
+            prefix_list = sorted(page.prefixes)
         
-        # Return detailed information
+        bucket_details["files"] = blob_list
+        bucket_details["file_count"] = len(blob_list)
+        bucket_details["prefixes"] = prefix_list
         return {
             "status": "success",
-            "bucket": {
-                "name": bucket.name,
-                "id": bucket.id,
-                "project_number": bucket.project_number,
-                "location": bucket.location,
-                "location_type": bucket.location_type,
-                "storage_class": bucket.storage_class,
-                "created": bucket.time_created.isoformat() if bucket.time_created else None,
-                "updated": bucket.updated.isoformat() if hasattr(bucket, "updated") and bucket.updated else None,
-                "versioning_enabled": bucket.versioning_enabled,
-                "labels": bucket.labels,
-                "requester_pays": bucket.requester_pays,
-                "self_link": f"https://storage.googleapis.com/{bucket_name}",
-                "etag": bucket.etag,
-                "files": blob_list,
-                "file_count": len(blob_list)
-            },
-            "message": f"Successfully retrieved details and {len(blob_list)} file(s) for bucket '{bucket_name}'"
+            "bucket": bucket_details,
+            "next_page_token": blobs.next_page_token,
+            "message": f"Successfully retrieved details and {len(blob_list)} file(s) for bucket '{bucket_name}'{scope}"
+                       + (" (more available via next_page_token)" if blobs.next_page_token else "")
         }
     except GoogleAPIError as e:
         return {
@@ -223,7 +305,8 @@ def list_blobs_in_bucket(
     bucket_name: str,
     prefix: Optional[str] = None,
     delimiter: Optional[str] = None,
-    max_results: Optional[int] = None
+    max_results: Optional[int] = None,
+    page_token: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Lists blobs (files) in a Google Cloud Storage bucket.
@@ -233,9 +316,11 @@ def list_blobs_in_bucket(
         prefix: Optional prefix to filter blobs by name
         delimiter: Optional delimiter for hierarchy simulation (e.g., '/' for folders)
         max_results: Maximum number of results to return (default: 100)
+        page_token: Cursor from a previous call's next_page_token
         
     Returns:
-        A dictionary containing the list of blobs and prefixes (if delimiter is used)
+        A dictionary containing the list of blobs, prefixes (if delimiter is used)
+        and a next_page_token when more results are available
     """
     if max_results is None:
         max_results = GCS_LIST_BLOBS_MAX_RESULTS
@@ -251,7 +336,8 @@ def list_blobs_in_bucket(
             bucket_name, 
             prefix=prefix, 
             delimiter=delimiter,
-            max_results=max_results
+            max_results=max_results,
+            page_token=page_token
         )
         
         # Process the results
@@ -280,6 +366,7 @@ def list_blobs_in_bucket(
             "prefixes": prefix_list,
             "count": len(blob_list),
             "prefix_count": len(prefix_list),
+            "next_page_token": blobs.next_page_token,
             "message": f"Found {len(blob_list)} file(s) and {len(prefix_list)} folder(s) in bucket '{bucket_name}'"
                       + (f" with prefix '{prefix}'" if prefix else "")
         }
@@ -1,13 +1,35 @@
 """RAG utility modules."""
 
+from rag.utils.history_compactor import (
+    HistoryCompactor,
+    compact_history_callback,
+)
+from rag.utils.instrumentation import (
+    get_tool_stats,
+    instrument_tools,
+)
+from rag.utils.llm_accounting import (
+    get_llm_usage,
+    get_session_usage,
+)
 from rag.utils.latency_logger import (
     LatencyLogger,
     log_latency,
+    current_percentile,
     get_metrics_summary,
+    get_rolling_summary,
 )
 
 __all__ = [
+    "HistoryCompactor",
+    "compact_history_callback",
+    "get_tool_stats",
+    "instrument_tools",
+    "get_llm_usage",
+    "get_session_usage",
     "LatencyLogger",
     "log_latency",
+    "current_percentile",
     "get_metrics_summary",
+    "get_rolling_summary",
 ]
@@ -0,0 +1,259 @@
+"""Token-budget history compaction for LLM requests.
+
+ADK rebuilds the full conversation into every ``LlmRequest``. The compactor
+keeps a running token estimate per session, counts only the contents added
+since its previous call, and drops whole turns from the front until the
+history fits ``RAG_MAX_HISTORY_TOKENS``. Evicted turns can be folded into a
+short cached summary that is prepended to the oldest kept turn.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from rag.config import HISTORY_SUMMARY_TOKENS, MAX_HISTORY_TOKENS
+from rag.utils.memory_profiler import register_store
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate; good enough for budgeting without a tokenizer call
+_CHARS_PER_TOKEN = 4
+# Characters of each evicted user message kept in the fallback summary
+_SUMMARY_SNIPPET_CHARS = 160
+# Sessions whose windows are kept in memory (LRU)
+_MAX_SESSIONS = 1024
+
+Summarizer = Callable[[List[types.Content]], str]
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """Approximate token count of one content (text, function calls and responses)."""
+    chars = 0
+    for part in content.parts or ():
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call is not None:
+            chars += len(part.function_call.name or "") + len(str(part.function_call.args or ""))
+        elif part.function_response is not None:
+            chars += len(str(part.function_response.response or ""))
+        else:
+            chars += 64
+    return chars // _CHARS_PER_TOKEN + 1
+
+
+def _is_turn_start(content: types.Content) -> bool:
+    """A turn starts at a user message with text; function responses continue a turn."""
+    return content.role == "user" and any(part.text for part in content.parts or ())
+
+
+def _fingerprint(content: types.Content) -> Tuple[Any, ...]:
+    first = (content.parts or [None])[0]
+    text = first.text if first is not None and first.text else ""
+    return content.role, len(content.parts or ()), text[:32]
+
+
+def extractive_summary(evicted: List[types.Content]) -> str:
+    """Fallback summarizer: the opening words of each evicted user message."""
+    lines = []
+    for content in evicted:
+        if not _is_turn_start(content):
+            continue
+        text = " ".join(part.text for part in content.parts if part.text).strip()
+        if text:
+            lines.append(f"- {text[:_SUMMARY_SNIPPET_CHARS]}")
+    return "\n".join(lines)
+
+
+def _fit_summary(summary: str, max_chars: int) -> str:
+    """Keep the newest whole summary lines within ``max_chars``.
+
+    Oldest lines are dropped first; a single line longer than the budget
+    keeps its beginning (the question's opening words) rather than its tail.
+    """
+    lines = summary.split("\n")
+    size = len(summary)
+    start = 0
+    while start < len(lines) - 1 and size > max_chars:
+        size -= len(lines[start]) + 1
+        start += 1
+    kept = lines[start:]
+    if size > max_chars:
+        kept[0] = kept[0][:max_chars]
+    return "\n".join(kept)
+
+
+class _SessionWindow:
+    """Running token accounting for one session's history.
+
+    ``turns`` holds ``(start_index, tokens)`` for every kept turn, oldest
+    first; ``offset`` is the content index where the kept history begins.
+    Each content is counted once and each turn evicted once, so compaction
+    is amortized O(1) per new content.
+    """
+
+    __slots__ = ("seen", "last_fingerprint", "turns", "tokens", "offset", "summary", "summary_tokens")
+
+    def __init__(self) -> None:
+        self.seen = 0
+        self.last_fingerprint: Optional[Tuple[Any, ...]] = None
+        self.turns: Deque[List[int]] = deque()
+        self.tokens = 0
+        self.offset = 0
+        self.summary = ""
+        self.summary_tokens = 0
+
+
+class HistoryCompactor:
+    """Holds each session's request history under a fixed token budget.
+
+    Args:
+        max_tokens: Budget for the conversation contents of one request
+        summary_tokens: Budget for the summary of evicted turns (0 disables summaries)
+        summarizer: Turns evicted contents into summary text; defaults to
+            ``extractive_summary``. Called once per eviction, results are cached.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = MAX_HISTORY_TOKENS,
+        summary_tokens: int = HISTORY_SUMMARY_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summary
+        self._sessions: "OrderedDict[str, _SessionWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _window(self, session_key: str) -> _SessionWindow:
+        window = self._sessions.get(session_key)
+        if window is None:
+            window = self._sessions[session_key] = _SessionWindow()
+            while len(self._sessions) > _MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_key)
+        return window
+
+    def _ingest(self, window: _SessionWindow, contents: List[types.Content]) -> None:
+        """Account for contents appended since the last call (recount on divergence)."""
+        if window.seen > len(contents) or (
+            window.seen and _fingerprint(contents[window.seen - 1]) != window.last_fingerprint
+        ):
+            window.__init__()
+
+        for position in range(window.seen, len(contents)):
+            content = contents[position]
+            tokens = estimate_tokens(content)
+            if not window.turns or _is_turn_start(content):
+                window.turns.append([position, tokens])
+            else:
+                window.turns[-1][1] += tokens
+            window.tokens += tokens
+        window.seen = len(contents)
+        if contents:
+            window.last_fingerprint = _fingerprint(contents[-1])
+
+    def _evict(self, window: _SessionWindow, contents: List[types.Content]) -> None:
+        budget = self.max_tokens - window.summary_tokens
+        evicted_from = window.offset
+        while len(window.turns) > 1 and window.tokens > budget:
+            _, tokens = window.turns.popleft()
+            window.tokens -= tokens
+            window.offset = window.turns[0][0]
+        if window.offset == evicted_from or self.summary_tokens <= 0:
+            return
+
+        addition = self.summarizer(contents[evicted_from:window.offset])
+        if not addition:
+            return
+        summary = f"{window.summary}\n{addition}" if window.summary else addition
+        window.summary = _fit_summary(summary, self.summary_tokens * _CHARS_PER_TOKEN)
+        window.summary_tokens = len(summary) // _CHARS_PER_TOKEN + 1
+
+    def compact(self, session_key: str, contents: List[types.Content]) -> List[types.Content]:
+        """Return ``contents`` trimmed to the token budget for this session.
+
+        The input list and its contents are never mutated; when a summary is
+        used, the first kept content is replaced by a copy carrying it.
+        """
+        if self.max_tokens <= 0 or not contents:
+            return contents
+
+        with self._lock:
+            window = self._window(session_key)
+            self._ingest(window, contents)
+            if window.tokens + window.summary_tokens > self.max_tokens:
+                self._evict(window, contents)
+            offset, summary = window.offset, window.summary
+
+        if offset == 0:
+            return contents
+        kept = list(contents[offset:])
+        if summary:
+            first = kept[0]
+            note = types.Part(text=f"[Summary of earlier conversation]\n{summary}")
+            kept[0] = types.Content(role=first.role, parts=[note, *(first.parts or [])])
+        return kept
+
+    def window_stats(self, session_key: str) -> Optional[dict]:
+        """Current accounting for a session (kept turns, tokens, evicted contents)."""
+        with self._lock:
+            window = self._sessions.get(session_key)
+            if window is None:
+                return None
+            return {
+                "kept_turns": len(window.turns),
+                "kept_tokens": window.tokens,
+                "summary_tokens": window.summary_tokens,
+                "evicted_contents": window.offset,
+            }
+
+    def memory_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "kept_turns": sum(len(window.turns) for window in self._sessions.values()),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+_COMPACTOR = HistoryCompactor()
+register_store("history_compactor", _COMPACTOR.memory_counts)
+
+
+def compact_history_callback(callback_context: Any, llm_request: Any) -> None:
+    """``before_model_callback`` that applies the shared compactor to each request.
+
+    Sessions are keyed by session id and agent name, since every agent
+    builds its own view of the history.
+    """
+    session = getattr(callback_context, "session", None)
+    session_id = getattr(session, "id", None) or getattr(callback_context, "invocation_id", "")
+    key = f"{session_id}:{callback_context.agent_name}"
+    before = len(llm_request.contents)
+    llm_request.contents = _COMPACTOR.compact(key, llm_request.contents)
+    if len(llm_request.contents) != before:
+        logger.debug(f"Compacted history for {key}: {before} -> {len(llm_request.contents)} contents")
+    return None
+
+
+def get_history_compactor() -> HistoryCompactor:
+    return _COMPACTOR
+
+
+__all__ = [
+    "HistoryCompactor",
+    "compact_history_callback",
+    "estimate_tokens",
+    "extractive_summary",
+    "get_history_compactor",
+]
@@ -0,0 +1,188 @@
+"""Automatic latency and outcome instrumentation for ADK tools.
+
+``instrument_tools`` wraps the ``run_async`` of every ``FunctionTool`` and
+``AgentTool`` an agent is built with, so each call records its latency in
+the shared ``LatencyLogger`` (as ``tool.<name>`` or ``agent.<name>``) and
+its outcome, result size and error class in per-tool counters; each call
+is also a tracing span. Wrapping is idempotent, so tools shared between agents are only instrumented once.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.base_tool import BaseTool
+
+from rag.utils.latency_logger import LatencyLogger
+from rag.utils.metrics import labels, register_callback
+from rag.utils.tracing import span
+
+_INSTRUMENTED_ATTR = "_rag_instrumented"
+
+
+class _ToolCounters:
+    __slots__ = ("calls", "errors", "exceptions", "error_classes", "payload_bytes", "max_payload_bytes")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.exceptions = 0
+        self.error_classes: Dict[str, int] = {}
+        self.payload_bytes = 0
+        self.max_payload_bytes = 0
+
+
+_COUNTERS: Dict[str, _ToolCounters] = {}
+_COUNTERS_LOCK = threading.Lock()
+
+
+def operation_name(tool: BaseTool) -> str:
+    """Metric name for a tool: ``agent.<name>`` for sub-agents, else ``tool.<name>``."""
+    kind = "agent" if isinstance(tool, AgentTool) else "tool"
+    return f"{kind}.{tool.name}"
+
+
+def _payload_size(result: Any) -> int:
+    """Approximate serialized size of a tool result in bytes."""
+    if result is None:
+        return 0
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return len(str(result))
+
+
+def _outcome(result: Any) -> Optional[str]:
+    """Error class of a call that returned instead of raising, if any."""
+    if not isinstance(result, dict):
+        return None
+    if result.get("status") == "error":
+        return "ToolError"
+    if "error" in result:
+        # ADK reports argument validation failures as {"error": ...}
+        return "InvalidArguments"
+    return None
+
+
+def _record(operation: str, duration_ms: float, payload: int, error_class: Optional[str], raised: bool) -> None:
+    with _COUNTERS_LOCK:
+        counters = _COUNTERS.get(operation)
+        if counters is None:
+            counters = _COUNTERS[operation] = _ToolCounters()
+        counters.calls += 1
+        counters.payload_bytes += payload
+        counters.max_payload_bytes = max(counters.max_payload_bytes, payload)
+        if error_class is not None:
+            counters.errors += 1
+            counters.exceptions += raised
+            counters.error_classes[error_class] = counters.error_classes.get(error_class, 0) + 1
+    LatencyLogger().record(
+        operation,
+        duration_ms,
+        outcome="ok" if error_class is None else ("exception" if raised else "error"),
+        error_class=error_class,
+        payload_bytes=payload,
+    )
+
+
+def instrument_tool(tool: Any) -> Any:
+    """Wrap one tool's ``run_async`` with timing and outcome accounting.
+
+    Returns the same tool object. Non-``BaseTool`` entries (plain callables
+    ADK wraps itself) and already-instrumented tools are returned unchanged.
+    """
+    if not isinstance(tool, BaseTool) or getattr(tool, _INSTRUMENTED_ATTR, False):
+        return tool
+
+    operation = operation_name(tool)
+    run_async = tool.run_async
+
+    async def instrumented_run_async(*, args: Dict[str, Any], tool_context: Any) -> Any:
+        with span(operation) as active:
+            start = time.perf_counter()
+            try:
+                result = await run_async(args=args, tool_context=tool_context)
+            except Exception as e:
+                _record(operation, (time.perf_counter() - start) * 1000, 0, type(e).__name__, True)
+                raise
+            payload, error_class = _payload_size(result), _outcome(result)
+            _record(operation, (time.perf_counter() - start) * 1000, payload, error_class, False)
+            if active is not None:
+                active.set_attribute("payload_bytes", payload)
+                if error_class is not None:
+                    active.error = error_class
+            return result
+
+    tool.run_async = instrumented_run_async
+    setattr(tool, _INSTRUMENTED_ATTR, True)
+    return tool
+
+
+def instrument_tools(tools: Iterable[Any]) -> List[Any]:
+    """Instrument every tool in an agent's tool list (idempotent)."""
+    return [instrument_tool(tool) for tool in tools]
+
+
+def get_tool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-tool call counts, errors by class and result sizes, merged with latency summaries.
+
+    Returns:
+        Dict mapping ``tool.<name>`` / ``agent.<name>`` to counters plus the
+        operation's ``LatencyLogger`` summary (count, avg and percentile ms)
+    """
+    latency = LatencyLogger().get_summary()
+    with _COUNTERS_LOCK:
+        return {
+            operation: {
+                "calls": counters.calls,
+                "errors": counters.errors,
+                "exceptions": counters.exceptions,
+                "error_classes": dict(counters.error_classes),
+                "avg_payload_bytes": counters.payload_bytes // counters.calls if counters.calls else 0,
+                "max_payload_bytes": counters.max_payload_bytes,
+                "latency": latency.get(operation, {}),
+            }
+            for operation, counters in _COUNTERS.items()
+        }
+
+
+def _counter_samples(field: str) -> Dict[Any, float]:
+    with _COUNTERS_LOCK:
+        return {labels(operation=op): getattr(c, field) for op, c in _COUNTERS.items()}
+
+
+def _error_samples() -> Dict[Any, float]:
+    with _COUNTERS_LOCK:
+        return {
+            labels(operation=op, error_class=error_class): count
+            for op, c in _COUNTERS.items()
+            for error_class, count in c.error_classes.items()
+        }
+
+
+register_callback("rag_tool_calls", "counter", lambda: _counter_samples("calls"), "Tool and sub-agent calls.")
+register_callback("rag_tool_errors", "counter", _error_samples, "Failed tool and sub-agent calls by error class.")
+register_callback(
+    "rag_tool_payload_bytes", "counter", lambda: _counter_samples("payload_bytes"),
+    "Serialized bytes returned by tool and sub-agent calls.",
+)
+
+
+def clear_tool_stats() -> None:
+    with _COUNTERS_LOCK:
+        _COUNTERS.clear()
+
+
+__all__ = [
+    "clear_tool_stats",
+    "get_tool_stats",
+    "instrument_tool",
+    "instrument_tools",
+    "operation_name",
+]
@@ -1,20 +1,47 @@
-"""Latency logging and observability for RAG operations."""
+"""Latency logging and observability for RAG operations.
+
+Each operation keeps a fixed-memory, log-bucketed latency sketch (DDSketch
+style: every quantile is within ``RAG_METRICS_SKETCH_ACCURACY`` relative
+error) instead of every raw sample, plus a bounded ring buffer of the most
+recent measurements for debugging. Rolling 1m / 5m / 1h windows per
+operation are built from rotating sub-sketches, so recent regressions are
+not averaged away by the process lifetime.
+"""
 
 from __future__ import annotations
 
 import logging
+import math
+import threading
 import time
-from collections import defaultdict
+from bisect import bisect_right
+from collections import deque
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional
-
-from rag.config import LOG_LEVEL
+from itertools import accumulate
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from rag.config import (
+    LOG_LEVEL,
+    METRICS_RECENT_SAMPLES,
+    METRICS_SKETCH_ACCURACY,
+    SLOW_OPERATION_MS,
+)
+from rag.utils.memory_profiler import register_store
+from rag.utils.profiler import get_slow_operation_profiler
 
 logger = logging.getLogger(__name__)
 logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
 
+# Quantiles reported by every summary, as (key suffix, quantile)
+SUMMARY_QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))
+# Rolling windows as name -> (span seconds, rotating slots)
+ROLLING_WINDOWS = {"1m": (60.0, 6), "5m": (300.0, 10), "1h": (3600.0, 12)}
+# Durations are clamped to this range, which bounds the number of buckets
+_MIN_TRACKED_MS = 1e-3
+_MAX_TRACKED_MS = 1e7
+
 
 @dataclass
 class LatencyMetric:
@@ -25,11 +52,148 @@ class LatencyMetric:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+class LatencySketch:
+    """Fixed-memory latency histogram with relative-error quantiles.
+
+    Durations fall into logarithmic buckets ``gamma**(i-1) < d <= gamma**i``
+    with ``gamma = (1 + accuracy) / (1 - accuracy)``, so any quantile read
+    from the bucket midpoint is within ``accuracy`` of the true value. With
+    the clamped range and 1% accuracy that is at most ~1,200 buckets no
+    matter how many samples are recorded. Not thread-safe on its own.
+    """
+
+    __slots__ = ("_gamma_log", "_gamma", "buckets", "count", "total", "min", "max", "_summary")
+
+    def __init__(self, accuracy: float = METRICS_SKETCH_ACCURACY) -> None:
+        accuracy = min(max(accuracy, 1e-4), 0.5)
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._gamma_log = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._summary: Optional[Dict[str, float]] = None
+
+    def add(self, duration_ms: float, count: int = 1) -> None:
+        clamped = min(max(duration_ms, _MIN_TRACKED_MS), _MAX_TRACKED_MS)
+        key = math.ceil(math.log(clamped) / self._gamma_log)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+        self.total += duration_ms * count
+        if duration_ms < self.min:
+            self.min = duration_ms
+        if duration_ms > self.max:
+            self.max = duration_ms
+        self._summary = None
+
+    def merge(self, other: "LatencySketch") -> None:
+        """Fold another sketch (built with the same accuracy) into this one."""
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._summary = None
+
+    def quantiles(self, qs: List[float]) -> List[float]:
+        """Estimate several quantiles with one pass over the buckets."""
+        if not self.count:
+            return [0.0 for _ in qs]
+        keys = sorted(self.buckets)
+        cumulative = list(accumulate(self.buckets[key] for key in keys))
+        values = []
+        for q in qs:
+            position = min(bisect_right(cumulative, q * (self.count - 1)), len(keys) - 1)
+            estimate = 2 * self._gamma ** keys[position] / (self._gamma + 1)
+            values.append(min(max(estimate, self.min), self.max))
+        return values
+
+    def cumulative_counts(self, bounds_ms: List[float]) -> List[int]:
+        """Samples at or below each bound (ascending), for fixed-bucket histogram export.
+
+        A sketch bucket is counted under a bound when its upper edge is, so
+        each count is exact up to the sketch's relative accuracy.
+        """
+        counts = []
+        keys = sorted(self.buckets)
+        position = seen = 0
+        for bound in bounds_ms:
+            while position < len(keys) and self._gamma ** keys[position] <= bound * (1 + 1e-9):
+                seen += self.buckets[keys[position]]
+                position += 1
+            counts.append(seen)
+        return counts
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, extremes and ``SUMMARY_QUANTILES``; cached until the next sample."""
+        if self._summary is None:
+            estimates = self.quantiles([q for _, q in SUMMARY_QUANTILES])
+            self._summary = {
+                "count": self.count,
+                "avg_ms": self.total / self.count if self.count else 0.0,
+                "min_ms": self.min if self.count else 0.0,
+                "max_ms": self.max,
+                "total_ms": self.total,
+                **{f"{name}_ms": round(value, 3) for (name, _), value in zip(SUMMARY_QUANTILES, estimates)},
+            }
+        return self._summary
+
+
+class RollingLatencyWindow:
+    """Latency sketch over a trailing time window.
+
+    The window is split into ``slots`` sub-sketches of ``span / slots``
+    seconds each; a slot is reset when time wraps back onto it. Reads merge
+    the live slots once per slot period (or after new samples) and cache the
+    result, so the window covers between ``span - span / slots`` and
+    ``span`` seconds of samples.
+    """
+
+    __slots__ = ("span", "width", "_slots", "_epochs", "_merged", "_merged_epoch")
+
+    def __init__(self, span: float, slots: int) -> None:
+        self.span = span
+        self.width = span / slots
+        self._slots = [LatencySketch() for _ in range(slots)]
+        self._epochs = [-1] * slots
+        self._merged: Optional[LatencySketch] = None
+        self._merged_epoch = -1
+
+    def add(self, duration_ms: float, now: float) -> None:
+        epoch = int(now // self.width)
+        position = epoch % len(self._slots)
+        if self._epochs[position] != epoch:
+            self._slots[position] = LatencySketch()
+            self._epochs[position] = epoch
+        self._slots[position].add(duration_ms)
+        self._merged = None
+
+    def sketch(self, now: float) -> LatencySketch:
+        """Merged sketch of the live slots (cached; do not mutate)."""
+        epoch = int(now // self.width)
+        if self._merged is None or self._merged_epoch != epoch:
+            merged = LatencySketch()
+            oldest = epoch - len(self._slots) + 1
+            for slot_epoch, slot in zip(self._epochs, self._slots):
+                if slot_epoch >= oldest:
+                    merged.merge(slot)
+            self._merged = merged
+            self._merged_epoch = epoch
+        return self._merged
+
+    def bucket_count(self) -> int:
+        return sum(len(slot.buckets) for slot in self._slots)
+
+
 class LatencyLogger:
-    """Collects and reports latency metrics.
+    """Collects and reports latency metrics in bounded memory.
 
     Thread-safe singleton implementation for tracking operation latencies.
-    Provides summary statistics including count, avg, min, max per operation.
+    Each operation has a lifetime ``LatencySketch`` plus one
+    ``RollingLatencyWindow`` per ``ROLLING_WINDOWS`` entry; the last
+    ``RAG_METRICS_RECENT_SAMPLES`` raw measurements are kept in a ring buffer.
 
     Usage:
         logger = LatencyLogger()
@@ -38,12 +202,19 @@ class LatencyLogger:
     """
 
     _instance: Optional["LatencyLogger"] = None
-    _metrics: List[LatencyMetric] = []
-    _operation_stats: Dict[str, List[float]] = defaultdict(list)
+    _metrics: Deque[LatencyMetric]
+    _operation_stats: Dict[str, LatencySketch]
+    _rolling: Dict[str, Dict[str, RollingLatencyWindow]]
+    _lock: threading.Lock
 
     def __new__(cls) -> "LatencyLogger":
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
+            instance = super().__new__(cls)
+            instance._metrics = deque(maxlen=max(METRICS_RECENT_SAMPLES, 0))
+            instance._operation_stats = {}
+            instance._rolling = {}
+            instance._lock = threading.Lock()
+            cls._instance = instance
         return cls._instance
 
     def record(
@@ -64,11 +235,22 @@ class LatencyLogger:
             duration_ms=duration_ms,
             metadata=metadata,
         )
-        self._metrics.append(metric)
-        self._operation_stats[operation].append(duration_ms)
+        now = time.monotonic()
+        with self._lock:
+            self._metrics.append(metric)
+            sketch = self._operation_stats.get(operation)
+            if sketch is None:
+                sketch = self._operation_stats[operation] = LatencySketch()
+                self._rolling[operation] = {
+                    name: RollingLatencyWindow(span, slots)
+                    for name, (span, slots) in ROLLING_WINDOWS.items()
+                }
+            sketch.add(duration_ms)
+            for window in self._rolling[operation].values():
+                window.add(duration_ms, now)
 
         # Log if exceeds threshold
-        if duration_ms > 1000:
+        if duration_ms > SLOW_OPERATION_MS:
             logger.warning(f"SLOW: {operation} took {duration_ms:.0f}ms")
         else:
             logger.debug(f"{operation}: {duration_ms:.0f}ms")
@@ -76,6 +258,9 @@ class LatencyLogger:
     def get_summary(self) -> Dict[str, Any]:
         """Get summary statistics for all operations.
 
+        Per-operation summaries are cached until that operation records a new
+        sample, so repeated reads cost O(number of operations).
+
         Returns:
             Dict mapping operation names to statistics including:
             - count: Number of measurements
@@ -83,27 +268,98 @@ class LatencyLogger:
             - min_ms: Minimum duration
             - max_ms: Maximum duration
             - total_ms: Total duration across all calls
+            - p50_ms, p90_ms, p99_ms, p999_ms: Estimated percentiles
+        """
+        with self._lock:
+            return {
+                op: dict(sketch.summary())
+                for op, sketch in self._operation_stats.items()
+                if sketch.count
+            }
+
+    def get_window_summary(self, window: str = "5m") -> Dict[str, Any]:
+        """Summary statistics per operation over a rolling window.
+
+        Args:
+            window: One of ``ROLLING_WINDOWS`` ("1m", "5m", "1h")
+
+        Returns:
+            Same shape as ``get_summary``, limited to operations with samples
+            in the window
+        """
+        if window not in ROLLING_WINDOWS:
+            raise ValueError(f"Unknown window {window!r}; expected one of {sorted(ROLLING_WINDOWS)}")
+        now = time.monotonic()
+        with self._lock:
+            summaries = {}
+            for op, windows in self._rolling.items():
+                sketch = windows[window].sketch(now)
+                if sketch.count:
+                    summaries[op] = dict(sketch.summary())
+            return summaries
+
+    def percentile(self, operation: str, q: float, window: str = "1m") -> Optional[float]:
+        """Current ``q`` quantile (0-1) of ``operation`` over a rolling window.
+
+        Meant for adaptive components (timeouts, hedging, concurrency
+        limits); returns None when the window holds no samples.
         """
-        summary = {}
-        for op, durations in self._operation_stats.items():
-            if durations:
-                summary[op] = {
-                    "count": len(durations),
-                    "avg_ms": sum(durations) / len(durations),
-                    "min_ms": min(durations),
-                    "max_ms": max(durations),
-                    "total_ms": sum(durations),
+        now = time.monotonic()
+        with self._lock:
+            windows = self._rolling.get(operation)
+            if windows is None:
+                return None
+            sketch = windows[window].sketch(now)
+            if not sketch.count:
+                return None
+            for name, quantile in SUMMARY_QUANTILES:
+                if quantile == q:
+                    return sketch.summary()[f"{name}_ms"]
+            return sketch.quantiles([q])[0]
+
+    def histograms(self, bounds_ms: List[float]) -> Dict[str, Dict[str, Any]]:
+        """Lifetime cumulative bucket counts, count and sum (ms) per operation."""
+        with self._lock:
+            return {
+                op: {
+                    "buckets": sketch.cumulative_counts(bounds_ms),
+                    "count": sketch.count,
+                    "sum_ms": sketch.total,
                 }
-        return summary
+                for op, sketch in self._operation_stats.items()
+                if sketch.count
+            }
+
+    def recent(self, operation: Optional[str] = None, limit: Optional[int] = None) -> List[LatencyMetric]:
+        """Most recent raw measurements from the ring buffer, oldest first."""
+        with self._lock:
+            metrics = [m for m in self._metrics if operation is None or m.operation == operation]
+        return metrics[-limit:] if limit else metrics
+
+    def memory_counts(self) -> Dict[str, int]:
+        """Ring-buffer samples, operations and sketch buckets currently held."""
+        with self._lock:
+            return {
+                "recent_samples": len(self._metrics),
+                "operations": len(self._operation_stats),
+                "sketch_buckets": sum(len(sketch.buckets) for sketch in self._operation_stats.values()),
+                "rolling_sketch_buckets": sum(
+                    window.bucket_count() for windows in self._rolling.values() for window in windows.values()
+                ),
+            }
 
     def clear(self) -> None:
         """Clear all collected metrics."""
-        self._metrics.clear()
-        self._operation_stats.clear()
+        with self._lock:
+            self._metrics.clear()
+            self._operation_stats.clear()
+            self._rolling.clear()
 
 
 # Global instance
 _logger = LatencyLogger()
+_profiler = get_slow_operation_profiler()
+register_store("latency_logger", _logger.memory_counts)
 
 
 @contextmanager
@@ -121,11 +377,15 @@ def log_latency(operation: str, **metadata: Any):
         operation: Name of the operation being timed
         **metadata: Additional metadata to store (e.g., corpus_id, query_text)
     """
+    # Threads inside slow blocks get stack-sampled when RAG_PROFILE_SLOW_MS is set
+    watch = _profiler.begin(operation, metadata) if _profiler.enabled else None
     start = time.perf_counter()
     try:
         yield
     finally:
         duration_ms = (time.perf_counter() - start) * 1000
+        if watch is not None:
+            _profiler.end(watch, duration_ms)
         _logger.record(operation, duration_ms, **metadata)
 
 
@@ -184,6 +444,16 @@ def get_metrics_summary() -> Dict[str, Any]:
     return _logger.get_summary()
 
 
+def get_rolling_summary(window: str = "5m") -> Dict[str, Any]:
+    """Get global metrics summary over a rolling window ("1m", "5m" or "1h")."""
+    return _logger.get_window_summary(window)
+
+
+def current_percentile(operation: str, q: float = 0.99, window: str = "1m") -> Optional[float]:
+    """Current latency quantile of an operation, or None without recent samples."""
+    return _logger.percentile(operation, q, window)
+
+
 def clear_metrics() -> None:
     """Clear global metrics."""
     _logger.clear()
@@ -192,8 +462,13 @@ def clear_metrics() -> None:
 __all__ = [
     "LatencyLogger",
     "LatencyMetric",
+    "LatencySketch",
+    "RollingLatencyWindow",
+    "ROLLING_WINDOWS",
     "log_latency",
     "timed",
     "get_metrics_summary",
+    "get_rolling_summary",
+    "current_percentile",
     "clear_metrics",
 ]
@@ -0,0 +1,257 @@
+"""Per-call LLM accounting: model, tokens, time-to-first-token and latency.
+
+``account_model_start`` / ``account_model_end`` are ADK before/after-model
+callbacks. Each LLM call is recorded in the shared ``LatencyLogger`` as
+``llm.<agent>`` (total latency) and ``llm.<agent>.ttft`` (time until the
+first streamed chunk, or the whole response when not streaming), with the
+model and token counts as metadata. Token and call totals are kept per
+agent and model (also exported as ``rag_llm_calls`` / ``rag_llm_tokens``)
+and per session, so expensive routes and conversations stand out.
+``account_agent_start`` / ``account_agent_end`` mark the root agent's turn,
+so calls made by ``AgentTool`` sub-agents (which run in their own
+in-memory session) are charged to the user's session and turn.
+
+ADK calls the after-model callback once per streamed chunk; only the final,
+non-partial response carries the usage metadata and closes the call.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from rag.config import LLM_USAGE_SESSIONS
+from rag.utils.latency_logger import LatencyLogger
+from rag.utils.memory_profiler import register_store
+from rag.utils.metrics import labels, register_callback
+
+# Calls awaiting their final response, keyed by (invocation id, agent)
+_MAX_PENDING_CALLS = 1024
+_TOKEN_FIELDS = (
+    ("input", "prompt_token_count"),
+    ("output", "candidates_token_count"),
+    ("cached", "cached_content_token_count"),
+    ("thoughts", "thoughts_token_count"),
+)
+
+
+class _Usage:
+    __slots__ = (
+        "calls", "errors", "tokens", "llm_ms", "invocations",
+        "max_calls_per_invocation", "_last_invocation", "_invocation_calls",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.tokens: Dict[str, int] = {kind: 0 for kind, _ in _TOKEN_FIELDS}
+        self.llm_ms = 0.0
+        self.invocations = 0
+        self.max_calls_per_invocation = 0
+        self._last_invocation: Optional[str] = None
+        self._invocation_calls = 0
+
+    def add(self, invocation_id: str, tokens: Dict[str, int], duration_ms: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.llm_ms += duration_ms
+        for kind, count in tokens.items():
+            self.tokens[kind] += count
+        if invocation_id != self._last_invocation:
+            self._last_invocation = invocation_id
+            self._invocation_calls = 0
+            self.invocations += 1
+        self._invocation_calls += 1
+        self.max_calls_per_invocation = max(self.max_calls_per_invocation, self._invocation_calls)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "input_tokens": self.tokens["input"],
+            "output_tokens": self.tokens["output"],
+            "cached_tokens": self.tokens["cached"],
+            "thoughts_tokens": self.tokens["thoughts"],
+            "llm_ms": round(self.llm_ms, 1),
+            "invocations": self.invocations,
+            "max_calls_per_invocation": self.max_calls_per_invocation,
+        }
+
+
+class _PendingCall:
+    __slots__ = ("model", "started", "first_chunk_ms")
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_chunk_ms: Optional[float] = None
+
+
+_PENDING: "OrderedDict[Tuple[str, str], _PendingCall]" = OrderedDict()
+_BY_AGENT: Dict[Tuple[str, str], _Usage] = {}
+_BY_SESSION: "OrderedDict[str, _Usage]" = OrderedDict()
+_LOCK = threading.Lock()
+
+# (session id, invocation id) of the outermost agent turn in this context
+_TURN: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("rag_llm_turn", default=None)
+_OPEN_TURNS: Dict[Tuple[str, str], Optional[Tuple[str, str]]] = {}
+
+
+def _call_key(callback_context: Any) -> Tuple[str, str]:
+    return getattr(callback_context, "invocation_id", ""), callback_context.agent_name
+
+
+def _session_id(callback_context: Any) -> str:
+    session = getattr(callback_context, "session", None)
+    return getattr(session, "id", None) or ""
+
+
+def _token_counts(llm_response: Any) -> Dict[str, int]:
+    usage = getattr(llm_response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {kind: getattr(usage, field, None) or 0 for kind, field in _TOKEN_FIELDS}
+
+
+def account_agent_start(callback_context: Any) -> None:
+    """``before_agent_callback``: make the outermost agent's session own this turn."""
+    previous = _TURN.get()
+    if previous is None:
+        turn = (_session_id(callback_context), _call_key(callback_context)[0])
+        with _LOCK:
+            _OPEN_TURNS[_call_key(callback_context)] = previous
+            while len(_OPEN_TURNS) > _MAX_PENDING_CALLS:
+                del _OPEN_TURNS[next(iter(_OPEN_TURNS))]
+        _TURN.set(turn)
+    return None
+
+
+def account_agent_end(callback_context: Any) -> None:
+    """``after_agent_callback``: end the turn opened by ``account_agent_start``."""
+    with _LOCK:
+        opened = _call_key(callback_context) in _OPEN_TURNS
+        previous = _OPEN_TURNS.pop(_call_key(callback_context), None)
+    if opened:
+        _TURN.set(previous)
+    return None
+
+
+def account_model_start(callback_context: Any, llm_request: Any) -> None:
+    """``before_model_callback``: start timing one LLM call."""
+    with _LOCK:
+        _PENDING[_call_key(callback_context)] = _PendingCall(llm_request.model or "")
+        # Calls that failed never reach their final response; forget the oldest
+        while len(_PENDING) > _MAX_PENDING_CALLS:
+            _PENDING.popitem(last=False)
+    return None
+
+
+def account_model_end(callback_context: Any, llm_response: Any) -> None:
+    """``after_model_callback``: note the first chunk, then account the final response."""
+    key = _call_key(callback_context)
+    with _LOCK:
+        pending = _PENDING.get(key)
+        if pending is None:
+            return None
+        elapsed_ms = (time.perf_counter() - pending.started) * 1000
+        if pending.first_chunk_ms is None:
+            pending.first_chunk_ms = elapsed_ms
+        if getattr(llm_response, "partial", False):
+            return None
+        del _PENDING[key]
+
+        agent = callback_context.agent_name
+        model = pending.model or getattr(llm_response, "model_version", None) or "unknown"
+        tokens = _token_counts(llm_response)
+        failed = bool(getattr(llm_response, "error_code", None))
+        invocation_id = key[0]
+
+        by_agent = _BY_AGENT.get((agent, model))
+        if by_agent is None:
+            by_agent = _BY_AGENT[(agent, model)] = _Usage()
+        by_agent.add(invocation_id, tokens, elapsed_ms, failed)
+
+        session_id, turn_id = _TURN.get() or (_session_id(callback_context), invocation_id)
+        if session_id:
+            by_session = _BY_SESSION.pop(session_id, None) or _Usage()
+            _BY_SESSION[session_id] = by_session
+            by_session.add(turn_id, tokens, elapsed_ms, failed)
+            while len(_BY_SESSION) > LLM_USAGE_SESSIONS:
+                _BY_SESSION.popitem(last=False)
+
+    latency = LatencyLogger()
+    latency.record(
+        f"llm.{agent}",
+        elapsed_ms,
+        model=model,
+        input_tokens=tokens.get("input", 0),
+        output_tokens=tokens.get("output", 0),
+        ttft_ms=round(pending.first_chunk_ms, 1),
+        error_code=getattr(llm_response, "error_code", None),
+    )
+    latency.record(f"llm.{agent}.ttft", pending.first_chunk_ms, model=model)
+    return None
+
+
+def get_llm_usage() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """LLM call and token totals per agent/model and per (recent) session.
+
+    Returns:
+        ``{"agents": {"<agent>/<model>": totals}, "sessions": {session_id: totals}}``;
+        sessions are bounded by ``RAG_LLM_USAGE_SESSIONS``, least recently active dropped first
+    """
+    with _LOCK:
+        return {
+            "agents": {f"{agent}/{model}": usage.as_dict() for (agent, model), usage in _BY_AGENT.items()},
+            "sessions": {session_id: usage.as_dict() for session_id, usage in _BY_SESSION.items()},
+        }
+
+
+def get_session_usage(session_id: str) -> Optional[Dict[str, Any]]:
+    """LLM call and token totals for one session, if it is still tracked."""
+    with _LOCK:
+        usage = _BY_SESSION.get(session_id)
+        return usage.as_dict() if usage is not None else None
+
+
+def clear_llm_usage() -> None:
+    with _LOCK:
+        _PENDING.clear()
+        _BY_AGENT.clear()
+        _BY_SESSION.clear()
+
+
+def _call_samples() -> Dict[Any, float]:
+    with _LOCK:
+        return {labels(agent=agent, model=model): usage.calls for (agent, model), usage in _BY_AGENT.items()}
+
+
+def _token_samples() -> Dict[Any, float]:
+    with _LOCK:
+        return {
+            labels(agent=agent, model=model, type=kind): count
+            for (agent, model), usage in _BY_AGENT.items()
+            for kind, count in usage.tokens.items()
+        }
+
+
+register_callback("rag_llm_calls", "counter", _call_samples, "LLM calls by agent and model.")
+register_callback("rag_llm_tokens", "counter", _token_samples, "LLM tokens by agent, model and type (input, output, cached, thoughts).")
+register_store(
+    "llm_accounting",
+    lambda: {"sessions": len(_BY_SESSION), "pending_calls": len(_PENDING), "open_turns": len(_OPEN_TURNS)},
+)
+
+
+__all__ = [
+    "account_agent_end",
+    "account_agent_start",
+    "account_model_end",
+    "account_model_start",
+    "clear_llm_usage",
+    "get_llm_usage",
+    "get_session_usage",
+]
@@ -0,0 +1,312 @@
+"""tracemalloc snapshots, allocation-site diffs and in-memory store sizes.
+
+``MemoryProfiler`` keeps the first tracemalloc snapshot as a baseline plus
+the most recent one, and reports the allocation sites (file:line) that grew
+the most since either. Reports also include the entry counts of the
+project's module-level stores (progress records, latency samples and
+sketches, course indexes, bucket manifests, history windows, buffered
+spans, ...). Each store's module registers its own counter with
+``register_store``, so new caches are easy to add.
+
+Reports can be taken periodically (``RAG_MEMORY_SNAPSHOT_INTERVAL``), on
+``SIGUSR2`` or through the ``get_memory_report`` tool, and are logged and
+optionally written as JSON to ``RAG_MEMORY_REPORT_DIR``. tracemalloc is
+started by the first snapshot, so the first report has no diff; Python
+allocations get slower by roughly 2x while it is tracing. On-demand tracing
+stops ``RAG_MEMORY_TRACE_IDLE_STOP`` seconds after the last report (or at
+once with ``report(stop=True)``); periodic mode traces for good.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from rag.config import (
+    MEMORY_REPORT_DIR,
+    MEMORY_SNAPSHOT_INTERVAL,
+    MEMORY_TOP_N,
+    MEMORY_TRACE_FRAMES,
+    MEMORY_TRACE_IDLE_STOP,
+)
+
+logger = logging.getLogger(__name__)
+
+_STORES: Dict[str, Callable[[], Dict[str, int]]] = {}
+# Allocations made by tracemalloc itself and the import system are noise
+_IGNORED_FILES = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+def register_store(name: str, counter: Callable[[], Dict[str, int]]) -> None:
+    """Report ``counter()`` (e.g. ``{"records": 120}``) under ``name`` in every memory report."""
+    _STORES[name] = counter
+
+
+def store_counts() -> Dict[str, Dict[str, int]]:
+    """Current entry counts of every registered store."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for name, counter in list(_STORES.items()):
+        try:
+            counts[name] = counter()
+        except Exception as e:  # a broken counter must not break the report
+            logger.warning(f"Memory counter {name} failed: {e}")
+    return counts
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _object_types(limit: int) -> Dict[str, int]:
+    """Most numerous live object types tracked by the garbage collector."""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return dict(counts.most_common(limit))
+
+
+class MemoryProfiler:
+    """Takes tracemalloc snapshots and diffs them by allocation site.
+
+    Args:
+        frames: Stack frames recorded per allocation (more frames give better
+            attribution but cost more memory and time)
+        top_n: Allocation sites listed per report
+        report_dir: Optional directory receiving each report as JSON
+        idle_stop: Seconds after the latest report at which tracing stops (0 = never)
+    """
+
+    def __init__(
+        self,
+        frames: int = MEMORY_TRACE_FRAMES,
+        top_n: int = MEMORY_TOP_N,
+        report_dir: Optional[str] = MEMORY_REPORT_DIR,
+        idle_stop: float = MEMORY_TRACE_IDLE_STOP,
+    ) -> None:
+        self.frames = max(frames, 1)
+        self.top_n = top_n
+        self.report_dir = Path(report_dir) if report_dir else None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+        self._reports = 0
+        self.idle_stop = idle_stop
+        self._stop_timer: Optional[threading.Timer] = None
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        """Take a filtered snapshot, starting tracemalloc if needed."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in _IGNORED_FILES]
+        )
+
+    def _growers(self, current: tracemalloc.Snapshot, base: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        key_type = "traceback" if self.frames > 1 else "lineno"
+        growers = []
+        for stat in current.compare_to(base, key_type)[: self.top_n]:
+            if stat.size_diff <= 0:
+                break
+            # tracemalloc orders frames oldest first; the allocating line is the last one
+            growers.append({
+                "site": str(stat.traceback[-1]),
+                "traceback": [str(frame) for frame in reversed(stat.traceback)] if self.frames > 1 else None,
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            })
+        return growers
+
+    def report(self, since: str = "previous", object_types: bool = False, stop: bool = False) -> Dict[str, Any]:
+        """Snapshot now and report growth, store sizes and process memory.
+
+        Args:
+            since: "previous" (growth since the last report) or "baseline"
+                (growth since the first)
+            object_types: Also count live objects by type via ``gc`` (slow on large heaps)
+            stop: Stop tracing after this report; the next one starts a new baseline
+
+        Returns:
+            Dict with traced/peak/RSS bytes, ``top_growers`` by allocation site
+            (empty on the first report) and ``stores`` entry counts
+        """
+        if since not in ("previous", "baseline"):
+            raise ValueError(f"since must be 'previous' or 'baseline', not {since!r}")
+        with self._lock:
+            start = time.perf_counter()
+            current = self.snapshot()
+            base = self._baseline if since == "baseline" else self._previous
+            growers = self._growers(current, base) if base is not None else []
+            if self._baseline is None:
+                self._baseline = current
+            self._previous = current
+            traced, peak = tracemalloc.get_traced_memory()
+            report: Dict[str, Any] = {
+                "taken_at": time.time(),
+                "since": since if base is not None else None,
+                "traced_bytes": traced,
+                "traced_peak_bytes": peak,
+                "rss_bytes": _rss_bytes(),
+                "top_growers": growers,
+                "stores": store_counts(),
+            }
+            if object_types:
+                report["object_types"] = _object_types(self.top_n)
+            report["report_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self._reports += 1
+            sequence = self._reports
+            if stop:
+                self._stop_locked()
+            else:
+                self._arm_idle_stop(sequence)
+            report["tracing"] = tracemalloc.is_tracing()
+        self._publish(report, sequence)
+        return report
+
+    def _publish(self, report: Dict[str, Any], sequence: int) -> None:
+        growth = ", ".join(
+            f"{grower['site']} +{grower['size_diff_bytes'] // 1024}KiB" for grower in report["top_growers"][:3]
+        )
+        logger.info(
+            f"Memory: traced {report['traced_bytes'] // 1024}KiB, rss {(report['rss_bytes'] or 0) // 1024}KiB"
+            + (f"; top growers: {growth}" if growth else "")
+        )
+        if self.report_dir is None:
+            return
+        try:
+            self.report_dir.mkdir(parents=True, exist_ok=True)
+            path = self.report_dir / f"memory-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{sequence:04d}.json"
+            path.write_text(json.dumps(report, indent=2))
+        except OSError as e:
+            logger.error(f"Writing memory report to {self.report_dir} failed: {e}")
+
+    def _arm_idle_stop(self, sequence: int) -> None:
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+        if self.idle_stop <= 0:
+            return
+        self._stop_timer = threading.Timer(self.idle_stop, self._stop_if_idle, args=(sequence,))
+        self._stop_timer.daemon = True
+        self._stop_timer.start()
+
+    def _stop_if_idle(self, sequence: int) -> None:
+        with self._lock:
+            # A report taken since this timer was armed re-armed its own
+            if self._reports == sequence:
+                logger.info(f"Stopping tracemalloc after {self.idle_stop:.0f}s without a memory report")
+                self._stop_locked()
+
+    def _stop_locked(self) -> None:
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+        self._baseline = self._previous = None
+        tracemalloc.stop()
+
+    def stop(self) -> None:
+        """Stop tracemalloc and drop the held snapshots."""
+        with self._lock:
+            self._stop_locked()
+
+
+_PROFILER = MemoryProfiler()
+_periodic_thread: Optional[threading.Thread] = None
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    return _PROFILER
+
+
+def start_periodic_snapshots(interval: float = MEMORY_SNAPSHOT_INTERVAL) -> None:
+    """Report every ``interval`` seconds from a daemon thread (idempotent).
+
+    Raises:
+        ValueError: If ``interval`` is not positive
+    """
+    global _periodic_thread
+    if interval <= 0:
+        raise ValueError(f"interval must be positive, not {interval}")
+    if _periodic_thread is not None:
+        return
+    # Periodic reports diff against each other, so tracing must not idle out between them
+    _PROFILER.idle_stop = 0.0
+
+    def _loop() -> None:
+        while True:
+            try:
+                _PROFILER.report()
+            except Exception as e:
+                logger.error(f"Periodic memory report failed: {e}")
+            time.sleep(interval)
+
+    _periodic_thread = threading.Thread(target=_loop, name="memory-snapshots", daemon=True)
+    _periodic_thread.start()
+
+
+def install_signal_handler(signum: Optional[int] = getattr(signal, "SIGUSR2", None)) -> bool:
+    """Report on ``signum`` (default ``SIGUSR2``), e.g. ``kill -USR2 <pid>``.
+
+    The report runs on a separate thread so the signalled thread is not held
+    up. Returns False where signals are unavailable (Windows, non-main thread).
+    """
+    if signum is None:
+        return False
+
+    def _handler(received: int, frame: Any) -> None:
+        threading.Thread(
+            target=_PROFILER.report, kwargs={"object_types": True}, name="memory-report", daemon=True
+        ).start()
+
+    try:
+        signal.signal(signum, _handler)
+    except ValueError:
+        return False
+    return True
+
+
+def start_memory_profiling() -> None:
+    """Install the ``SIGUSR2`` trigger, export store sizes as metrics and start periodic snapshots if configured."""
+    from rag.utils.metrics import labels, register_callback
+
+    register_callback(
+        "rag_store_entries", "gauge",
+        lambda: {
+            labels(store=store, kind=kind): count
+            for store, counts in store_counts().items()
+            for kind, count in counts.items()
+        },
+        "Entries held by in-memory stores and caches.",
+    )
+    install_signal_handler()
+    if MEMORY_SNAPSHOT_INTERVAL > 0:
+        start_periodic_snapshots()
+
+
+__all__ = [
+    "MemoryProfiler",
+    "get_memory_profiler",
+    "install_signal_handler",
+    "register_store",
+    "start_memory_profiling",
+    "start_periodic_snapshots",
+    "store_counts",
+]
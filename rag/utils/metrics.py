@@ -0,0 +1,269 @@
+"""Process-wide counters and gauges with OpenMetrics text exposition.
+
+Counters (cache hits, shared refreshes, search timeouts) and gauges (in-flight
+Vertex AI calls) are updated in place by the code that observes them; values
+that already live elsewhere, such as executor queue depth or tool call counts,
+are read through callbacks at scrape time. ``render_openmetrics`` adds the
+``LatencyLogger`` operation histograms and rolling 1m quantiles.
+
+Expose them with ``RAG_METRICS_PORT`` (``GET /metrics`` on a local
+``http.server``) or ``RAG_METRICS_DUMP_PATH`` (file rewritten every
+``RAG_METRICS_DUMP_INTERVAL`` seconds, e.g. for a node_exporter textfile
+collector).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from rag.config import (
+    METRICS_DUMP_INTERVAL,
+    METRICS_DUMP_PATH,
+    METRICS_HOST,
+    METRICS_PORT,
+)
+from rag.utils.latency_logger import SUMMARY_QUANTILES, LatencyLogger
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Samples = Union[float, Dict[LabelKey, float]]
+
+_COUNTERS: Dict[str, Dict[LabelKey, float]] = {}
+_GAUGES: Dict[str, Dict[LabelKey, float]] = {}
+_CALLBACKS: Dict[str, Tuple[str, Callable[[], Samples]]] = {}
+_HELP: Dict[str, str] = {
+    "rag_cache_requests": "Cache lookups by cache and result (hit, miss, disk_hit, shared_refresh).",
+    "rag_corpus_search_failures": "Multi-corpus searches that timed out or raised.",
+    "rag_vertex_errors": "Failed Vertex AI RAG API calls.",
+    "rag_vertex_in_flight": "Vertex AI RAG API calls currently running.",
+}
+_LOCK = threading.Lock()
+
+_server: Optional[ThreadingHTTPServer] = None
+_dump_thread: Optional[threading.Thread] = None
+
+
+def labels(**values: str) -> LabelKey:
+    """Canonical (sorted) label key, for callbacks that return labelled samples."""
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+
+def describe(name: str, help_text: str) -> None:
+    """Set the ``# HELP`` text of a metric family."""
+    _HELP[name] = help_text
+
+
+def increment(name: str, amount: float = 1.0, **label_values: str) -> None:
+    """Add to a counter (exposed as ``<name>_total``)."""
+    key = labels(**label_values)
+    with _LOCK:
+        family = _COUNTERS.setdefault(name, {})
+        family[key] = family.get(key, 0.0) + amount
+
+
+def set_gauge(name: str, value: float, **label_values: str) -> None:
+    key = labels(**label_values)
+    with _LOCK:
+        _GAUGES.setdefault(name, {})[key] = value
+
+
+def add_gauge(name: str, delta: float, **label_values: str) -> None:
+    key = labels(**label_values)
+    with _LOCK:
+        family = _GAUGES.setdefault(name, {})
+        family[key] = family.get(key, 0.0) + delta
+
+
+@contextmanager
+def track_in_flight(name: str, **label_values: str) -> Iterator[None]:
+    """Gauge of calls currently inside the block."""
+    add_gauge(name, 1, **label_values)
+    try:
+        yield
+    finally:
+        add_gauge(name, -1, **label_values)
+
+
+def register_callback(name: str, kind: str, callback: Callable[[], Samples], help_text: str = "") -> None:
+    """Sample a counter or gauge from ``callback`` at scrape time.
+
+    Args:
+        name: Metric family name (counters get ``_total`` appended)
+        kind: "counter" or "gauge"
+        callback: Returns one value, or ``{labels(...): value}``
+        help_text: ``# HELP`` text
+    """
+    if kind not in ("counter", "gauge"):
+        raise ValueError(f"Unsupported callback metric type: {kind}")
+    _CALLBACKS[name] = (kind, callback)
+    if help_text:
+        describe(name, help_text)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _family(lines: List[str], name: str, kind: str, samples: Dict[LabelKey, float]) -> None:
+    lines.append(f"# TYPE {name} {kind}")
+    if name in _HELP:
+        lines.append(f"# HELP {name} {_escape(_HELP[name])}")
+    suffix = "_total" if kind == "counter" else ""
+    for key, value in sorted(samples.items()):
+        lines.append(f"{name}{suffix}{_label_text(key)} {_number(value)}")
+
+
+def _latency_families(lines: List[str]) -> None:
+    latency = LatencyLogger()
+    histograms = latency.histograms([bound * 1000 for bound in LATENCY_BUCKETS_S])
+    if histograms:
+        name = "rag_operation_latency_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        lines.append(f"# HELP {name} Operation latency since process start.")
+        for operation, histogram in sorted(histograms.items()):
+            key = labels(operation=operation)
+            for bound, count in zip(LATENCY_BUCKETS_S, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_label_text(key, (('le', repr(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_label_text(key, (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_count{_label_text(key)} {histogram['count']}")
+            lines.append(f"{name}_sum{_label_text(key)} {_number(histogram['sum_ms'] / 1000)}")
+
+    window = latency.get_window_summary("1m")
+    if window:
+        name = "rag_operation_latency_1m_seconds"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"# HELP {name} Operation latency quantiles over the last minute.")
+        for operation, summary in sorted(window.items()):
+            key = labels(operation=operation)
+            for suffix, quantile in SUMMARY_QUANTILES:
+                value = summary[f"{suffix}_ms"] / 1000
+                lines.append(f"{name}{_label_text(key, (('quantile', str(quantile)),))} {_number(value)}")
+
+
+def render_openmetrics() -> str:
+    """All metrics in OpenMetrics text format, terminated by ``# EOF``."""
+    lines: List[str] = []
+    _latency_families(lines)
+    with _LOCK:
+        counters = {name: dict(samples) for name, samples in _COUNTERS.items()}
+        gauges = {name: dict(samples) for name, samples in _GAUGES.items()}
+    for name, (kind, callback) in list(_CALLBACKS.items()):
+        try:
+            sampled = callback()
+        except Exception as e:  # a broken callback must not break the scrape
+            logger.warning(f"Metric callback {name} failed: {e}")
+            continue
+        samples = sampled if isinstance(sampled, dict) else {(): float(sampled)}
+        (counters if kind == "counter" else gauges).setdefault(name, {}).update(samples)
+    for name in sorted(counters):
+        _family(lines, name, "counter", counters[name])
+    for name in sorted(gauges):
+        _family(lines, name, "gauge", gauges[name])
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_openmetrics(path: str) -> None:
+    """Atomically (re)write the exposition to ``path``."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(render_openmetrics())
+    os.replace(tmp_path, target)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_openmetrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug(f"metrics {self.address_string()} {format % args}")
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve ``GET /metrics`` from a daemon thread (idempotent)."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Serving OpenMetrics on http://{host}:{_server.server_port}/metrics")
+    return _server
+
+
+def start_metrics_dump(path: str = METRICS_DUMP_PATH, interval: float = METRICS_DUMP_INTERVAL) -> None:
+    """Rewrite the exposition file every ``interval`` seconds from a daemon thread (idempotent)."""
+    global _dump_thread
+    if _dump_thread is not None:
+        return
+
+    def _loop() -> None:
+        while True:
+            try:
+                write_openmetrics(path)
+            except OSError as e:
+                logger.error(f"Writing metrics to {path} failed: {e}")
+            time.sleep(interval)
+
+    _dump_thread = threading.Thread(target=_loop, name="metrics-dump", daemon=True)
+    _dump_thread.start()
+
+
+def start_metrics_export() -> None:
+    """Start whichever exporters are configured (``RAG_METRICS_PORT``, ``RAG_METRICS_DUMP_PATH``)."""
+    if METRICS_PORT > 0:
+        try:
+            start_metrics_server()
+        except OSError as e:
+            logger.error(f"Metrics endpoint on {METRICS_HOST}:{METRICS_PORT} unavailable: {e}")
+    if METRICS_DUMP_PATH:
+        start_metrics_dump()
+
+
+__all__ = [
+    "add_gauge",
+    "describe",
+    "increment",
+    "labels",
+    "register_callback",
+    "render_openmetrics",
+    "set_gauge",
+    "start_metrics_dump",
+    "start_metrics_export",
+    "start_metrics_server",
+    "track_in_flight",
+    "write_openmetrics",
+]
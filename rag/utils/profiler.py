@@ -0,0 +1,200 @@
+"""Opt-in sampling profiler for operations that run past a latency threshold.
+
+Every ``log_latency`` block registers its thread with the profiler while
+it runs. A single daemon thread wakes every ``RAG_PROFILE_INTERVAL_MS`` and,
+for each block that has been running longer than ``RAG_PROFILE_SLOW_MS``,
+samples that thread's stack via ``sys._current_frames()``. When a sampled
+block finishes, its stacks are written as a folded-stack file (one
+``frame;frame;frame count`` line per distinct stack, rooted at the
+operation name) that flamegraph.pl, speedscope or inferno render directly,
+with a JSON sidecar holding the duration and metadata. Fast operations
+never get sampled, so the steady-state cost is one dict insert and delete
+per block.
+
+Async operations are sampled on the event-loop thread, so their profiles
+show whatever the loop was running at the time.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rag.config import (
+    PROFILE_DIR,
+    PROFILE_INTERVAL_MS,
+    PROFILE_MAX_FILES,
+    PROFILE_SLOW_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per sampled stack, innermost first
+_MAX_STACK_DEPTH = 128
+# Formatted frame names memoized by code object; cleared when full
+_FRAME_NAME_CACHE_SIZE = 4096
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class _Watch:
+    """One in-progress operation registered with the profiler."""
+
+    __slots__ = ("operation", "metadata", "thread_id", "thread_name", "started", "samples")
+
+    def __init__(self, operation: str, metadata: Dict[str, Any]) -> None:
+        current = threading.current_thread()
+        self.operation = operation
+        self.metadata = metadata
+        self.thread_id = current.ident
+        self.thread_name = current.name
+        self.started = time.perf_counter()
+        self.samples: Counter = Counter()
+
+
+class SlowOperationProfiler:
+    """Samples the stacks of operations that exceed ``threshold_ms``.
+
+    Args:
+        threshold_ms: Running time after which an operation is sampled (0 disables)
+        interval_ms: Time between stack samples
+        output_dir: Directory receiving ``.folded`` profiles and ``.json`` sidecars
+        max_files: Profiles written per process before the profiler stops writing
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = PROFILE_SLOW_MS,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        output_dir: str = PROFILE_DIR,
+        max_files: int = PROFILE_MAX_FILES,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.interval_ms = max(interval_ms, 1.0)
+        self.output_dir = Path(output_dir)
+        self.max_files = max_files
+        self._active: Dict[int, _Watch] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._written = 0
+        self._frame_names: Dict[Any, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0 and self._written < self.max_files
+
+    def begin(self, operation: str, metadata: Dict[str, Any]) -> _Watch:
+        """Register the calling thread as running ``operation``."""
+        watch = _Watch(operation, metadata)
+        with self._lock:
+            self._active[id(watch)] = watch
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name="slow-op-profiler", daemon=True)
+                self._sampler.start()
+        return watch
+
+    def end(self, watch: _Watch, duration_ms: float) -> Optional[Path]:
+        """Unregister ``watch``; write its profile if it was sampled.
+
+        Returns:
+            Path of the folded-stack file, or None when nothing was sampled
+        """
+        with self._lock:
+            self._active.pop(id(watch), None)
+            if not watch.samples or self._written >= self.max_files:
+                return None
+            self._written += 1
+            # The sampler may still be adding to this watch; write from a copy
+            samples = Counter(watch.samples)
+            sequence = self._written
+        try:
+            return self._write(watch, samples, sequence, duration_ms)
+        except Exception as e:  # profiling must never fail the profiled operation
+            logger.error(f"Writing slow-operation profile for {watch.operation} failed: {e}")
+            return None
+
+    def _frame_name(self, code: Any) -> str:
+        name = self._frame_names.get(code)
+        if name is None:
+            qualname = getattr(code, "co_qualname", code.co_name)
+            name = f"{qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            if len(self._frame_names) >= _FRAME_NAME_CACHE_SIZE:
+                self._frame_names.clear()
+            # Semicolons separate frames in the folded format
+            name = self._frame_names[code] = name.replace(";", ":")
+        return name
+
+    def _fold(self, frame: Any) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < _MAX_STACK_DEPTH:
+            names.append(self._frame_name(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def _run(self) -> None:
+        interval = self.interval_ms / 1000
+        while True:
+            time.sleep(interval)
+            now = time.perf_counter()
+            with self._lock:
+                due = [
+                    watch for watch in self._active.values()
+                    if (now - watch.started) * 1000 >= self.threshold_ms
+                ]
+            if not due:
+                continue
+            frames = sys._current_frames()
+            stacks = [
+                (watch, self._fold(frames[watch.thread_id]))
+                for watch in due if watch.thread_id in frames
+            ]
+            del frames
+            with self._lock:
+                for watch, stack in stacks:
+                    watch.samples[stack] += 1
+
+    def _write(self, watch: _Watch, samples: Counter, sequence: int, duration_ms: float) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # The per-process sequence keeps same-second profiles of one operation apart
+        stem = (
+            f"{_UNSAFE_FILENAME.sub('_', watch.operation)}-"
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{sequence:04d}-{int(duration_ms)}ms"
+        )
+        root = watch.operation.replace(";", ":")
+        folded = self.output_dir / f"{stem}.folded"
+        folded.write_text(
+            "".join(f"{root};{stack} {count}\n" for stack, count in samples.most_common())
+        )
+        sidecar = {
+            "operation": watch.operation,
+            "duration_ms": round(duration_ms, 1),
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": self.interval_ms,
+            "samples": sum(samples.values()),
+            "thread": watch.thread_name,
+            "metadata": {key: str(value) for key, value in watch.metadata.items()},
+        }
+        (self.output_dir / f"{stem}.json").write_text(json.dumps(sidecar, indent=2))
+        logger.info(f"Profile of {watch.operation} ({duration_ms:.0f}ms, {sidecar['samples']} samples) written to {folded}")
+        return folded
+
+
+_PROFILER = SlowOperationProfiler()
+
+
+def get_slow_operation_profiler() -> SlowOperationProfiler:
+    return _PROFILER
+
+
+__all__ = [
+    "SlowOperationProfiler",
+    "get_slow_operation_profiler",
+]
@@ -0,0 +1,365 @@
+"""Hierarchical span tracing propagated through contextvars.
+
+A turn is traced as nested spans: the root agent invocation, each LLM call,
+each tool or ``AgentTool`` sub-agent call (and that sub-agent's own LLM and
+tool calls), down to per-corpus ``rag.retrieval_query`` calls running on
+thread-pool workers. The current span lives in a ``ContextVar``; asyncio
+tasks and ADK's tool thread pool copy it automatically, and our own
+executors submit through ``submit_with_context``.
+
+Sampling is decided once per root span (``RAG_TRACE_SAMPLE_RATE``);
+children follow their root. With sampling off, ``span()`` returns a shared
+no-op scope after one context-variable read. Finished spans are kept in a
+bounded buffer and can be written as Chrome trace-event JSON (chrome://tracing,
+Perfetto) or as OTLP/JSON lines readable by an OpenTelemetry collector's
+``otlpjsonfile`` receiver.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from rag.config import TRACE_BUFFER_SPANS, TRACE_EXPORT_DIR, TRACE_SAMPLE_RATE
+from rag.utils.memory_profiler import register_store
+
+logger = logging.getLogger(__name__)
+
+# Open LLM / agent spans awaiting their after-callback, keyed by (invocation id, agent)
+_MAX_OPEN_CALLBACK_SPANS = 1024
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes",
+        "start_ns", "end_ns", "_start_perf_ns", "thread_id", "error",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._start_perf_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.thread_id = threading.get_ident()
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else self.start_ns
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Close the span (once) and hand it to the finished-span buffer."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start_perf_ns)
+        if error is not None:
+            self.error = type(error).__name__
+        _FINISHED.append(self)
+
+
+# Marks a context whose root span was not sampled, so descendants skip cheaply
+_NOT_SAMPLED = object()
+_CURRENT: contextvars.ContextVar[Any] = contextvars.ContextVar("rag_current_span", default=None)
+_FINISHED: Deque[Span] = deque(maxlen=max(TRACE_BUFFER_SPANS, 1))
+_sample_rate = TRACE_SAMPLE_RATE
+
+
+def set_sample_rate(rate: float) -> None:
+    """Change the fraction of root spans that are traced (0 disables tracing)."""
+    global _sample_rate
+    _sample_rate = min(max(rate, 0.0), 1.0)
+
+
+def current_span() -> Optional[Span]:
+    current = _CURRENT.get()
+    return current if isinstance(current, Span) else None
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """Start a child of the current span (or a sampled root); it is not made current.
+
+    Returns None when the trace is not sampled. Callers must ``end()`` it.
+    """
+    parent = _CURRENT.get()
+    if parent is _NOT_SAMPLED:
+        return None
+    if parent is None and (_sample_rate <= 0 or random.random() >= _sample_rate):
+        return None
+    return Span(name, parent, attributes)
+
+
+class _SpanScope:
+    """Context manager that makes a new span current for the duration of a block."""
+
+    __slots__ = ("_name", "_attributes", "_span", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Optional[Span]:
+        self._span = start_span(self._name, **self._attributes)
+        self._token = _CURRENT.set(self._span if self._span is not None else _NOT_SAMPLED)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        _CURRENT.reset(self._token)
+        if self._span is not None:
+            self._span.end(exc)
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Trace a block as a child of the current span.
+
+    Usage:
+        with span("rag.retrieval_query", corpus_id=corpus_id) as active:
+            ...
+            if active is not None:
+                active.set_attribute("results", len(results))
+    """
+    if _CURRENT.get() is None and _sample_rate <= 0:
+        return _NOOP_SCOPE
+    return _SpanScope(name, attributes)
+
+
+def submit_with_context(executor: Executor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """``executor.submit`` that runs ``fn`` in a copy of the caller's context.
+
+    Spans opened by the worker then nest under the submitting span. Each
+    submission gets its own copy, since one context cannot be entered by two
+    threads at once.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+_OPEN_CALLBACK_SPANS: "OrderedDict[Tuple[str, str, str], Tuple[Optional[Span], Any]]" = OrderedDict()
+_OPEN_LOCK = threading.Lock()
+
+
+def _callback_key(callback_context: Any, kind: str) -> Tuple[str, str, str]:
+    return getattr(callback_context, "invocation_id", ""), callback_context.agent_name, kind
+
+
+def _open_callback_span(key: Tuple[str, str, str], opened: Optional[Span], previous: Any) -> None:
+    with _OPEN_LOCK:
+        _OPEN_CALLBACK_SPANS[key] = (opened, previous)
+        # Calls that failed never reach their after-callback; forget the oldest
+        while len(_OPEN_CALLBACK_SPANS) > _MAX_OPEN_CALLBACK_SPANS:
+            _OPEN_CALLBACK_SPANS.popitem(last=False)
+
+
+def _close_callback_span(key: Tuple[str, str, str]) -> Optional[Tuple[Optional[Span], Any]]:
+    with _OPEN_LOCK:
+        return _OPEN_CALLBACK_SPANS.pop(key, None)
+
+
+def trace_agent_start(callback_context: Any) -> None:
+    """``before_agent_callback``: open an ``invoke_agent`` span and make it current."""
+    previous = _CURRENT.get()
+    if previous is None and _sample_rate <= 0:
+        return None
+    opened = start_span(f"invoke_agent {callback_context.agent_name}")
+    _open_callback_span(_callback_key(callback_context, "agent"), opened, previous)
+    # An unsampled root still marks the context so its tools are not sampled on their own
+    _CURRENT.set(opened if opened is not None else _NOT_SAMPLED)
+    return None
+
+
+def trace_agent_end(callback_context: Any) -> None:
+    """``after_agent_callback``: close the agent span and restore its parent as current."""
+    entry = _close_callback_span(_callback_key(callback_context, "agent"))
+    if entry is not None:
+        opened, previous = entry
+        if opened is not None:
+            opened.end()
+        _CURRENT.set(previous)
+    return None
+
+
+def trace_model_start(callback_context: Any, llm_request: Any) -> None:
+    """``before_model_callback``: open a span for one LLM call."""
+    opened = start_span(
+        f"call_llm {llm_request.model or ''}".strip(),
+        agent=callback_context.agent_name,
+        contents=len(llm_request.contents or ()),
+    )
+    if opened is not None:
+        _open_callback_span(_callback_key(callback_context, "llm"), opened, None)
+    return None
+
+
+def trace_model_end(callback_context: Any, llm_response: Any) -> None:
+    """``after_model_callback``: close the LLM span on the final (non-partial) response."""
+    if getattr(llm_response, "partial", False):
+        return None
+    entry = _close_callback_span(_callback_key(callback_context, "llm"))
+    if entry is not None:
+        opened, _ = entry
+        if getattr(llm_response, "error_code", None):
+            opened.error = str(llm_response.error_code)
+        opened.end()
+    return None
+
+
+def finished_spans(clear: bool = False) -> List[Span]:
+    """Snapshot of buffered finished spans, oldest first."""
+    spans = list(_FINISHED)
+    if clear:
+        _FINISHED.clear()
+    return spans
+
+
+def _json_attribute(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+def to_chrome_trace(spans: List[Span]) -> Dict[str, Any]:
+    """Chrome trace-event format ("X" complete events, microseconds)."""
+    pid = os.getpid()
+    events = []
+    for item in spans:
+        args = {key: _json_attribute(value) for key, value in item.attributes.items()}
+        args.update(trace_id=item.trace_id, span_id=item.span_id, parent_id=item.parent_id)
+        if item.error:
+            args["error"] = item.error
+        events.append({
+            "name": item.name,
+            "cat": item.name.split(" ", 1)[0].split(".", 1)[0],
+            "ph": "X",
+            "ts": item.start_ns / 1000,
+            "dur": (item.end_ns - item.start_ns) / 1000,
+            "pid": pid,
+            "tid": item.thread_id,
+            "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_json(spans: List[Span], service_name: str = "rag") -> Dict[str, Any]:
+    """OTLP/JSON ``ExportTraceServiceRequest`` for the given spans."""
+    otlp_spans = []
+    for item in spans:
+        otlp_span = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()
+            ],
+            # STATUS_CODE_ERROR / STATUS_CODE_UNSET
+            "status": {"code": 2, "message": item.error} if item.error else {"code": 0},
+        }
+        if item.parent_id:
+            otlp_span["parentSpanId"] = item.parent_id
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+        }]
+    }
+
+
+def export_chrome_trace(path: str, clear: bool = False) -> int:
+    """Write buffered spans as a Chrome trace file; returns the span count."""
+    spans = finished_spans(clear)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(to_chrome_trace(spans)))
+    return len(spans)
+
+
+def export_otlp_json(path: str, clear: bool = False) -> int:
+    """Append buffered spans as one OTLP/JSON line; returns the span count."""
+    spans = finished_spans(clear)
+    if spans:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(to_otlp_json(spans), separators=(",", ":")) + "\n")
+    return len(spans)
+
+
+def _export_on_exit() -> None:
+    if not _FINISHED:
+        return
+    directory = Path(TRACE_EXPORT_DIR)
+    try:
+        export_chrome_trace(str(directory / f"trace-{os.getpid()}.json"))
+        count = export_otlp_json(str(directory / "spans.otlp.jsonl"), clear=True)
+        logger.info(f"Exported {count} trace spans to {directory}")
+    except OSError as e:
+        logger.error(f"Trace export to {directory} failed: {e}")
+
+
+if TRACE_EXPORT_DIR:
+    atexit.register(_export_on_exit)
+
+register_store(
+    "tracing",
+    lambda: {"finished_spans": len(_FINISHED), "open_callback_spans": len(_OPEN_CALLBACK_SPANS)},
+)
+
+
+__all__ = [
+    "Span",
+    "current_span",
+    "export_chrome_trace",
+    "export_otlp_json",
+    "finished_spans",
+    "set_sample_rate",
+    "span",
+    "start_span",
+    "submit_with_context",
+    "to_chrome_trace",
+    "to_otlp_json",
+    "trace_agent_end",
+    "trace_agent_start",
+    "trace_model_end",
+    "trace_model_start",
+]
@@ -0,0 +1,22 @@
+"""Shared pytest setup.
+
+Importing ``rag`` builds Google Cloud clients, which need Application
+Default Credentials. Without them, fall back to anonymous credentials so
+unit tests that never call the APIs can still import the modules.
+"""
+
+import os
+
+import google.auth
+import google.auth.credentials
+import google.auth.exceptions
+
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+
+try:
+    google.auth.default()
+except google.auth.exceptions.DefaultCredentialsError:
+    google.auth.default = lambda *args, **kwargs: (
+        google.auth.credentials.AnonymousCredentials(),
+        os.environ["GOOGLE_CLOUD_PROJECT"],
+    )
@@ -0,0 +1,69 @@
+"""Chapter-label resolution against the shipped course.json.
+
+Its chapter ids are textbook numbers with gaps (ch1-6, ch8, ch15-18,
+ch21-25), so "chapter N" can mean the Nth chapter of the course or the
+textbook's chapter N.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rag import progress_tracker
+from rag.config import CHAPTER_MATCH_MARGIN, CHAPTER_MATCH_THRESHOLD
+from rag.course_registry import compile_course_index
+from rag.progress_store import InMemoryProgressStore
+
+COURSE_PATH = Path(progress_tracker.__file__).parent / "data" / "course.json"
+
+
+@pytest.fixture(scope="module")
+def index():
+    return compile_course_index(json.loads(COURSE_PATH.read_text()))
+
+
+@pytest.mark.parametrize(
+    "label, by_order, by_id",
+    [
+        ("chapter 8", "ch15", "ch8"),
+        ("chapter eight", "ch15", "ch8"),
+        ("Chapter 8", "ch15", "ch8"),
+        ("eighth chapter", "ch15", "ch8"),
+        ("chapter 15", "ch24", "ch15"),
+        ("chapter 16", "ch25", "ch16"),
+    ],
+)
+def test_order_and_id_readings_that_disagree_are_ambiguous(index, label, by_order, by_id):
+    assert progress_tracker._resolve_chapter(label, index) is None
+    assert index.labels.is_ambiguous(label, CHAPTER_MATCH_THRESHOLD, CHAPTER_MATCH_MARGIN)
+    assert {match.chapter_id for match in index.labels.candidates(label)} == {by_order, by_id}
+
+
+@pytest.mark.parametrize(
+    "label, chapter_id, confidence",
+    [
+        ("ch 8", "ch8", 1.0),
+        ("ch8", "ch8", 1.0),
+        ("chapter 3", "ch3", 1.0),  # both readings agree
+        ("chapter 7", "ch8", 1.0),  # there is no ch7
+        ("chapter 17", "ch17", 0.9),  # the course has 16 chapters
+    ],
+)
+def test_unambiguous_numbered_labels(index, label, chapter_id, confidence):
+    match = progress_tracker._resolve_chapter(label, index)
+    assert match is not None
+    assert (match.chapter_id, match.confidence) == (chapter_id, confidence)
+
+
+def test_record_progress_asks_for_confirmation(index, monkeypatch):
+    store = InMemoryProgressStore()
+    monkeypatch.setattr(progress_tracker, "_PROGRESS_STORE", store)
+    monkeypatch.setattr(progress_tracker, "_ensure_course_loaded", lambda unit_id=None: index)
+
+    result = progress_tracker.record_student_progress("s1", ["chapter 8"])
+
+    assert result["status"] == "needs_confirmation"
+    [entry] = result["ambiguous_chapters"]
+    assert {candidate["chapter_id"] for candidate in entry["candidates"]} == {"ch8", "ch15"}
+    assert store.get(index.unit_id, "s1") is None
@@ -0,0 +1,52 @@
+"""Cohort analytics agree with the per-student tracker."""
+
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from rag import progress_tracker
+from rag.cohort_analytics import compute_cohort_analytics
+from rag.course_registry import compile_course_index
+from rag.progress_store import ProgressRecord, chapter_codec
+
+# Course order puts "intro" before its own prerequisite "setup"
+COURSE = {
+    "unit_id": "COH101",
+    "unit_name": "Cohort test",
+    "description": "",
+    "learning_outcomes_overall": [],
+    "chapters": [
+        {"chapter_id": "intro", "title": "Intro", "order": 1, "prerequisites": ["setup"]},
+        {"chapter_id": "setup", "title": "Setup", "order": 2, "prerequisites": []},
+        {"chapter_id": "core", "title": "Core", "order": 3, "prerequisites": ["intro"]},
+        {"chapter_id": "extra", "title": "Extra", "order": 4, "prerequisites": []},
+    ],
+}
+
+
+def test_next_chapter_matches_tracker():
+    index = compile_course_index({**COURSE, "chapters": [dict(c) for c in COURSE["chapters"]]})
+    codec = chapter_codec(index.unit_id)
+    rng = random.Random(7)
+    records = []
+    for student in range(200):
+        done = [cid for cid in index.order if rng.random() < 0.4]
+        records.append((f"s{student}", ProgressRecord(mask=codec.mask(done))))
+
+    analytics = compute_cohort_analytics(index, records)
+
+    expected = {cid: 0 for cid in index.order}
+    out_of_sequence = 0
+    for student_id, record in records:
+        snapshot = progress_tracker._build_snapshot(student_id, record, index)
+        if snapshot["next_chapter"] is not None:
+            expected[snapshot["next_chapter"]["chapter_id"]] += 1
+        first_gap = next((cid for cid in index.order if not record.mask >> codec.bit(cid) & 1), None)
+        if first_gap is not None and snapshot["next_chapter"]["chapter_id"] != first_gap:
+            out_of_sequence += 1
+
+    assert {chapter["chapter_id"]: chapter["next_count"] for chapter in analytics["chapters"]} == expected
+    assert analytics["out_of_sequence"]["count"] == out_of_sequence > 0
+    assert analytics["out_of_sequence"]["no_next_chapter_count"] == 0
@@ -0,0 +1,64 @@
+"""Bulk-operation filters against real-shaped RagFile protos."""
+
+from datetime import datetime, timedelta, timezone
+
+from google.cloud.aiplatform_v1 import GoogleDriveSource, RagFile
+
+from rag.tools import corpus_tools
+
+CORPUS = "projects/p/locations/l/ragCorpora/1"
+
+
+def _gcs_file(file_id: str, uri: str, display_name: str, age_days: float = 0) -> RagFile:
+    return RagFile(
+        name=f"{CORPUS}/ragFiles/{file_id}",
+        display_name=display_name,
+        gcs_source={"uris": [uri]},
+        create_time=datetime.now(timezone.utc) - timedelta(days=age_days),
+    )
+
+
+FILES = [
+    _gcs_file("1", "gs://course/2024/week1.pdf", "week1.pdf", age_days=400),
+    _gcs_file("2", "gs://course/2025/week1.pdf", "week1.pdf", age_days=10),
+    _gcs_file("3", "gs://course/2024/notes.txt", "notes.txt", age_days=2),
+    RagFile(
+        name=f"{CORPUS}/ragFiles/4",
+        display_name="slides",
+        google_drive_source={
+            "resource_ids": [{
+                "resource_id": "abc123",
+                "resource_type": GoogleDriveSource.ResourceId.ResourceType.RESOURCE_TYPE_FILE,
+            }]
+        },
+    ),
+]
+
+
+def test_source_uris_reads_gcs_and_drive_sources():
+    assert corpus_tools._source_uris(FILES[0]) == ["gs://course/2024/week1.pdf"]
+    assert corpus_tools._source_uris(FILES[3]) == ["https://drive.google.com/file/d/abc123"]
+
+
+def test_source_uri_prefix_matches_gcs_source(monkeypatch):
+    monkeypatch.setattr(corpus_tools, "iter_rag_files", lambda corpus_id: iter(FILES))
+    assert corpus_tools._select_files("1", None, None, "gs://course/2024/", None) == ["1", "3"]
+
+
+def test_filters_combine_with_id_list(monkeypatch):
+    monkeypatch.setattr(corpus_tools, "iter_rag_files", lambda corpus_id: iter(FILES))
+    assert corpus_tools._select_files("1", ["1", "2"], "week*", "gs://course/", 30) == ["1"]
+
+
+def test_bulk_get_applies_filters(monkeypatch):
+    monkeypatch.setattr(corpus_tools, "iter_rag_files", lambda corpus_id: iter(FILES))
+    monkeypatch.setattr(
+        corpus_tools, "get_rag_file", lambda corpus_id, file_id: {"status": "success", "file": {"id": file_id}}
+    )
+    result = corpus_tools.bulk_get_rag_files("1", source_uri_prefix="https://drive.google.com/")
+    assert result["matched_file_ids"] == ["4"]
+    assert result["succeeded"] == 1
+
+
+def test_bulk_get_requires_ids_or_filters():
+    assert corpus_tools.bulk_get_rag_files("1")["status"] == "error"
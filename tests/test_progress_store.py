@@ -0,0 +1,156 @@
+"""Concurrency and recovery behaviour of the progress store backends."""
+
+import sqlite3
+import threading
+import time
+import uuid
+
+import pytest
+
+from rag.progress_store import (
+    EventLogProgressStore,
+    InMemoryProgressStore,
+    ProgressRecord,
+    SQLiteProgressStore,
+    chapter_codec,
+)
+
+THREADS = 8
+UPDATES = 40
+
+
+def _unit(chapters: int) -> str:
+    """A fresh unit whose codec knows ``chapters`` chapters (c0, c1, ...)."""
+    unit_id = f"T{uuid.uuid4().hex[:8]}"
+    codec = chapter_codec(unit_id)
+    for position in range(chapters):
+        codec.bit(f"c{position}")
+    return unit_id
+
+
+def _open(backend: str, path):
+    if backend == "memory":
+        return InMemoryProgressStore()
+    if backend == "sqlite":
+        return SQLiteProgressStore(str(path / "progress.sqlite3"), flush_interval=0.01, batch_size=16)
+    return EventLogProgressStore(str(path / "events"), snapshot_every=50)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "events"])
+def test_concurrent_updates_lose_nothing(backend, tmp_path):
+    unit_id = _unit(THREADS * UPDATES)
+    students = ("alice", "bob")
+    store = _open(backend, tmp_path)
+
+    def add(bit: int):
+        def mutate(current):
+            time.sleep(0)  # give other threads the chance to interleave
+            return ProgressRecord(mask=(current.mask if current else 0) | bit)
+        return mutate
+
+    def worker(thread: int) -> None:
+        for update in range(UPDATES):
+            bit = 1 << (thread * UPDATES + update)
+            for student in students:
+                store.update(unit_id, student, add(bit))
+
+    threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    everything = (1 << (THREADS * UPDATES)) - 1
+    for student in students:
+        assert store.get(unit_id, student).mask == everything
+    store.close()
+    if backend != "memory":
+        reopened = _open(backend, tmp_path)
+        assert {student: record.mask for student, record in reopened.iter_records(unit_id)} == {
+            student: everything for student in students
+        }
+        reopened.close()
+
+
+@pytest.mark.parametrize("cache_size", [10, 1])
+def test_db_read_racing_a_write_is_not_cached(tmp_path, cache_size):
+    unit_id = _unit(3)
+    store = SQLiteProgressStore(str(tmp_path / "progress.sqlite3"), flush_interval=0.01, cache_size=cache_size)
+    store.put(unit_id, "s", ProgressRecord(mask=0b001))
+    store.flush()
+    store._cache.clear()
+
+    # Hold the reader between its DB read and the cache fill
+    decode = store._decode
+    read_done, resume = threading.Event(), threading.Event()
+
+    def paused_decode(*args):
+        record = decode(*args)
+        if threading.current_thread().name == "reader":
+            read_done.set()
+            resume.wait()
+        return record
+
+    store._decode = paused_decode
+    reader = threading.Thread(target=store.get, args=(unit_id, "s"), name="reader")
+    reader.start()
+    read_done.wait()
+    store.update(unit_id, "s", lambda current: ProgressRecord(mask=current.mask | 0b100))
+    store.flush()
+    # With a one-entry cache this evicts the write, so only the write counter can tell
+    store.put(unit_id, "other", ProgressRecord(mask=0))
+    resume.set()
+    reader.join()
+
+    store.update(unit_id, "s", lambda current: ProgressRecord(mask=current.mask | 0b010))
+    assert store.get(unit_id, "s").mask == 0b111
+    store.close()
+
+
+def test_torn_event_log_tail_is_recovered(tmp_path):
+    unit_id = _unit(3)
+    store = EventLogProgressStore(str(tmp_path))
+    store.put(unit_id, "s", ProgressRecord(mask=0b011))
+    store._log.flush()
+    log_path = tmp_path / EventLogProgressStore.LOG_NAME
+    intact = log_path.read_bytes()
+    # Simulate a crash mid-append: no final snapshot, half a line at the end
+    with open(log_path, "ab") as log:
+        log.write(b'{"ts":1,"u":"' + unit_id.encode() + b'","s":"s","e":"comp')
+
+    recovered = EventLogProgressStore(str(tmp_path))
+    assert recovered.get(unit_id, "s").mask == 0b011
+    assert log_path.read_bytes() == intact
+    recovered.update(unit_id, "s", lambda current: ProgressRecord(mask=current.mask | 0b100))
+    recovered.close()
+    reopened = EventLogProgressStore(str(tmp_path))
+    assert reopened.get(unit_id, "s").mask == 0b111
+    reopened.close()
+
+
+def test_put_raises_after_writer_stops(tmp_path):
+    unit_id = _unit(1)
+    store = SQLiteProgressStore(str(tmp_path / "progress.sqlite3"), flush_interval=0.01, max_write_failures=2)
+    commit = store._commit
+    failing = threading.Event()
+    failing.set()
+
+    def flaky_commit(conn, batch):
+        if failing.is_set() and batch:
+            raise sqlite3.OperationalError("disk I/O error")
+        commit(conn, batch)
+
+    store._commit = flaky_commit
+    store.put(unit_id, "s", ProgressRecord(mask=1))
+    store._writer.join(timeout=5)
+    assert not store._writer.is_alive()
+
+    with pytest.raises(RuntimeError, match="disk I/O error"):
+        store.put(unit_id, "t", ProgressRecord(mask=1))
+
+    # The record that never landed is still written by the final flush
+    failing.clear()
+    store.close()
+    reopened = SQLiteProgressStore(str(tmp_path / "progress.sqlite3"))
+    assert reopened.get(unit_id, "s").mask == 1
+    reopened.close()